@@ -4,18 +4,31 @@ Created on Apr 14, 2018
 @author: 4x1md, hb020
 
 
-This file contains the classes for the rpcbind port mapper (on TCP and UDP) and the VXI-11 listener.
+This file contains the classes for the rpcbind port mapper (on TCP and UDP), the VXI-11 abort channel and the VXI-11 listener.
 
-It starts the port mappers as separate processes and runs the VXI-11 loop in the main process.
+The port mapper serves UDP and TCP from one loop, in the same process as the VXI-11 loop.
+It reads the current VXI-11 port directly from the server.
 
-The port changes of the VXI-11 loop are communicated to the port mappers via a shared variable (with locking).
+All VXI-11 ports of the range are opened at startup and keep listening. The port mappers advertise
+one of them, which moves after every link, unless the client keeps its links open (see linkMode).
+Every connection is served on its own, so several clients can use the AWG at the same time.
+The DeviceArbiter gives them access to the AWG one request at a time, and honours DEVICE_LOCK.
+All VXI-11 core procedures are answered. The abort channel has its own fixed port, served like the port mapper.
+
+Optionally, the SCPI commands are executed behind the DEVICE_WRITE replies, by a driver thread (see write_behind.py).
 
 '''
 
-import multiprocessing
+import queue
+import selectors
 import socket
+import threading
+import time
 from awgdrivers.base_awg import BaseAWG
-from command_parser import CommandParser
+from awgdrivers.log_writer import log
+from command_parser import CommandParser, AWG_ID_STRING, PARSE_CACHE_SIZE, split_binary_block
+from write_behind import WriteBehindQueue, DEFAULT_BARRIERS
+import vxi11_codec as codec
 from enum import Enum
 
 # Host and ports to use.
@@ -26,26 +39,80 @@ HOST = '0.0.0.0'
 RPCBIND_PORT = 111
 VXI11_PORTRANGE_START = 9010
 VXI11_PORTRANGE_END = 9019
+# Port of the VXI-11 abort channel, sent in the CREATE_LINK reply
+VXI11_ABORT_PORT = 9020
 END_OF_SESSION_TIMEOUT = 10  # seconds
-
-
-# AWG ID to send to the oscilloscope
-#  Examples: SDG SDG2042X SDG0000X SDG2000X
-#  The ID should begin with SDG letters.
-AWG_ID_STRING = b"IDN-SGLT-PRI SDG0000X"
+# Time after which TCP port mapper connections without a complete request are dropped
+PORTMAPPER_TCP_TIMEOUT = 5  # seconds
+PORTMAPPER_MAX_REQUEST_SIZE = 1024
+# Connections waiting to be accepted, per TCP port. Several clients may connect at the same time.
+LISTEN_BACKLOG = 16
+# Number of threads that handle VXI-11 requests at the same time (asyncio engine)
+MAX_LINK_THREADS = 8
+# Initial size of the VXI-11 receive buffer. It grows when larger records arrive.
+RX_BUFFER_SIZE = 4096
+# Maximum Receive Size sent in the CREATE_LINK reply
+MAX_RECEIVE_SIZE = 0x00800000
+# Largest RPC record accepted: the Maximum Receive Size, plus headers.
+MAX_RECORD_SIZE = MAX_RECEIVE_SIZE + 0x100
+
+# The reply data ends with \n
+AWG_ID_REPLY = AWG_ID_STRING.encode() + b"\n"
 
 # RPC/VXI-11 procedure ids
 GET_PORT = 3
 CREATE_LINK = 10
 DEVICE_WRITE = 11
 DEVICE_READ = 12
+DEVICE_READSTB = 13
+DEVICE_TRIGGER = 14
+DEVICE_CLEAR = 15
+DEVICE_REMOTE = 16
+DEVICE_LOCAL = 17
+DEVICE_LOCK = 18
+DEVICE_UNLOCK = 19
+DEVICE_ENABLE_SRQ = 20
+DEVICE_DOCMD = 22
 DESTROY_LINK = 23
+CREATE_INTR_CHAN = 25
+DESTROY_INTR_CHAN = 26
 LXI_PROCEDURES = {
     10: "CREATE_LINK",
     11: "DEVICE_WRITE",
     12: "DEVICE_READ",
-    23: "DESTROY_LINK"
+    13: "DEVICE_READSTB",
+    14: "DEVICE_TRIGGER",
+    15: "DEVICE_CLEAR",
+    16: "DEVICE_REMOTE",
+    17: "DEVICE_LOCAL",
+    18: "DEVICE_LOCK",
+    19: "DEVICE_UNLOCK",
+    20: "DEVICE_ENABLE_SRQ",
+    22: "DEVICE_DOCMD",
+    23: "DESTROY_LINK",
+    25: "CREATE_INTR_CHAN",
+    26: "DESTROY_INTR_CHAN"
 }
+# Layout of the arguments of each procedure
+LXI_ARGUMENTS = {
+    CREATE_LINK: codec.CREATE_LINK_PARMS,
+    DEVICE_WRITE: codec.DEVICE_WRITE_PARMS,
+    DEVICE_READ: codec.DEVICE_READ_PARMS,
+    DEVICE_READSTB: codec.DEVICE_GENERIC_PARMS,
+    DEVICE_TRIGGER: codec.DEVICE_GENERIC_PARMS,
+    DEVICE_CLEAR: codec.DEVICE_GENERIC_PARMS,
+    DEVICE_REMOTE: codec.DEVICE_GENERIC_PARMS,
+    DEVICE_LOCAL: codec.DEVICE_GENERIC_PARMS,
+    DEVICE_LOCK: codec.DEVICE_LOCK_PARMS,
+    DEVICE_UNLOCK: codec.DEVICE_LINK,
+    DEVICE_ENABLE_SRQ: codec.DEVICE_ENABLE_SRQ_PARMS,
+    DEVICE_DOCMD: codec.DEVICE_DOCMD_PARMS,
+    DESTROY_LINK: codec.DEVICE_LINK,
+    CREATE_INTR_CHAN: codec.DEVICE_REMOTE_FUNC,
+    DESTROY_INTR_CHAN: codec.NO_RESULT
+}
+# Abort channel procedure id
+DEVICE_ABORT = 1
 
 
 class sessionType(Enum):
@@ -57,14 +124,310 @@ class sessionType(Enum):
     SESSION_ERROR = 4
 
 
+class linkMode(Enum):
+    # How the VXI-11 server handles links and ports
+    # Decide per client: port hopping, until the client is seen keeping its link open
+    LINK_AUTO = "auto"
+    # A new port for every link (as SDS800X-HD requires)
+    LINK_HOP = "hop"
+    # Links and connections are kept open, the port never changes
+    LINK_PERSISTENT = "persistent"
+
+
+class LxiLink(object):
+    """
+    A VXI-11 link, created by CREATE_LINK.
+    """
+
+    def __init__(self, link_id: int, session: "LxiSession", device: str):
+        self.link_id = link_id
+        self.session = session
+        self.device = device
+        # number of DEVICE_WRITE requests on this link
+        self.writes = 0
+        # set by DEVICE_ENABLE_SRQ. The emulated AWG never requests service.
+        self.srq_enabled = False
+        # reply to the last query, or what is left of it, sent by the next DEVICE_READ requests
+        self.reply = None
+
+
+class LxiSession(object):
+    """
+    State of one VXI-11 connection, as seen by the request handler.
+    """
+
+    def __init__(self, address, persistent: bool = False):
+        self.address = address
+        # set by "OUTP ON" and "OUTP OFF" commands
+        self.start_of_session = False
+        self.end_of_session = False
+        # the links created on this connection: link id -> LxiLink
+        self.links = {}
+        # set when the last link was destroyed
+        self.closed = False
+        # set when the connection may carry several links, and the port must not change after it
+        self.persistent = persistent
+        # set when the advertised port was moved after the last link
+        self.port_moved = False
+        # set by CREATE_INTR_CHAN: host address, host port, program, program version, program family
+        self.intr_channel = None
+        # reply templates of this connection
+        self.replies = codec.Vxi11Replies()
+
+    def result(self) -> sessionType:
+        """Returns the type of session that was handled on this connection."""
+        if self.end_of_session:
+            return sessionType.SESSION_ENDED
+        elif self.start_of_session:
+            return sessionType.SESSION_STARTED
+        else:
+            return sessionType.SESSION_ONGOING
+
+    def done(self) -> bool:
+        """Returns True when the connection must be closed."""
+        return self.closed and not self.persistent
+
+
+class RequestStats(object):
+    """
+    Collects the processing latency of the VXI-11 requests, per procedure.
+    """
+
+    def __init__(self):
+        # requests of several connections can end at the same time
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.counts = {}
+        self.totals = {}
+        self.maxima = {}
+
+    def add(self, procedure: int, duration: float):
+        """Adds one request.
+
+        :param procedure: the VXI-11 procedure id
+        :type procedure: int
+        :param duration: the time it took to handle the request, in seconds
+        :type duration: float
+        """
+        with self.lock:
+            self.counts[procedure] = self.counts.get(procedure, 0) + 1
+            self.totals[procedure] = self.totals.get(procedure, 0.0) + duration
+            self.maxima[procedure] = max(self.maxima.get(procedure, 0.0), duration)
+
+    def summary(self) -> str:
+        """Returns a printable summary of the collected latencies."""
+        lines = []
+        for procedure in sorted(self.counts):
+            count = self.counts[procedure]
+            avg = self.totals[procedure] / count
+            lines.append(f"  {LXI_PROCEDURES[procedure]}: {count} requests, "
+                         f"avg {avg * 1000:.3f} ms, max {self.maxima[procedure] * 1000:.3f} ms")
+        return "\n".join(lines)
+
+
 # VXI-11 Core (395183)
 VXI11_CORE_ID = 395183
+# VXI-11 Abort (395184)
+VXI11_ABORT_ID = 395184
 # Function responses
 NOT_VXI11_ERROR = -1
 NOT_GET_PORT_ERROR = -2
 UNKNOWN_COMMAND_ERROR = -4
 OK = 0
 
+# VXI-11 error codes and read reasons
+NO_ERROR = 0
+INVALID_LINK_IDENTIFIER = 4
+CHANNEL_NOT_ESTABLISHED = 6
+OPERATION_NOT_SUPPORTED = 8
+DEVICE_LOCKED_BY_ANOTHER_LINK = 11
+NO_LOCK_HELD_BY_THIS_LINK = 12
+IO_ERROR = 17
+REASON_REQCNT = 0x01
+REASON_END = 0x04
+# VXI-11 operation flags
+FLAG_WAITLOCK = 0x01
+
+
+class DeviceArbiter(object):
+    """
+    Arbitrates the access to the AWG between the links.
+
+    Requests that use the AWG run one at a time. While a link holds the VXI-11 device lock (DEVICE_LOCK),
+    the requests of the other links wait for the lock if they asked for it (waitlock flag), or get an error.
+    Requests that don't use the AWG only wait for the device lock, so they run in parallel.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        # id of the link that holds the device lock
+        self.owner = None
+        # set while a request uses the AWG
+        self.busy = False
+
+    def wait_for_lock(self, link_id: int, wait: bool, timeout: int) -> bool:
+        """Waits until no other link holds the device lock. The condition must be held.
+
+        :param link_id: the link id
+        :type link_id: int
+        :param wait: False to fail at once when another link holds the lock
+        :type wait: bool
+        :param timeout: lock timeout, in milliseconds
+        :type timeout: int
+        :return: True when no other link holds the lock
+        :rtype: bool
+        """
+        deadline = time.monotonic() + timeout / 1000
+        while self.owner is not None and self.owner != link_id:
+            remaining = deadline - time.monotonic()
+            if not wait or remaining <= 0:
+                return False
+            self.condition.wait(remaining)
+        return True
+
+    def check(self, link_id: int, wait: bool, timeout: int) -> int:
+        """For requests that don't use the AWG: returns the VXI-11 error code."""
+        with self.condition:
+            if not self.wait_for_lock(link_id, wait, timeout):
+                return DEVICE_LOCKED_BY_ANOTHER_LINK
+            return NO_ERROR
+
+    def acquire(self, link_id: int, wait: bool, timeout: int) -> int:
+        """For requests that use the AWG: returns the VXI-11 error code.
+        When it is NO_ERROR, done() must be called after the request.
+        """
+        with self.condition:
+            while True:
+                if not self.wait_for_lock(link_id, wait, timeout):
+                    return DEVICE_LOCKED_BY_ANOTHER_LINK
+                if not self.busy:
+                    self.busy = True
+                    return NO_ERROR
+                self.condition.wait()
+
+    def done(self):
+        with self.condition:
+            self.busy = False
+            self.condition.notify_all()
+
+    def lock(self, link_id: int, wait: bool, timeout: int) -> int:
+        """DEVICE_LOCK: returns the VXI-11 error code."""
+        with self.condition:
+            if not self.wait_for_lock(link_id, wait, timeout):
+                return DEVICE_LOCKED_BY_ANOTHER_LINK
+            self.owner = link_id
+            return NO_ERROR
+
+    def unlock(self, link_id: int) -> int:
+        """DEVICE_UNLOCK: returns the VXI-11 error code."""
+        with self.condition:
+            if self.owner != link_id:
+                return NO_LOCK_HELD_BY_THIS_LINK
+            self.owner = None
+            self.condition.notify_all()
+            return NO_ERROR
+
+    def release(self, link_id: int):
+        """
+        Releases the lock of a link that is destroyed.
+        """
+        with self.condition:
+            if self.owner == link_id:
+                self.owner = None
+                self.condition.notify_all()
+
+
+class RpcRecordReader(object):
+    """
+    Reads RPC records from a TCP connection, as defined in RFC 1057, section 10 (record marking).
+
+    The records are received with recv_into() in one preallocated buffer.
+    A record that consists of several fragments is reassembled in that buffer,
+    and records that arrive back to back are split.
+    read_record() returns a memoryview on the buffer, without the record marks.
+    That view is only valid until the next call to read_record().
+
+    The data that follows a record stays where it is. It is moved to the start of the buffer
+    only when the free space after it is too small for the rest of the next record.
+    The data is moved with memoryview slice assignments, which use memmove() when the ranges overlap.
+    """
+
+    def __init__(self, connection: socket.socket, size: int = RX_BUFFER_SIZE):
+        self.connection = connection
+        self.buf = bytearray(size)
+        self.view = memoryview(self.buf)
+        # start of the data that was received but not yet returned
+        self.start = 0
+        # end of the received data
+        self.end = 0
+
+    def read_record(self):
+        """Reads one complete record.
+
+        :return: the record, or None if the peer closed the connection or sent an invalid record
+        :rtype: memoryview
+        """
+        if self.start == self.end:
+            # All was returned: the buffer is free again, without moving anything
+            self.start = 0
+            self.end = 0
+
+        # The offsets are relative to self.start, which _fill() may move.
+        # The first fragment starts after its record mark, at offset 4.
+        # Further fragments are moved down over their record mark, so that the record is contiguous.
+        record_end = 4
+        pos = 0
+        while True:
+            if not self._fill(pos + 4):
+                return None
+            start = self.start
+            mark = int.from_bytes(self.view[start + pos:start + pos + 4], "big")
+            size = mark & 0x7FFFFFFF
+            if record_end - 4 + size > MAX_RECORD_SIZE:
+                return None
+            if not self._fill(pos + 4 + size):
+                return None
+            start = self.start
+            if pos + 4 != record_end:
+                self.view[start + record_end:start + record_end + size] = \
+                    self.view[start + pos + 4:start + pos + 4 + size]
+            record_end += size
+            pos += 4 + size
+            if mark & 0x80000000:
+                # Last fragment
+                self.start = start + pos
+                return self.view[start + 4:start + record_end]
+
+    def _fill(self, size: int) -> bool:
+        """Receives data until the buffer holds at least size bytes after self.start.
+
+        :param size: the number of bytes needed
+        :type size: int
+        :return: False if the peer closed the connection
+        :rtype: bool
+        """
+        if self.start + size > len(self.buf):
+            remaining = self.end - self.start
+            if size > len(self.buf):
+                # Grow the buffer. Views on the old buffer remain valid.
+                buf = bytearray(max(size, 2 * len(self.buf)))
+                buf[0:remaining] = self.view[self.start:self.end]
+                self.buf = buf
+                self.view = memoryview(buf)
+            else:
+                # Move the data down to the start of the buffer
+                self.view[0:remaining] = self.view[self.start:self.end]
+            self.start = 0
+            self.end = remaining
+        while self.end - self.start < size:
+            n = self.connection.recv_into(self.view[self.end:])
+            if n == 0:
+                return False
+            self.end += n
+        return True
+
 
 class CommsObject(object):
     """
@@ -90,7 +453,7 @@ class CommsObject(object):
                 sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
                 sock.bind((host, port))
             except OSError as ex:
-                print(f"{myname}: Fatal error: {ex}. Cannot open UDP port {port} on address {host} for listening.")
+                log("%s: Fatal error: %s. Cannot open UDP port %s on address %s for listening.", myname, ex, port, host)
                 exit(1)
         else:
             try:
@@ -98,86 +461,12 @@ class CommsObject(object):
                 # Disable the TIME_WAIT state of connected sockets, and allow reuse, as I switch ports rather quickly
                 sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
                 sock.bind((host, port))
-                sock.listen(1)  # Become a server socket, maximum 1 connection
+                sock.listen(LISTEN_BACKLOG)  # Become a server socket
             except OSError as ex:
-                print(f"{myname}: Fatal error: {ex}. Cannot open TCP port {port} on address {host} for listening.")
+                log("%s: Fatal error: %s. Cannot open TCP port %s on address %s for listening.", myname, ex, port, host)
                 exit(1)
         return sock
         
-    def get_xid(self, rx_packet: bytes) -> bytes:
-        """
-        Extracts XID from the incoming RPC packet.
-        """
-        xid = rx_packet[0x00:0x04]
-        return xid
-    
-    def generate_packet_size_header(self, size: int) -> bytes:
-        """Generates the header containing reply packet size.
-
-        :param size: size of the response payload
-        :type size: int
-        :return: the part of the header representing the size
-        :rtype: bytes
-        """
-        # 1... .... .... .... .... .... .... .... = Last Fragment: Yes
-        size = size | 0x80000000
-        # .000 0000 0000 0000 0000 0000 0001 1100 = Fragment Length: 28
-        res = self.uint_to_bytes(size)
-        return res
-    
-    def generate_resp_data(self, xid: bytes, resp: bytes, on_udp: bool = False) -> bytes:
-        """Generates the response data to be sent.
-
-        :param xid: XID of the RPC request
-        :type xid: bytes
-        :param resp: payload in the response
-        :type resp: bytes
-        :param on_udp: True for UDP
-        :type on_udp: bool
-        :return: response data to be sent
-        :rtype: bytes
-        """
-        # Generate RPC header
-        rpc_hdr = self.generate_rpc_header(xid)
-        if on_udp:
-            # Merge all the headers
-            resp_data = rpc_hdr + resp
-        else:
-            # Generate packet size header
-            data_size = len(rpc_hdr) + len(resp)
-            size_hdr = self.generate_packet_size_header(data_size)
-            # Merge all the headers
-            # debug: print(f"size_hdr: [{' '.join(format(x, '02x') for x in size_hdr)}]")
-            # debug: print(f"rpc_hdr: [{' '.join(format(x, '02x') for x in rpc_hdr)}]")
-            # debug: print(f"resp: [{' '.join(format(x, '02x') for x in resp)}]")
-            resp_data = size_hdr + rpc_hdr + resp
-        return resp_data    
-
-    def generate_rpc_header(self, xid: bytes) -> bytes:
-        """
-        Generates RPC header for replying to requests.
-        :param xid: XID of the RPC request
-        :type xid: bytes
-        :return: response header to be sent
-        :rtype: bytes        
-        """
-        hdr = b""
-
-        # XID: 0xXXXXXXXX (4 bytes)
-        hdr += xid
-        # Message Type: Reply (1)
-        hdr += b"\x00\x00\x00\x01"
-        # Reply State: accepted (0)
-        hdr += b"\x00\x00\x00\x00"
-        # Verifier
-        #  Flavor: AUTH_NULL (0)
-        hdr += b"\x00\x00\x00\x00"
-        #  Length: 0
-        hdr += b"\x00\x00\x00\x00"
-        # Accept State: RPC executed successfully (0)
-        hdr += b"\x00\x00\x00\x00"
-        return hdr
-
     # =========================================================================
     #   Helper functions
     # =========================================================================
@@ -213,30 +502,114 @@ class CommsObject(object):
         buf_str = ""
         for b in buf:
             buf_str += "0x%X " % ord(b)
-        print(buf_str)
+        log("%s", buf_str)
             
 
-class Portmapper(CommsObject, multiprocessing.Process):
-    """Port mapper "thread" class
+class RpcService(CommsObject):
+    """Base of the small RPC services that run next to the VXI-11 listener (port mapper, abort channel).
+
+    They run in the process of the VXI-11 server, and serve their sockets from one loop:
+    either a selector in a separate thread (see start()), or the asyncio event loop of the server (see attach()).
+    All sockets are non-blocking, so a slow TCP client cannot block the other requests.
+    """
+
+    def __init__(self, thread_name: str):
+        self.exit = threading.Event()
+        self.thread_name = thread_name
+        self.selector = None
+        self.thread = None
+        self.loop = None
+        # written to by terminate(), to stop the thread without waiting for the select timeout
+        self.wakeup = None
+
+    def open_sockets(self):
+        """
+        Creates the sockets, and registers their callbacks with add_reader().
+        """
+        raise NotImplementedError
+
+    def start(self):
+        """
+        Runs the service in a separate thread.
+        """
+        self.selector = selectors.DefaultSelector()
+        self.wakeup = socket.socketpair()
+        self.selector.register(self.wakeup[0], selectors.EVENT_READ, None)
+        self.open_sockets()
+        self.thread = threading.Thread(target=self.run, name=self.thread_name, daemon=True)
+        self.thread.start()
+
+    def attach(self, loop):
+        """Runs the service on an asyncio event loop.
+
+        :param loop: the event loop
+        :type loop: asyncio.AbstractEventLoop
+        """
+        self.loop = loop
+        self.open_sockets()
+
+    def run(self):
+        """
+        Run the main loop of the service
+        """
+        while not self.exit.is_set():
+            for key, _ in self.selector.select(PORTMAPPER_TCP_TIMEOUT):
+                if key.data is not None:
+                    key.data(key.fileobj)
+
+    def add_reader(self, sock: socket.socket, callback):
+        """Calls callback(sock) when sock is readable."""
+        if self.loop is not None:
+            self.loop.add_reader(sock, callback, sock)
+        else:
+            self.selector.register(sock, selectors.EVENT_READ, callback)
+
+    def remove_reader(self, sock: socket.socket):
+        if self.loop is not None:
+            self.loop.remove_reader(sock)
+        else:
+            self.selector.unregister(sock)
+
+    def terminate(self):
+        # not used normally, just in case the awgserver shuts down
+        if self.log_verbose:
+            log("%s: terminate()", self.myname)
+        self.exit.set()
+        if self.thread is not None:
+            self.wakeup[1].send(b"\0")
+            self.thread.join()
+            self.thread = None
+        if self.wakeup is not None:
+            for sock in self.wakeup:
+                sock.close()
+            self.wakeup = None
+        self.close_socket()
+
+    def close_socket(self):
+        raise NotImplementedError
+
+    def __del__(self):
+        self.close_socket()
+
+
+class Portmapper(RpcService):
+    """
+    Port mapper for UDP and TCP.
     """
     
-    def __init__(self, host: str, rpcbind_port: int, on_udp: bool, vxi11_port, log_verbose: bool):
+    def __init__(self, host: str, rpcbind_port: int, get_vxi11_port, log_verbose: bool):
         """init the port mapper.
-        It will start the portmapper in a separate process.
 
         :param host: host
         :type host: str
         :param rpcbind_port: port
         :type rpcbind_port: int
-        :param on_udp: True for UDP
-        :type on_udp: bool
-        :param vxi11_port: the port used by the VXI-11 service
-        :type vxi11_port: multiprocessing.Value
+        :param get_vxi11_port: function that returns the port currently used by the VXI-11 service
+        :type get_vxi11_port: Callable[[], int]
         :param log_verbose: True logging of the packets
         :type log_verbose: bool
         """
-        multiprocessing.Process.__init__(self)
-        self.exit = multiprocessing.Event()
+        super().__init__("portmapper")
 
         if host is not None:
             self.host = host
@@ -249,39 +622,26 @@ class Portmapper(CommsObject, multiprocessing.Process):
             self.rpcbind_port = rpcbind_port
         else:
             self.rpcbind_port = RPCBIND_PORT
-        self.on_udp = on_udp
-        self.vxi11_port = vxi11_port
-        self.myname = f"{'UDP' if on_udp else 'TCP'}Portmapper"
+        self.get_vxi11_port = get_vxi11_port
+        self.myname = "Portmapper"
         self.log_verbose = log_verbose
-        
-    def run(self):
+        self.udp_socket = None
+        self.tcp_socket = None
+        # TCP connections that did not send a complete request yet: connection -> (address, accept time, received data)
+        self.tcp_connections = {}
+        self.udp_reply = codec.ReplyTemplate(codec.GETPORT_RESP, on_udp=True)
+        self.tcp_reply = codec.ReplyTemplate(codec.GETPORT_RESP)
+
+    def open_sockets(self):
         """
-        Run the main loop of the mapper
+        Creates the RPCBIND sockets.
         """
-        try:
-            # Create RPCBIND socket
-            self.rpcbind_socket = self.create_socket(self.host, self.rpcbind_port, self.on_udp, self.myname)
-            
-            while not self.exit.is_set():
-                # VXI-11 requests are processed after receiving a valid RPCBIND request.
-                # print(f"{self.myname}: Waiting for connection request...")
-                if self.on_udp:
-                    res = self.process_rpcbind_request_udp()
-                else:
-                    res = self.process_rpcbind_request_tcp()
-                if res != OK:
-                    if self.log_verbose:
-                        print("Incompatible RPCBIND request.")
-        except KeyboardInterrupt:
-            pass                
-        # print(f"{self.myname}: shut down")
-    
-    def terminate(self):
-        # not used normally, just in case the awgserver shuts down
-        if self.log_verbose:
-            print(f"{self.myname}: terminate()")
-        self.exit.set()
-        multiprocessing.Process.terminate(self)
+        self.udp_socket = self.create_socket(self.host, self.rpcbind_port, True, "UDPPortmapper")
+        self.udp_socket.setblocking(False)
+        self.tcp_socket = self.create_socket(self.host, self.rpcbind_port, False, "TCPPortmapper")
+        self.tcp_socket.setblocking(False)
+        self.add_reader(self.udp_socket, self.process_rpcbind_request_udp)
+        self.add_reader(self.tcp_socket, self.accept_rpcbind_connection)
            
     def validate_rpcbind_request(self, address, rx_data: bytes, on_udp: bool):
         """Validates a RPC bind request and generates tthe reply
@@ -292,106 +652,276 @@ class Portmapper(CommsObject, multiprocessing.Process):
         :type rx_data: bytes
         :param on_udp: True for UDP
         :type on_udp: bool
-        :return: OK|NOT_GET_PORT_ERROR|NOT_VXI11_ERROR, response data
-        :rtype: int, bytes
+        :return: OK|NOT_GET_PORT_ERROR|NOT_VXI11_ERROR, response data as a list of buffers
+        :rtype: int, list
         """
+        myname = f"{'UDP' if on_udp else 'TCP'}Portmapper"
         if self.log_verbose:
-            print(f"{self.myname}: Incoming connection from {address[0]}:{address[1]}.")
+            log("%s: Incoming connection from %s:%s.", myname, address[0], address[1])
         # Validate the request.
         #  If the request is not GETPORT or does not come from VXI-11 Core (395183),
         #  we have nothing to do with it
         # If the request buffer is too small, also reject
-        if len(rx_data) > 0x2C:  # 0x2C = from get_program_id
-            procedure = self.get_procedure(rx_data)
-            if procedure != GET_PORT:
-                return NOT_GET_PORT_ERROR, None
-            program_id = self.get_program_id(rx_data)
-            if program_id != VXI11_CORE_ID:
-                return NOT_VXI11_ERROR, None
-            # Generate and send response
-            resp = self.generate_rpcbind_response()
-            xid = self.get_xid(rx_data)
-            resp_data = self.generate_resp_data(xid, resp, on_udp)            
-            return OK, resp_data
-        else:
+        call = codec.parse_rpc_call(rx_data)
+        if call is None:
             return NOT_VXI11_ERROR, None
-        
-    def process_rpcbind_request_tcp(self) -> int:
+        xid, _, _, procedure, offset = call
+        if procedure != GET_PORT:
+            return NOT_GET_PORT_ERROR, None
+        if len(rx_data) < offset + codec.PMAP_PARMS.size:
+            return NOT_VXI11_ERROR, None
+        program_id = codec.PMAP_PARMS.unpack_from(rx_data, offset)[0]
+        if program_id != VXI11_CORE_ID:
+            return NOT_VXI11_ERROR, None
+        # Generate and send response
+        template = self.udp_reply if on_udp else self.tcp_reply
+        resp_data = template.pack(xid, self.get_rpcbind_port(myname))
+        return OK, resp_data
+
+    def accept_rpcbind_connection(self, sock: socket.socket):
+        """Accepts a TCP connection. The request is processed when it has been received completely.
+
+        :param sock: the listening socket
+        :type sock: socket.socket
+        """
+        try:
+            connection, address = sock.accept()
+        except BlockingIOError:
+            return
+        connection.setblocking(False)
+        # Drop the connections of clients that never sent a complete request
+        now = time.monotonic()
+        for old, (_, accept_time, _) in list(self.tcp_connections.items()):
+            if now - accept_time > PORTMAPPER_TCP_TIMEOUT:
+                self.close_rpcbind_connection(old)
+        self.tcp_connections[connection] = (address, now, bytearray())
+        self.add_reader(connection, self.process_rpcbind_request_tcp)
+
+    def close_rpcbind_connection(self, connection: socket.socket):
+        self.remove_reader(connection)
+        del self.tcp_connections[connection]
+        connection.close()
+
+    def process_rpcbind_request_tcp(self, connection: socket.socket) -> int:
         """Replies to TCP RPCBIND/Portmap request and sends VXI-11 port number.
-        :return: OK|NOT_GET_PORT_ERROR|NOT_VXI11_ERROR
+        :return: OK|NOT_GET_PORT_ERROR|NOT_VXI11_ERROR, or None if the request is not complete yet
         :rtype: int
         """
         # RFC 1057 and RFC 1833 apply here. The scope uses V2, so RFC 1057 suffices.
 
-        connection, address = self.rpcbind_socket.accept()
-        rx_data = connection.recv(128)
-        if len(rx_data) > 4:
-            rx_data = rx_data[0x04:]  # start from XID, as with UDP
-        rv, resp_data = self.validate_rpcbind_request(address, rx_data, False)
+        address, _, rx_data = self.tcp_connections[connection]
+        try:
+            data = connection.recv(128)
+        except BlockingIOError:
+            return None
+        except OSError:
+            data = b""
+        rx_data += data
+        complete = len(rx_data) >= 4 and len(rx_data) >= 4 + (self.bytes_to_uint(rx_data[0:4]) & 0x7FFFFFFF)
+        if len(data) > 0 and not complete and len(rx_data) < PORTMAPPER_MAX_REQUEST_SIZE:
+            # wait for the rest of the request
+            return None
+        rv, resp_data = self.validate_rpcbind_request(address, rx_data[0x04:], False)  # start from XID, as with UDP
         if rv == OK:
-            connection.send(resp_data)
-        # Close connection and RPCBIND socket.
-        connection.close()
+            try:
+                codec.send_buffers(connection, resp_data)
+            except OSError:
+                pass
+        # Close connection.
+        self.close_rpcbind_connection(connection)
+        if rv != OK and self.log_verbose:
+            log("Incompatible RPCBIND request.")
         return rv
     
-    def process_rpcbind_request_udp(self):
+    def process_rpcbind_request_udp(self, sock: socket.socket):
         """Replies to UDP RPCBIND/Portmap request and sends VXI-11 port number.
         :return: OK|NOT_GET_PORT_ERROR|NOT_VXI11_ERROR
         :rtype: int
         """
         # RFC 1057 and RFC 1833 apply here. The scope uses V2, so RFC 1057 suffices.
         
-        bufferSize = 1024
-        bytesAddressPair = self.rpcbind_socket.recvfrom(bufferSize)
+        bufferSize = PORTMAPPER_MAX_REQUEST_SIZE
+        try:
+            bytesAddressPair = sock.recvfrom(bufferSize)
+        except OSError:
+            return None
 
         rx_data = bytesAddressPair[0]
         address = bytesAddressPair[1]
 
         rv, resp_data = self.validate_rpcbind_request(address, rx_data, True)
         if rv == OK:
-            self.rpcbind_socket.sendto(resp_data, address)
+            if hasattr(sock, "sendmsg"):
+                sock.sendmsg(resp_data, [], 0, address)
+            else:
+                # No sendmsg() on Windows
+                sock.sendto(b"".join(resp_data), address)
+        elif self.log_verbose:
+            log("Incompatible RPCBIND request.")
         return rv
     
-    def generate_rpcbind_response(self) -> bytes:
+    def get_rpcbind_port(self, myname: str) -> int:
         """Returns VXI-11 port number as response to RPCBIND request."""
-        # self.vxi11_port is a multiprocessing.Value object, that is a ctypes object in shared memory
-        # that is synchronized using RLock. So it always gets the latest value.
-        myport = self.vxi11_port.value
+        # The VXI-11 server runs in the same process, so this always gets the latest value.
+        myport = self.get_vxi11_port()
         if self.log_verbose:
-            print(f"{self.myname}: Sending to TCP port {myport}")
-        resp = self.uint_to_bytes(myport)
-        return resp
-    
-    def get_procedure(self, rx_packet: bytes) -> int:
+            log("%s: Sending to TCP port %s", myname, myport)
+        return myport
+        
+    def close_socket(self):
+        """
+        Closes RPCBIND sockets.
         """
-        Extracts procedure from the incoming RPC packet.
+        for connection in list(self.tcp_connections):
+            try:
+                self.close_rpcbind_connection(connection)
+            except:
+                pass
+        for sock in (self.udp_socket, self.tcp_socket):
+            try:
+                if self.loop is not None:
+                    self.loop.remove_reader(sock)
+                sock.close()
+            except:
+                pass
+        self.udp_socket = None
+        self.tcp_socket = None
+        if self.selector is not None:
+            self.selector.close()
+            self.selector = None
+
+
+class AbortChannel(RpcService):
+    """
+    The VXI-11 abort channel (program 395184). Clients connect to it once per link, on the port sent in the CREATE_LINK reply.
+    """
+
+    def __init__(self, host: str, port: int, abort_link, log_verbose: bool):
+        """init the abort channel.
+
+        :param host: host
+        :type host: str
+        :param port: port
+        :type port: int
+        :param abort_link: function that aborts the operation in progress on a link, and returns the VXI-11 error code
+        :type abort_link: Callable[[int], int]
+        :param log_verbose: True logging of the requests
+        :type log_verbose: bool
         """
-        return self.bytes_to_uint(rx_packet[0x14:0x18])
+        super().__init__("vxi11-abort")
+        self.host = host
+        self.port = port
+        self.abort_link = abort_link
+        self.myname = "VXI-11 abort"
+        self.log_verbose = log_verbose
+        self.tcp_socket = None
+        # connection -> (received data, reply templates)
+        self.connections = {}
 
-    def get_program_id(self, rx_packet: bytes) -> int:
+    def open_sockets(self):
         """
-        Extracts program_id from the incoming RPC packet.
+        Creates the abort channel socket.
         """
-        return self.bytes_to_uint(rx_packet[0x28:0x2C])
-        
-    def close_socket(self):
+        self.tcp_socket = self.create_socket(self.host, self.port, False, self.myname)
+        self.tcp_socket.setblocking(False)
+        self.add_reader(self.tcp_socket, self.accept_connection)
+
+    def accept_connection(self, sock: socket.socket):
+        try:
+            connection, address = sock.accept()
+        except BlockingIOError:
+            return
+        if self.log_verbose:
+            log("%s: Incoming connection from %s:%s.", self.myname, address[0], address[1])
+        connection.setblocking(False)
+        self.connections[connection] = (bytearray(), codec.Vxi11Replies())
+        self.add_reader(connection, self.process_requests)
+
+    def close_connection(self, connection: socket.socket):
+        self.remove_reader(connection)
+        del self.connections[connection]
+        connection.close()
+
+    def process_requests(self, connection: socket.socket):
         """
-        Closes RPCBIND socket.
+        Replies to the complete requests received on a connection. The connection stays open.
         """
+        rx_data, replies = self.connections[connection]
         try:
-            self.rpcbind_socket.close()
-        except:
-            pass
+            data = connection.recv(RX_BUFFER_SIZE)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if len(data) == 0 or len(rx_data) + len(data) > PORTMAPPER_MAX_REQUEST_SIZE:
+            self.close_connection(connection)
+            return
+        rx_data += data
+        while True:
+            record = codec.pop_record(rx_data)
+            if record is None:
+                return
+            resp_data = self.handle_request(record, replies)
+            if resp_data is None:
+                self.close_connection(connection)
+                return
+            try:
+                codec.send_buffers(connection, resp_data)
+            except OSError:
+                self.close_connection(connection)
+                return
+
+    def handle_request(self, record: bytes, replies: codec.Vxi11Replies):
+        """Handles one request of the abort channel.
+
+        :return: the response data to be sent as a list of buffers, or None if the connection must be dropped
+        :rtype: list
+        """
+        call = codec.parse_rpc_call(record)
+        if call is None:
+            return None
+        xid, program_id, _, procedure, offset = call
+        if program_id != VXI11_ABORT_ID:
+            return None
+        if procedure != DEVICE_ABORT:
+            return replies.proc_unavail_reply(xid)
+        if len(record) < offset + codec.DEVICE_LINK.size:
+            return None
+        link_id = codec.DEVICE_LINK.unpack_from(record, offset)[0]
+        if self.log_verbose:
+            log("%s: device_abort on link %s", self.myname, link_id)
+        return replies.device_error_reply(xid, self.abort_link(link_id))
+
+    def close_socket(self):
+        """
+        Closes the abort channel sockets.
+        """
+        for connection in list(self.connections):
+            try:
+                self.close_connection(connection)
+            except:
+                pass
+        if self.tcp_socket is not None:
+            try:
+                if self.loop is not None:
+                    self.loop.remove_reader(self.tcp_socket)
+                self.tcp_socket.close()
+            except:
+                pass
+            self.tcp_socket = None
+        if self.selector is not None:
+            self.selector.close()
+            self.selector = None
 
-    def __del__(self):
-        self.close_socket()    
-    
 
 class AwgServer(CommsObject):
 
     def __init__(self, awg, host: str = None, rpcbind_port: int = None, 
                  vxi11_portrange_start: int = None, vxi11_portrange_end: int = None, 
-                 log_VXI: bool = False, log_mapping: bool = False, runonce: bool = False):
+                 log_VXI: bool = False, log_mapping: bool = False, runonce: bool = False, log_commands: bool = False,
+                 link_mode: linkMode = linkMode.LINK_AUTO, abort_port: int = None,
+                 write_behind: bool = False, barriers=DEFAULT_BARRIERS,
+                 parse_cache_size: int = PARSE_CACHE_SIZE):
         if host is not None:
             self.host = host
         else:
@@ -418,41 +948,212 @@ class AwgServer(CommsObject):
         else:
             self.vxi11_portrange_end = VXI11_PORTRANGE_END
 
-        self.vxi11_port = multiprocessing.Value('I', self.vxi11_portrange_start)
+        self.vxi11_port = self.vxi11_portrange_start
+
+        if not isinstance(abort_port, (int, type(None))):
+            raise TypeError("abort_port must be an integer.")
+        if abort_port is not None:
+            self.abort_port = abort_port
+        else:
+            self.abort_port = VXI11_ABORT_PORT
             
         if awg is None or not isinstance(awg, BaseAWG):
             raise TypeError("awg variable must be of AWG class.")
         self.awg = awg
         self.myname = "VXI-11"
-        self.pm1 = None
-        self.pm2 = None
+        self.lxi_sockets = {}
+        self.lxi_selector = None
+        self.portmapper = None
+        self.abort_channel = None
+        # the links of all connections: link id -> LxiLink
+        self.links = {}
+        self.next_link_id = 0
+        # protects the link table and the advertised port
+        self.link_table_lock = threading.Lock()
+        self.arbiter = DeviceArbiter()
+        # the sessionType of each connection that is closed
+        self.results = queue.Queue()
+        # written to when a result is queued, to wake up the main loop
+        self.wakeup = None
+        self.session_started = False
         self.log_VXI = log_VXI
         self.log_mapping = log_mapping
+        self.log_commands = log_commands
         self.runonce = runonce
+        self.request_stats = RequestStats()
+        self.link_mode = link_mode
+        # hosts that were seen keeping their link open (in auto link mode)
+        self.persistent_clients = set()
+        self.write_behind = write_behind
+        self.barriers = barriers
+        self.parse_cache_size = parse_cache_size
+        self.parser = None
+        # the write-behind queue, if write_behind is set
+        self.commands = None
             
     def start(self):
         """
         Makes all required initializations and starts the server.
         """
 
-        print("Starting AWG server...")
+        log("Starting AWG server...")
         
+        self.start_portmappers()
+        self.abort_channel = self.create_abort_channel()
+        self.abort_channel.start()
+        # Create VXI-11 sockets
+        self.open_lxi_sockets()
+        self.lxi_selector = selectors.DefaultSelector()
+        for port, sock in self.lxi_sockets.items():
+            self.lxi_selector.register(sock, selectors.EVENT_READ, port)
+        self.wakeup = socket.socketpair()
+        self.lxi_selector.register(self.wakeup[0], selectors.EVENT_READ, None)
+
+        self.create_parser()
+
+        # Run the server
+        self.main_loop()
+
+    def create_parser(self):
+        """
+        Initializes the SCPI command parser, and the write-behind queue if it is used.
+        """
+        self.parser = CommandParser(self.awg, self.parse_cache_size, self.log_commands)
+        if self.write_behind:
+            self.commands = WriteBehindQueue(self.parser, self.barriers)
+
+    def disconnect_awg(self):
+        """
+        Executes the queued commands, if any, stops the software sweeps and disconnects from the external AWG.
+        """
+        if self.commands is not None:
+            self.commands.close()
+            self.commands = None
+        if self.parser is not None:
+            self.parser.stop_software_sweeps()
+        self.awg.disconnect()
+
+    def start_portmappers(self):
+        """
+        Starts the port mapper on UDP and TCP, in a separate thread.
+        """
         if self.log_mapping:
-            print(f"Portmapper: Listening to UDP and TCP ports on {self.host}:{self.rpcbind_port}")
-        self.pm1 = Portmapper(self.host, self.rpcbind_port, True, self.vxi11_port, self.log_mapping)
-        self.pm1.start()
-        self.pm2 = Portmapper(self.host, self.rpcbind_port, False, self.vxi11_port, self.log_mapping)
-        self.pm2.start()
-        # Create VXI-11 socket
+            log("Portmapper: Listening to UDP and TCP ports on %s:%s", self.host, self.rpcbind_port)
+        self.portmapper = Portmapper(self.host, self.rpcbind_port, self.get_vxi11_port, self.log_mapping)
+        self.portmapper.start()
+
+    def create_abort_channel(self) -> AbortChannel:
+        """
+        Creates the VXI-11 abort channel. It is started by the server engine.
+        """
         if self.log_mapping:
-            print(f"{self.myname}: Listening to TCP port {self.host}:{self.vxi11_port.value}")
-        self.lxi_socket = self.create_socket(self.host, self.vxi11_port.value, False, self.myname)
+            log("%s: Abort channel on TCP port %s:%s", self.myname, self.host, self.abort_port)
+        return AbortChannel(self.host, self.abort_port, self.abort_link, self.log_VXI)
 
-        # Initialize SCPI command parser
-        self.parser = CommandParser(self.awg)
+    def abort_link(self, link_id: int) -> int:
+        """Called by the abort channel.
+        The AWG commands are short, and are not interrupted.
+        So there is never an operation in progress that can be stopped: the abort is only acknowledged.
 
-        # Run the server
-        self.main_loop()
+        :param link_id: the link id
+        :type link_id: int
+        :return: the VXI-11 error code
+        :rtype: int
+        """
+        if link_id not in self.links:
+            return INVALID_LINK_IDENTIFIER
+        return NO_ERROR
+
+    def create_link(self, session: LxiSession, device: str) -> LxiLink:
+        """
+        Creates a link, with a link id that is unique within the server.
+        """
+        with self.link_table_lock:
+            link_id = self.next_link_id
+            self.next_link_id = (link_id + 1) & 0x7FFFFFFF
+            link = LxiLink(link_id, session, device)
+            self.links[link_id] = link
+            session.links[link_id] = link
+        return link
+
+    def get_link(self, link_id: int, session: LxiSession) -> LxiLink:
+        """
+        Returns the link with that id, if it was created on this connection. None otherwise.
+        """
+        link = self.links.get(link_id)
+        if link is None or link.session is not session:
+            return None
+        return link
+
+    def destroy_link(self, link: LxiLink):
+        """
+        Removes a link, and releases its device lock.
+        """
+        self.arbiter.release(link.link_id)
+        if self.commands is not None:
+            # an error of the driver that was not reported was logged, and is not kept for a link that is gone
+            self.commands.take_error(link.link_id)
+        with self.link_table_lock:
+            self.links.pop(link.link_id, None)
+            link.session.links.pop(link.link_id, None)
+
+    def close_session(self, session: LxiSession):
+        """
+        Destroys the links that are left when a connection is closed.
+        """
+        for link in list(session.links.values()):
+            self.destroy_link(link)
+        self.move_port_after(session)
+
+    def move_port_after(self, session: LxiSession):
+        """Moves the advertised port once the link of a session is done,
+        as every link must go to a new socket (as SDS800X-HD requires).
+        Not for persistent sessions, they keep their port.
+
+        :param session: the session
+        :type session: LxiSession
+        """
+        if session.persistent or session.port_moved:
+            return
+        session.port_moved = True
+        with self.link_table_lock:
+            self.next_vxi11_port()
+
+    def get_vxi11_port(self) -> int:
+        """
+        Returns the VXI-11 port that is advertised by the port mapper.
+        """
+        return self.vxi11_port
+
+    def open_lxi_sockets(self):
+        """
+        Opens all VXI-11 ports of the range up front, so that moving to the next port
+        does not require closing and binding sockets between two requests.
+        """
+        for port in range(self.vxi11_portrange_start, self.vxi11_portrange_end + 1):
+            self.lxi_sockets[port] = self.create_socket(self.host, port, False, self.myname)
+        if self.log_mapping:
+            log("%s: Listening to TCP ports %s:%s-%s", self.myname, self.host, self.vxi11_portrange_start, self.vxi11_portrange_end)
+
+    def next_vxi11_port(self):
+        """
+        Moves the advertised VXI-11 port to the next port in the range.
+        """
+        if self.vxi11_port >= self.vxi11_portrange_end:
+            self.vxi11_port = self.vxi11_portrange_start
+        else:
+            self.vxi11_port += 1
+        if self.log_mapping:
+            log("%s: moving to TCP port %s", self.myname, self.vxi11_port)
+
+    def print_session_summary(self):
+        """
+        Prints the request latencies and the parse cache use of the session that just ended, and resets them.
+        """
+        cache_summary = self.parser.cache_summary() if self.parser is not None else ""
+        if self.log_VXI and self.request_stats.counts:
+            log("%s: Session summary:\n%s\n%s", self.myname, self.request_stats.summary(), cache_summary)
+        self.request_stats.reset()
 
     def main_loop(self):
         """
@@ -460,277 +1161,449 @@ class AwgServer(CommsObject):
         """
 
         # Run the VXI-11 server
-        session_started = False
         while True:
             # if self.log_mapping:
             #     print("Waiting for LXI request.")
             
             timeout = 0
-            if session_started:
+            if self.session_started:
                 timeout = END_OF_SESSION_TIMEOUT
             session_result = self.process_lxi_requests(timeout)
-            if self.runonce and session_result == sessionType.SESSION_STARTED:
-                if self.log_mapping:
-                    print(f"{self.myname}: Session started.")
-                session_started = True
-            
-            # every request must go to a new socket (as SDS800X-HD requires)
-            self.close_lxi_sockets()
-            if session_result == sessionType.SESSION_ERROR:
-                # If there was an error, we can stop the server
-                if self.log_mapping:
-                    print(f"{self.myname}: Session ended with an error. Stopping server.")
+            if self.session_done(session_result):
                 break
             
-            self.vxi11_port.value += 1
-            if self.vxi11_port.value > self.vxi11_portrange_end:
-                self.vxi11_port.value = self.vxi11_portrange_start
-                
+        # Disconnect from the external AWG
+        self.disconnect_awg()
+
+    def session_done(self, session_result: sessionType) -> bool:
+        """Handles the result of a connection that is closed, or the timeout of the session.
+
+        :param session_result: the result
+        :type session_result: sessionType
+        :return: True when the server must stop
+        :rtype: bool
+        """
+        if self.runonce and session_result == sessionType.SESSION_STARTED:
             if self.log_mapping:
-                print(f"{self.myname}: moving to TCP port {self.vxi11_port.value}")
-            self.lxi_socket = self.create_socket(self.host, self.vxi11_port.value, False, self.myname)
+                log("%s: Session started.", self.myname)
+            self.session_started = True
+        
+        if session_result == sessionType.SESSION_ERROR:
+            # If there was an error, we can stop the server
+            if self.log_mapping:
+                log("%s: Session ended with an error. Stopping server.", self.myname)
+            return True
+        
+        if session_result in (sessionType.SESSION_ENDED, sessionType.SESSION_TIMEOUT):
+            self.print_session_summary()
 
-            if self.runonce and session_result in (sessionType.SESSION_ENDED, sessionType.SESSION_TIMEOUT):
-                # If we run only once, and the session is ended, we can stop the server
-                if self.log_mapping:
-                    print(f"{self.myname}: Session ended. Stopping server.")
-                break
-            
-        # This code will never be reached
-        # Disconnect from the external AWG
-        self.awg.disconnect()
+        if self.runonce and session_result in (sessionType.SESSION_ENDED, sessionType.SESSION_TIMEOUT):
+            # If we run only once, and the session is ended, we can stop the server
+            if self.log_mapping:
+                log("%s: Session ended. Stopping server.", self.myname)
+            return True
+        return False
 
     def process_lxi_requests(self, timeout: int = 0) -> sessionType:
-        # Will the type of session we just handled
+        """Accepts connections until one of them is closed. Each connection is served by its own thread.
+
+        :param timeout: the maximum time to wait, in seconds. 0 means no timeout.
+        :type timeout: int
+        :return: the type of session handled on the connection that was closed
+        :rtype: sessionType
+        """
         # The start of the session is indicated by the CREATE_LINK request,
         # The end of the session is indicated by the DESTROY_LINK request, after an "OUTP OFF" command
-        start_of_session = False
-        end_of_session = False
+        deadline = None
         if timeout > 0:
-            self.lxi_socket.settimeout(10.0)  # Set a timeout for the socket to avoid blocking indefinitely
-        else:
-            self.lxi_socket.settimeout(None)
-        try:
-            connection, address = self.lxi_socket.accept()  # type: ignore
-        except socket.timeout:
-            # If no connection is received within the timeout, return to the main loop
-            return sessionType.SESSION_TIMEOUT
-        except socket.error as e:
-            # If there is a socket error, print it and return to the main loop
-            if self.log_VXI:
-                print(f"{self.myname}: Socket error: {e}")
-            return sessionType.SESSION_ERROR
+            deadline = time.monotonic() + timeout
         while True:
-            rx_buf = connection.recv(255)
-            if len(rx_buf) > 0:
-                resp = b''  # default
-                
-                # Parse incoming VXI-11 command
-                status, vxi11_procedure, scpi_command, cmd_length = self.parse_lxi_request(rx_buf)
-
-                if status == NOT_VXI11_ERROR:
-                    if self.log_VXI:
-                        print("Received VXI-11 request from an unknown source.")
-                    break
-                elif status == UNKNOWN_COMMAND_ERROR:
-                    if self.log_VXI:
-                        print("Unknown VXI-11 request received. Procedure id %s" % (vxi11_procedure))
-                    break
-
+            try:
+                return self.results.get_nowait()
+            except queue.Empty:
+                pass
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    # If no connection is closed within the timeout, return to the main loop
+                    return sessionType.SESSION_TIMEOUT
+            try:
+                for key, _ in self.lxi_selector.select(remaining):
+                    if key.data is None:
+                        # a connection was closed
+                        key.fileobj.recv(RX_BUFFER_SIZE)
+                        continue
+                    connection, address = key.fileobj.accept()
+                    thread = threading.Thread(target=self.serve_lxi_connection, args=(connection, address),
+                                              name=f"vxi11-{address[0]}:{address[1]}", daemon=True)
+                    thread.start()
+            except socket.error as e:
+                # If there is a socket error, print it and return to the main loop
                 if self.log_VXI:
-                    print("VXI-11 %s, SCPI command: %s" % (LXI_PROCEDURES[vxi11_procedure], scpi_command))
-
-                # Process the received VXI-11 request
-                if vxi11_procedure == CREATE_LINK:
-                    resp = self.generate_lxi_create_link_response()
-
-                elif vxi11_procedure == DEVICE_WRITE:
-                    """
-                    The parser parses and executes the received SCPI command.
-                    VXI-11 DEVICE_WRITE function requires an empty reply.
-                    """
-                    if scpi_command is None:
-                        scpi_command = ""
-                    if "outp off" in scpi_command.lower():
-                        # If the command is OUTP OFF, we should end the session
-                        end_of_session = True
-                    if "outp on" in scpi_command.lower():
-                        # If the command is OUTP ON, we have the start of the session
-                        start_of_session = True                    
-                    self.parser.parse_scpi_command(scpi_command)
-                    resp = self.generate_lxi_device_write_response(cmd_length)
-
-                elif vxi11_procedure == DEVICE_READ:
-                    """
-                    DEVICE_READ request is sent to a device when an answer after
-                    command execution is expected. SDG1000X-E sends this request
-                    in two cases:
-                        a.  It requests the ID of the AWG (*IDN? command).
-                            In this case we MUST supply a valid ID to make
-                            the scope think that it is working with a genuine
-                            Siglent AWG.
-                        b.  After setting all the parameters of the AWG and
-                            before starting frequency sweep (C1:BSWV? command).
-                            It looks like the scope is supposed to verify that
-                            all the required AWG settings were set correctly.
-                        In the real life it seems that in the second case the scope
-                        totally ignores the response and will accept any garbage.
-                        It makes our life easy and we send AWG ID as reply
-                        to any DEVICE_READ request.
-                    """
-                    resp = self.generate_lxi_idn_response(AWG_ID_STRING)
-
-                elif vxi11_procedure == DESTROY_LINK:
-                    """
-                    If DESTROY_LINK is received, the requester ends the session
-                    opened by CREATE_LINK request and won't send any commands before
-                    issuing a new CREATE_LINK request.
-                    All we have to do is to exit the loop and continue listening to
-                    RPCBIND requests.
-                    """
-                    resp = self.generate_lxi_destroy_link_response()
+                    log("%s: Socket error: %s", self.myname, e)
+                return sessionType.SESSION_ERROR
 
-                else:
-                    """
-                    If the received command is none of the above, something
-                    went wrong and we should exit the loop and continue
-                    listening to RPCBIND requests.
-                    """
-                    break
+    def serve_lxi_connection(self, connection: socket.socket, address):
+        """Handles the requests of one VXI-11 connection, until it is closed.
+        The result is queued for the main loop.
 
-                # Generate and send response
-                xid = self.get_xid(rx_buf[0x04:])
-                resp_data = self.generate_resp_data(xid, resp, False)
-                connection.send(resp_data)
-                
-                if vxi11_procedure == DESTROY_LINK:
+        :param connection: the connection
+        :type connection: socket.socket
+        :param address: the address of the client
+        :type address: _RetAddress
+        """
+        session = self.create_session(address)
+        reader = RpcRecordReader(connection)
+        try:
+            while not session.done():
+                rx_buf = reader.read_record()
+                if rx_buf is None:
+                    # The peer closed the connection without a DESTROY_LINK
+                    break
+                resp_data = self.handle_lxi_request(rx_buf, session)
+                if resp_data is None:
                     break
+                codec.send_buffers(connection, resp_data)
+        except OSError as e:
+            if self.log_VXI:
+                log("%s: Socket error: %s", self.myname, e)
+        except Exception as ex:
+            log("%s: Connection of %s failed: %s", self.myname, address[0], ex)
+        finally:
+            # Close connection
+            connection.close()
+            self.close_session(session)
+            self.results.put(session.result())
+            try:
+                self.wakeup[1].send(b"\0")
+            except OSError:
+                # the server is stopping
+                pass
 
-        # Close connection
-        connection.close()
-        if end_of_session:
-            return sessionType.SESSION_ENDED
-        elif start_of_session:
-            return sessionType.SESSION_STARTED
+    def create_session(self, address) -> LxiSession:
+        """Creates the state of a new VXI-11 connection.
+        In auto link mode, clients that were seen keeping their link open get a persistent connection from the start.
+
+        :param address: the address of the client
+        :type address: _RetAddress
+        :return: the session
+        :rtype: LxiSession
+        """
+        if self.link_mode == linkMode.LINK_PERSISTENT:
+            persistent = True
+        elif self.link_mode == linkMode.LINK_AUTO:
+            persistent = address[0] in self.persistent_clients
         else:
-            return sessionType.SESSION_ONGOING
+            persistent = False
+        return LxiSession(address, persistent)
+
+    def detect_persistent_client(self, session: LxiSession, link: LxiLink):
+        """Switches the session to a persistent connection when its client sends more than one command per link.
+        Scopes that need port hopping send only one command per link.
+
+        :param session: the session
+        :type session: LxiSession
+        :param link: the link the command was sent on
+        :type link: LxiLink
+        """
+        if self.link_mode != linkMode.LINK_AUTO or session.persistent or link.writes < 2:
+            return
+        session.persistent = True
+        self.persistent_clients.add(session.address[0])
+        if self.log_mapping:
+            log("%s: %s keeps its links open, using persistent links for it.", self.myname, session.address[0])
 
+    def error_reply(self, replies: codec.Vxi11Replies, xid: int, procedure: int, error: int) -> list:
+        """
+        Generates the reply to a request that failed, in the format of the procedure.
+        """
+        if procedure == DEVICE_WRITE:
+            return replies.device_write_reply(xid, error, 0)
+        elif procedure == DEVICE_READ:
+            return replies.device_read_reply(xid, error, 0, b"")
+        elif procedure == DEVICE_READSTB:
+            return replies.device_readstb_reply(xid, error, 0)
+        elif procedure == DEVICE_DOCMD:
+            return replies.device_docmd_reply(xid, error, b"")
+        return replies.device_error_reply(xid, error)
+
+    def handle_lxi_request(self, rx_buf, session: "LxiSession"):
+        """Handles one VXI-11 request and generates the reply.
+        This is independent of the way the request was received, so that all server engines can use it.
+
+        :param rx_buf: the received RPC record, without the record mark
+        :type rx_buf: bytes or memoryview
+        :param session: the state of the connection the request was received on
+        :type session: LxiSession
+        :return: the response data to be sent as a list of buffers, or None if the connection must be dropped
+        :rtype: list
+        """
+        t_start = time.perf_counter()
+
+        # Parse incoming VXI-11 command
+        status, vxi11_procedure, scpi_command, cmd_length, args, block = self.parse_lxi_request(rx_buf)
+
+        if status == NOT_VXI11_ERROR:
+            if self.log_VXI:
+                log("Received VXI-11 request from an unknown source.")
+            return None
+
+        xid = codec.get_xid(rx_buf)
+        replies = session.replies
+        if status == UNKNOWN_COMMAND_ERROR:
+            # Tell the client, instead of dropping the connection and making it reconnect
+            if self.log_VXI:
+                log("Unknown VXI-11 request received. Procedure id %s", vxi11_procedure)
+            return replies.proc_unavail_reply(xid)
+
+        if self.log_VXI:
+            log("VXI-11 %s, SCPI command: %s", LXI_PROCEDURES[vxi11_procedure], scpi_command)
+            if block is not None:
+                log("VXI-11 %s, binary block of %s bytes", LXI_PROCEDURES[vxi11_procedure], len(block))
+
+        # Process the received VXI-11 request
+        link = None
+        if vxi11_procedure not in (CREATE_LINK, CREATE_INTR_CHAN, DESTROY_INTR_CHAN):
+            # All other procedures start with the link id
+            link = self.get_link(args[0], session)
+            if link is None:
+                return self.error_reply(replies, xid, vxi11_procedure, INVALID_LINK_IDENTIFIER)
+
+        if vxi11_procedure == CREATE_LINK:
+            _, lock_device, lock_timeout, _ = args
+            link = self.create_link(session, scpi_command)
+            error = NO_ERROR
+            if lock_device:
+                error = self.arbiter.lock(link.link_id, True, lock_timeout)
+            if error != NO_ERROR:
+                self.destroy_link(link)
+                resp_data = replies.create_link_reply(xid, error, 0, 0, 0)
+            else:
+                # a persistent connection may carry a new link after DESTROY_LINK
+                session.closed = False
+                session.port_moved = False
+                resp_data = replies.create_link_reply(xid, NO_ERROR, link.link_id, self.abort_port, MAX_RECEIVE_SIZE)
+
+        elif vxi11_procedure == DEVICE_WRITE:
+            """
+            The parser parses and executes the received SCPI command.
+            In write-behind mode, the command is queued instead, unless it is a barrier.
+            A failure of the driver on a barrier, or on a queued command of the link that was not reported yet,
+            is reported as an I/O error.
+            A binary block (WVDT) is given to the parser as a slice of the received record.
+            VXI-11 DEVICE_WRITE function requires an empty reply.
+            """
+            _, _, lock_timeout, flags, _ = args
+            error = self.arbiter.acquire(link.link_id, flags & FLAG_WAITLOCK, lock_timeout)
+            if error != NO_ERROR:
+                return self.error_reply(replies, xid, vxi11_procedure, error)
+            try:
+                if scpi_command is None:
+                    scpi_command = ""
+                if "outp off" in scpi_command.lower():
+                    # If the command is OUTP OFF, we should end the session
+                    session.end_of_session = True
+                if "outp on" in scpi_command.lower():
+                    # If the command is OUTP ON, we have the start of the session
+                    session.start_of_session = True
+                if self.commands is not None:
+                    reply = self.commands.put(scpi_command, block, link.link_id)
+                else:
+                    reply = self.parser.parse_scpi_command(scpi_command, block)
+            except Exception as ex:
+                # A bad command or a failing AWG must not end the connection: the client gets an I/O error
+                log("%s: SCPI command \"%s\" failed: %s", self.myname, scpi_command, ex)
+                return self.error_reply(replies, xid, vxi11_procedure, IO_ERROR)
+            finally:
+                self.arbiter.done()
+            if reply is not None:
+                link.reply = reply.encode() + b"\n"
+            link.writes += 1
+            self.detect_persistent_client(session, link)
+            resp_data = replies.device_write_reply(xid, NO_ERROR, cmd_length)
+
+        elif vxi11_procedure == DEVICE_READ:
+            """
+            DEVICE_READ request is sent to a device when an answer after
+            command execution is expected. SDG1000X-E sends this request
+            in two cases:
+                a.  It requests the ID of the AWG (*IDN? command).
+                    In this case we MUST supply a valid ID to make
+                    the scope think that it is working with a genuine
+                    Siglent AWG.
+                b.  After setting all the parameters of the AWG and
+                    before starting frequency sweep (C1:BSWV? command).
+                    It looks like the scope is supposed to verify that
+                    all the required AWG settings were set correctly.
+                In the real life it seems that in the second case the scope
+                totally ignores the response and will accept any garbage.
+            The parser answers the queries from the settings made by the previous commands,
+            so that other VISA clients get correct replies too. The reply is kept by the link.
+            If there is no reply (no query, or an unknown one), the AWG ID is sent.
+            A reply longer than the request size of the client is sent in several reads:
+            each sends at most that many bytes, and only the last one has the END reason.
+            The AWG is not used, so reads of several links run in parallel.
+            In write-behind mode, the read waits until the queued commands are executed,
+            and a failure of one of them on this link that was not reported yet is reported as an I/O error.
+            """
+            _, request_size, _, lock_timeout, flags, _ = args
+            error = self.arbiter.check(link.link_id, flags & FLAG_WAITLOCK, lock_timeout)
+            if error != NO_ERROR:
+                return self.error_reply(replies, xid, vxi11_procedure, error)
+            if self.commands is not None and self.commands.sync(link.link_id) is not None:
+                return self.error_reply(replies, xid, vxi11_procedure, IO_ERROR)
+            reply = link.reply if link.reply is not None else AWG_ID_REPLY
+            if len(reply) > request_size:
+                # the rest is sent by the next reads
+                link.reply = reply[request_size:]
+                resp_data = replies.device_read_reply(xid, NO_ERROR, REASON_REQCNT, reply[:request_size])
+            else:
+                link.reply = None
+                resp_data = replies.device_read_reply(xid, NO_ERROR, REASON_END, reply)
+
+        elif vxi11_procedure == DESTROY_LINK:
+            """
+            If DESTROY_LINK is received, the requester ends the session
+            opened by CREATE_LINK request and won't send any commands before
+            issuing a new CREATE_LINK request.
+            All we have to do is to exit the loop and continue listening to
+            RPCBIND requests. Persistent connections stay open for the next link.
+            The advertised port moves before the reply is sent,
+            so that the next portmapper request of the client gets the new port.
+            """
+            self.destroy_link(link)
+            if not session.links:
+                session.closed = True
+                self.move_port_after(session)
+            resp_data = replies.device_error_reply(xid, NO_ERROR)
+
+        elif vxi11_procedure in (DEVICE_READSTB, DEVICE_TRIGGER, DEVICE_CLEAR, DEVICE_REMOTE, DEVICE_LOCAL):
+            """
+            The emulated AWG has no pending events and never requests service.
+            There is nothing to trigger, and no input or output buffer to clear:
+            every command is executed when it is received.
+            Remote and local state do not apply to the emulated AWG.
+            """
+            _, flags, lock_timeout, _ = args
+            error = self.arbiter.check(link.link_id, flags & FLAG_WAITLOCK, lock_timeout)
+            if vxi11_procedure == DEVICE_READSTB:
+                resp_data = replies.device_readstb_reply(xid, error, 0)
+            else:
+                resp_data = replies.device_error_reply(xid, error)
+
+        elif vxi11_procedure == DEVICE_LOCK:
+            _, flags, lock_timeout = args
+            resp_data = replies.device_error_reply(xid, self.arbiter.lock(link.link_id, flags & FLAG_WAITLOCK, lock_timeout))
+
+        elif vxi11_procedure == DEVICE_UNLOCK:
+            resp_data = replies.device_error_reply(xid, self.arbiter.unlock(link.link_id))
+
+        elif vxi11_procedure == DEVICE_ENABLE_SRQ:
+            link.srq_enabled = args[1] != 0
+            resp_data = replies.device_error_reply(xid, NO_ERROR)
+
+        elif vxi11_procedure == DEVICE_DOCMD:
+            """
+            No device specific commands are supported.
+            """
+            resp_data = replies.device_docmd_reply(xid, OPERATION_NOT_SUPPORTED, b"")
+
+        elif vxi11_procedure == CREATE_INTR_CHAN:
+            """
+            The interrupt channel is only used to send service requests,
+            which the emulated AWG never does. So it is never connected.
+            """
+            session.intr_channel = args
+            resp_data = replies.device_error_reply(xid, NO_ERROR)
+
+        else:  # DESTROY_INTR_CHAN
+            if session.intr_channel is None:
+                resp_data = replies.device_error_reply(xid, CHANNEL_NOT_ESTABLISHED)
+            else:
+                session.intr_channel = None
+                resp_data = replies.device_error_reply(xid, NO_ERROR)
+
+        duration = time.perf_counter() - t_start
+        self.request_stats.add(vxi11_procedure, duration)
+        if self.log_VXI:
+            log("%s: %s handled in %.3f ms", self.myname, LXI_PROCEDURES[vxi11_procedure], duration * 1000)
+        return resp_data
 
     def parse_lxi_request(self, rx_data):
         """Parses VXI-11 request. Returns VXI-11 command code and SCPI command if it exists.
-        @param rx_data: bytes array containing the source packet.
-        @return: a tuple with 3 values:
+        @param rx_data: bytes or memoryview containing the RPC record, without the record mark.
+                        The SCPI command is decoded directly from it, without intermediate copies.
+        @return: a tuple with 6 values:
                 1. status - is 0 if the request could be processed, error code otherwise.
                 2. VXI-11 procedure id if it is known, None otherwise.
                 3. string containing SCPI command if it exists in the request, in utf-8.
-                4. the length of the sent command, in bytes (needed for some replies)."""
+                4. the length of the sent command, in bytes (needed for some replies).
+                5. the arguments of the procedure (see LXI_ARGUMENTS), None if it is unknown.
+                6. the binary block at the end of the SCPI command, as a memoryview of rx_data, None if there is none.
+                   It is only valid until the next record is received."""
         # Validate source program id.
         #  If the request doesn't come from VXI-11 Core (395183), it is ignored.
-        program_id = self.bytes_to_uint(rx_data[0x10:0x14])
+        call = codec.parse_rpc_call(rx_data)
+        if call is None:
+            return (NOT_VXI11_ERROR, None, None, 0, None, None)
+        _, program_id, _, vxi11_procedure, offset = call
         if program_id != VXI11_CORE_ID:
-            return (NOT_VXI11_ERROR, None, None, 0)
+            return (NOT_VXI11_ERROR, None, None, 0, None, None)
 
-        # Procedure: CREATE_LINK (10), DESTROY_LINK (23), DEVICE_WRITE (11), DEVICE_READ (12)
-        vxi11_procedure = self.bytes_to_uint(rx_data[0x18:0x1c])
+        layout = LXI_ARGUMENTS.get(vxi11_procedure)
+        if layout is None:
+            return (UNKNOWN_COMMAND_ERROR, vxi11_procedure, None, 0, None, None)
+        if len(rx_data) < offset + layout.size:
+            return (NOT_VXI11_ERROR, None, None, 0, None, None)
+        args = layout.unpack_from(rx_data, offset)
+        offset += layout.size
+
+        # CREATE_LINK (device name) and DEVICE_WRITE (the command) end with their data
         scpi_command = None
-        status = OK
         cmd_length = 0
-
-        # Process the remaining data according to the received VXI-11 request
+        block = None
         if vxi11_procedure == CREATE_LINK:
-            cmd_length = self.bytes_to_uint(rx_data[0x38:0x3C])
-            scpi_command = rx_data[0x3C:0x3C + cmd_length]
+            cmd_length = args[-1]
+            scpi_command = str(rx_data[offset:offset + cmd_length], 'utf-8').strip()
         elif vxi11_procedure == DEVICE_WRITE:
-            cmd_length = self.bytes_to_uint(rx_data[0x3C:0x40])
-            scpi_command = rx_data[0x40:0x40 + cmd_length]
-        elif vxi11_procedure == DEVICE_READ:
-            pass
-        elif vxi11_procedure == DESTROY_LINK:
-            pass
-        else:
-            status = UNKNOWN_COMMAND_ERROR
-            if self.log_VXI:
-                print("Unknown VXI-11 command received. Code %s" % (vxi11_procedure))
-
-        if scpi_command is not None:
-            scpi_command = scpi_command.decode('utf-8').strip()
-        return (status, vxi11_procedure, scpi_command, cmd_length)
-
-    # =========================================================================
-    #   Response data generators
-    # =========================================================================
-
-    def generate_lxi_create_link_response(self):
-        """Generates reply to VXI-11 CREATE_LINK request."""
-        # VXI-11 response
-        #  Error Code: No Error (0)
-        resp = b"\x00\x00\x00\x00"
-        #  Link ID: 0
-        resp += b"\x00\x00\x00\x00"
-        #  Abort Port: 0
-        resp += b"\x00\x00\x00\x00"
-        #  Maximum Receive Size: 8388608=0x00800000
-        # resp += self.uint_to_bytes(8388608)
-        resp += b"\x00\x80\x00\x00"
-        return resp
-    
-    def generate_lxi_destroy_link_response(self):
-        """Generates reply to VXI-11 DESTROY_LINK request."""
-        # VXI-11 response
-        #  Error Code: No Error (0)
-        resp = b"\x00\x00\x00\x00"
-        return resp
-
-    def generate_lxi_device_write_response(self, cmd_length):
-        """Generates reply to VXI-11 DEVICE_WRITE request."""
-        # VXI-11 response
-        #  Error Code: No Error (0)
-        resp = b"\x00\x00\x00\x00"
-        #  Size: the size of the original command
-        resp += self.uint_to_bytes(cmd_length)
-        return resp        
-        
-    def generate_lxi_idn_response(self, id_string):
-        """Generates reply to VXI-11 DEVICE_READ request."""
-        # Error Code: No Error (0)
-        resp = b"\x00\x00\x00\x00"
-        # Reason: 0x00000004 (END)
-        resp += b"\x00\x00\x00\x04"
-        # Add the AWG id string
-        id_length = len(id_string) + 1
-        resp += self.uint_to_bytes(id_length)
-        resp += id_string
-        # The sequence ends with \n and two \0 fill bytes.
-        resp += b"\x0A\x00\x00"
-        return resp
+            cmd_length = args[-1]
+            scpi_command, block = split_binary_block(memoryview(rx_data)[offset:offset + cmd_length])
+        return (OK, vxi11_procedure, scpi_command, cmd_length, args, block)
 
     def close_lxi_sockets(self):
         """
-        Closes VXI-11 socket.
+        Closes VXI-11 sockets.
         """
         try:
-            if self.lxi_socket:
+            if self.wakeup:
+                for sock in self.wakeup:
+                    sock.close()
+                self.wakeup = None
+            if self.lxi_selector:
+                self.lxi_selector.close()
+                self.lxi_selector = None
+            if self.lxi_sockets:
                 if self.log_VXI:
-                    print(f"{self.myname}: Closing LXI socket.")        
-                self.lxi_socket.close()
-                self.lxi_socket = None
+                    log("%s: Closing LXI sockets.", self.myname)        
+                for sock in self.lxi_sockets.values():
+                    sock.close()
+                self.lxi_sockets = {}
         except:
             if self.log_VXI:
-                print(f"{self.myname}: Closing LXI socket failed.")        
+                log("%s: Closing LXI sockets failed.", self.myname)        
             pass
 
     def close_sockets(self):
         if self.log_VXI:
-            print(f"{self.myname}: Closing all sockets.")           
+            log("%s: Closing all sockets.", self.myname)           
         self.close_lxi_sockets()
-        if self.pm1:
-            self.pm1.terminate()
-            del self.pm1
-            self.pm1 = None
-        if self.pm2:
-            self.pm2.terminate()
-            del self.pm2
-            self.pm2 = None
+        if self.portmapper:
+            self.portmapper.terminate()
+            self.portmapper = None
+        if self.abort_channel:
+            self.abort_channel.terminate()
+            self.abort_channel = None
         
     def __del__(self):
         self.close_sockets()
@@ -0,0 +1,150 @@
+'''
+Created on Oct 17, 2026
+
+@author: hb020
+
+
+This file contains an asyncio based engine for the VXI-11 listener.
+
+The VXI-11 listeners, the connections and the session timeouts all run on one event loop.
+The requests are handled in a pool of worker threads, in the order they arrive on each connection,
+so a slow AWG never stalls the network side. The DeviceArbiter gives the links access to the AWG
+one request at a time, as with the blocking engine.
+
+The port hopping behaviour and the link modes are the same as with the blocking engine
+(as SDS800X-HD requires). As with the blocking engine, all ports of the range are listening from the start.
+
+The port mapper and the abort channel run on the same event loop.
+
+'''
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from awgdrivers.log_writer import log
+from awg_server import AwgServer, Portmapper, sessionType, END_OF_SESSION_TIMEOUT, MAX_RECORD_SIZE, MAX_LINK_THREADS
+
+
+class AsyncAwgServer(AwgServer):
+    """
+    VXI-11 server that handles the network side on an asyncio event loop.
+    """
+
+    def start(self):
+        """
+        Makes all required initializations and starts the server.
+        """
+
+        log("Starting AWG server (asyncio engine)...")
+
+        if self.log_mapping:
+            log("Portmapper: Listening to UDP and TCP ports on %s:%s", self.host, self.rpcbind_port)
+        self.portmapper = Portmapper(self.host, self.rpcbind_port, self.get_vxi11_port, self.log_mapping)
+        self.abort_channel = self.create_abort_channel()
+
+        self.create_parser()
+        # The requests are handled in worker threads. A request may wait there for the device lock of another link.
+        self.executor = ThreadPoolExecutor(max_workers=MAX_LINK_THREADS, thread_name_prefix="vxi11")
+        self.servers = []
+
+        # Run the server
+        try:
+            asyncio.run(self.main_loop_async())
+        finally:
+            self.executor.shutdown(wait=True)
+
+    async def main_loop_async(self):
+        """
+        The main loop of the server.
+        """
+        self.loop = asyncio.get_running_loop()
+        # the sessionType of each connection that is closed
+        self.results = asyncio.Queue()
+        self.portmapper.attach(self.loop)
+        self.abort_channel.attach(self.loop)
+        await self.open_servers()
+        try:
+            while True:
+                timeout = None
+                if self.session_started:
+                    timeout = END_OF_SESSION_TIMEOUT
+                try:
+                    session_result = await asyncio.wait_for(self.results.get(), timeout)
+                except asyncio.TimeoutError:
+                    # If no connection is closed within the timeout
+                    session_result = sessionType.SESSION_TIMEOUT
+                if self.session_done(session_result):
+                    break
+        finally:
+            for server in self.servers:
+                server.close()
+            self.servers = []
+            self.portmapper.terminate()
+            self.portmapper = None
+            self.abort_channel.terminate()
+            self.abort_channel = None
+
+        # Disconnect from the external AWG
+        await self.loop.run_in_executor(self.executor, self.disconnect_awg)
+
+    async def open_servers(self):
+        """
+        Starts serving all VXI-11 ports of the range.
+        """
+        self.open_lxi_sockets()
+        for sock in self.lxi_sockets.values():
+            server = await asyncio.start_server(self.handle_connection, sock=sock)
+            self.servers.append(server)
+
+    async def read_record(self, reader: asyncio.StreamReader):
+        """Reads one RPC record from the stream.
+
+        :param reader: the stream
+        :type reader: asyncio.StreamReader
+        :return: the record, without the record marks, or None if the peer closed the connection
+        :rtype: bytes
+        """
+        record = b""
+        while True:
+            try:
+                mark = self.bytes_to_uint(await reader.readexactly(4))
+                size = mark & 0x7FFFFFFF
+                if len(record) + size > MAX_RECORD_SIZE:
+                    return None
+                fragment = await reader.readexactly(size)
+            except asyncio.IncompleteReadError:
+                return None
+            if mark & 0x80000000:
+                # Last fragment. Most records consist of only one.
+                return record + fragment if record else fragment
+            record += fragment
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Handles one VXI-11 connection.
+        """
+        session = self.create_session(writer.get_extra_info("peername"))
+        try:
+            while not session.done():
+                rx_buf = await self.read_record(reader)
+                if rx_buf is None:
+                    # The peer closed the connection without a DESTROY_LINK
+                    break
+                resp_data = await self.loop.run_in_executor(self.executor, self.handle_lxi_request, rx_buf, session)
+                if resp_data is None:
+                    break
+                # The transport may keep the buffers queued, and the templates are patched again on the next reply
+                writer.write(b"".join(resp_data))
+                await writer.drain()
+        except ConnectionError as ex:
+            if self.log_VXI:
+                log("%s: Socket error: %s", self.myname, ex)
+        except Exception as ex:
+            log("%s: Connection of %s failed: %s", self.myname, session.address[0], ex)
+        finally:
+            writer.close()
+            self.close_session(session)
+            self.results.put_nowait(session.result())
+
+
+if __name__ == '__main__':
+    raise Exception("This module is not for running. Run bode.py instead.")
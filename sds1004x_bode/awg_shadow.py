@@ -0,0 +1,173 @@
+'''
+Created on Oct 17, 2026
+
+@author: hb020
+
+
+This file contains the shadow state of the AWG.
+
+The scope sends the same settings again and again: the load, wave type, amplitude and offset on every run,
+and sometimes the same frequency twice in a row. ShadowAWG sits between the command parser and the driver,
+remembers the settings the AWG is known to have, and drops the setter calls that would not change them.
+On slow serial AWGs, every dropped call saves 15 to 100 ms.
+
+The state is forgotten when the AWG is (re)initialized or disconnected, and when the driver raises an error.
+Settings for all channels at once (channel 0 or None) are sent, and make the state of all channels unknown.
+
+'''
+
+from awgdrivers.base_awg import BaseAWG
+
+# A setting that was never sent
+UNKNOWN = object()
+
+
+class ShadowAWG(BaseAWG):
+    '''
+    Write-through proxy of an AWG driver that skips the settings the AWG already has.
+    '''
+    SHORT_NAME = "shadow"
+
+    def __init__(self, awg: BaseAWG):
+        """
+        Gets the driver to send the settings to.
+        """
+        super().__init__(log_debug=awg.log_debug)
+        self.awg = awg
+        # channel -> {setting name: value}, as known to be set in the AWG
+        self.known = {}
+        # number of setter calls that were skipped
+        self.skipped = 0
+
+    def invalidate(self):
+        """
+        Forgets the settings of the AWG. The next setter calls are all sent.
+        """
+        self.known = {}
+
+    def _set(self, setter, name: str, channel: int, value):
+        """Calls a setter of the driver, unless the AWG already has the value.
+
+        :param setter: the setter of the driver
+        :param name: the name of the setting
+        :type name: str
+        :param channel: the channel
+        :type channel: int
+        :param value: the value
+        """
+        if channel is None or channel == 0:
+            self.invalidate()
+            setter(channel, value)
+            return
+        known = self.known.setdefault(channel, {})
+        if known.get(name, UNKNOWN) == value:
+            self.skipped += 1
+            self.printdebug("skipped %s(channel: %s, %s), already set", setter.__name__, channel, value)
+            return
+        # Unknown until the driver has returned
+        known.pop(name, None)
+        try:
+            setter(channel, value)
+        except Exception:
+            self.invalidate()
+            raise
+        self._forget_dependents(known, name)
+        known[name] = value
+
+    def _forget_dependents(self, known: dict, name: str):
+        """
+        Forgets the settings that the driver may have changed together with a setting.
+        """
+        if name == "wave_type":
+            # The AWG may use other wave settings for another wave type
+            for dependent in ("frequency", "amplitude", "offset", "phase"):
+                known.pop(dependent, None)
+        elif name == "load":
+            # Some drivers adjust the amplitude and offset to the load
+            known.pop("amplitude", None)
+            known.pop("offset", None)
+
+    def disconnect(self):
+        self.invalidate()
+        self.awg.disconnect()
+
+    def initialize(self):
+        self.invalidate()
+        self.awg.initialize()
+
+    def get_id(self) -> str:
+        return self.awg.get_id()
+
+    def enable_output(self, channel: int, on: bool):
+        self._set(self.awg.enable_output, "output", channel, on)
+
+    def set_frequency(self, channel: int, freq: float):
+        self._set(self.awg.set_frequency, "frequency", channel, freq)
+
+    def set_phase(self, channel: int, phase: float):
+        self._set(self.awg.set_phase, "phase", channel, phase)
+
+    def set_wave_type(self, channel: int, wave_type: int):
+        self._set(self.awg.set_wave_type, "wave_type", channel, wave_type)
+
+    def set_amplitude(self, channel: int, amplitude: float):
+        self._set(self.awg.set_amplitude, "amplitude", channel, amplitude)
+
+    def set_offset(self, channel: int, offset: float):
+        self._set(self.awg.set_offset, "offset", channel, offset)
+
+    def set_load_impedance(self, channel: int, z: float):
+        self._set(self.awg.set_load_impedance, "load", channel, z)
+
+    def start_sweep(self, channel: int, start: float, stop: float, sweep_time: float, log_spacing: bool):
+        # The sweep changes the frequency
+        self._forget_frequency(channel)
+        self.awg.start_sweep(channel, start, stop, sweep_time, log_spacing)
+
+    def stop_sweep(self, channel: int):
+        self._forget_frequency(channel)
+        self.awg.stop_sweep(channel)
+
+    def upload_arbitrary(self, channel: int, data):
+        # The AWG switches to the arbitrary wave
+        if channel is None or channel == 0:
+            self.invalidate()
+        else:
+            self._forget_dependents(self.known.setdefault(channel, {}), "wave_type")
+            self.known[channel].pop("wave_type", None)
+        self.awg.upload_arbitrary(channel, data)
+
+    def _forget_frequency(self, channel: int):
+        if channel is None or channel == 0:
+            self.invalidate()
+        else:
+            self.known.get(channel, {}).pop("frequency", None)
+
+    def set_basic_wave(self, channel: int, **params):
+        """
+        Sends only the parameters that change. All of them if the wave type changes.
+        """
+        if channel is None or channel == 0:
+            self.invalidate()
+            self.awg.set_basic_wave(channel, **params)
+            return
+        known = self.known.setdefault(channel, {})
+        if "wave_type" in params and known.get("wave_type", UNKNOWN) != params["wave_type"]:
+            changed = params
+        else:
+            changed = {name: value for name, value in params.items() if known.get(name, UNKNOWN) != value}
+        if len(changed) < len(params):
+            self.skipped += len(params) - len(changed)
+            self.printdebug("skipped %s of the settings %s, already set", len(params) - len(changed), params)
+        if not changed:
+            return
+        for name in changed:
+            known.pop(name, None)
+        try:
+            self.awg.set_basic_wave(channel, **changed)
+        except Exception:
+            self.invalidate()
+            raise
+        if "wave_type" in changed:
+            self._forget_dependents(known, "wave_type")
+        known.update(changed)
@@ -76,7 +76,7 @@ class AD9910(BaseAWG):
         """
         Turns the output on or off.
         """
-        self.printdebug(f"enable_output(channel: {channel}, on:{on})")
+        self.printdebug("enable_output(channel: %s, on:%s)", channel, on)
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
 
@@ -91,7 +91,7 @@ class AD9910(BaseAWG):
         """
         Sets output frequency.
         """
-        self.printdebug(f"set_frequency(channel: {channel}, freq:{freq})")
+        self.printdebug("set_frequency(channel: %s, freq:%s)", channel, freq)
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
 
@@ -103,31 +103,31 @@ class AD9910(BaseAWG):
         """
         AD9910 does not require setting phase.
         """
-        self.printdebug(f"set_phase(channel: {channel}, phase: {phase}): ignored")
+        self.printdebug("set_phase(channel: %s, phase: %s): ignored", channel, phase)
 
     def set_wave_type(self, channel: int, wave_type: int):
         """
         Sets the output wave type.
         """
-        self.printdebug(f"set_wave_type(channel: {channel}, wavetype:{wave_type}): ignored")
+        self.printdebug("set_wave_type(channel: %s, wavetype:%s): ignored", channel, wave_type)
 
     def set_amplitude(self, channel: int, amplitude: float):
         """
         Sets output amplitude.
         """
-        self.printdebug(f"set_amplitude(channel: {channel}, amplitude:{amplitude}): ignored")
+        self.printdebug("set_amplitude(channel: %s, amplitude:%s): ignored", channel, amplitude)
 
     def set_offset(self, channel: int, offset: float):
         """
         Sets DC offset of the output.
         """
-        self.printdebug(f"set_offset(channel: {channel}, offset:{offset}): ignored")
+        self.printdebug("set_offset(channel: %s, offset:%s): ignored", channel, offset)
 
     def set_load_impedance(self, channel: int, z: float):
         """
         Sets load impedance connected to each channel. 
         """
-        self.printdebug(f"set_load_impedance(channel: {channel}, impedance:{z}): ignored")
+        self.printdebug("set_load_impedance(channel: %s, impedance:%s): ignored", channel, z)
 
 
 if __name__ == '__main__':
@@ -4,6 +4,16 @@ Created on Apr 24, 2018
 @author: 4x1md
 '''
 
+from .log_writer import log
+
+# The parameters of set_basic_wave(), and the setters that are used for them by default
+BASIC_WAVE_SETTERS = {
+    "wave_type": "set_wave_type",
+    "frequency": "set_frequency",
+    "amplitude": "set_amplitude",
+    "offset": "set_offset",
+    "phase": "set_phase",
+}
 
 class BaseAWG(object):
     '''
@@ -14,10 +24,11 @@ class BaseAWG(object):
     def __init__(self, port: str = "", baud_rate: int = 115200, timeout: int = 5, log_debug: bool = False):
         self.log_debug = log_debug
         
-    def printdebug(self, msg: str):
+    def printdebug(self, msg: str, *args):
+        # msg % args is only formatted when the message is written
         if self.log_debug:
-            print(f"{self.__class__.SHORT_NAME}: {msg}")
-            # print(f"{self.__class__.__name__}: {msg}")
+            log("%s: " + msg, self.__class__.SHORT_NAME, *args)
+            # log("%s: " + msg, self.__class__.__name__, *args)
 
     def disconnect(self):
         raise NotImplementedError()
@@ -49,3 +60,47 @@ class BaseAWG(object):
     def set_load_impedance(self, channel: int, z: float):
         # in the hints, float means that int is also accepted
         raise NotImplementedError()
+
+    def set_basic_wave(self, channel: int, **params):
+        """
+        Sets several parameters of the wave at once, in the order given:
+        wave_type, frequency, amplitude, offset and/or phase.
+        This calls the individual setters. Drivers that can send all parameters
+        in one command override it.
+        """
+        for name, value in params.items():
+            getattr(self, BASIC_WAVE_SETTERS[name])(channel, value)
+
+    def start_sweep(self, channel: int, start: float, stop: float, sweep_time: float, log_spacing: bool):
+        """
+        Starts the frequency sweep of the AWG, from start to stop (lower than start for a sweep down),
+        in sweep_time seconds, with linear or logarithmic spacing. The sweep repeats until stop_sweep().
+        Drivers of AWGs with a sweep override it, the others are swept in software by the caller.
+        """
+        raise NotImplementedError()
+
+    def stop_sweep(self, channel: int):
+        raise NotImplementedError()
+
+    def upload_arbitrary(self, channel: int, data):
+        """
+        Uploads an arbitrary wave and selects it on the channel.
+        data holds the points as signed 16 bit little endian integers, the format of the Siglent WVDT command.
+        It is a memoryview of the received command, only valid during the call.
+        """
+        raise NotImplementedError()
+
+    def encode_frequencies(self, channel: int, freqs) -> list:
+        """
+        Returns the commands that set_frequency() would send for each of the frequencies,
+        encoded for send_encoded_frequency(). Used to encode the steps of a sweep in advance (see sweep_predictor.py).
+        Only the drivers that override it are predicted.
+        """
+        raise NotImplementedError()
+
+    def send_encoded_frequency(self, channel: int, command):
+        """
+        Sends a command returned by encode_frequencies(). Does the same as set_frequency(),
+        but may skip the checks that a new frequency does not need, such as reading the current one first.
+        """
+        raise NotImplementedError()
@@ -97,7 +97,7 @@ class BK4075(BaseAWG):
             :OUTP:STAT ON
             :OUTP OFF
         """
-        self.printdebug(f"enable_output(channel: {channel}, on:{on})")
+        self.printdebug("enable_output(channel: %s, on:%s)", channel, on)
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
 
@@ -120,7 +120,7 @@ class BK4075(BaseAWG):
             :FREQ MAXIMUM
             :FREQ MIN
         """
-        self.printdebug(f"set_frequency(channel: {channel}, freq:{freq})")
+        self.printdebug("set_frequency(channel: %s, freq:%s)", channel, freq)
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
 
@@ -132,7 +132,7 @@ class BK4075(BaseAWG):
         """
         BK4075 does not require setting phase.
         """
-        self.printdebug(f"set_phase(channel: {channel}, phase: {phase}): ignored")
+        self.printdebug("set_phase(channel: %s, phase: %s): ignored", channel, phase)
         pass
 
     def set_wave_type(self, channel: int, wave_type: int):
@@ -148,7 +148,7 @@ class BK4075(BaseAWG):
             :FUNC SIN
             :FUNC ARB
         """
-        self.printdebug(f"set_wave_type(channel: {channel}, wavetype:{wave_type})")
+        self.printdebug("set_wave_type(channel: %s, wavetype:%s)", channel, wave_type)
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
         if wave_type not in constants.WAVE_TYPES:
@@ -169,7 +169,7 @@ class BK4075(BaseAWG):
             :VOLT:AMPL 2.5V
             :VOLT:AMPL MAX
         """
-        self.printdebug(f"set_amplitude(channel: {channel}, amplitude:{amplitude})")
+        self.printdebug("set_amplitude(channel: %s, amplitude:%s)", channel, amplitude)
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
 
@@ -192,7 +192,7 @@ class BK4075(BaseAWG):
             :VOLT:OFFS 2.5V
             :VOLT:OFFS MAX
         """
-        self.printdebug(f"set_offset(channel: {channel}, offset:{offset})")
+        self.printdebug("set_offset(channel: %s, offset:%s)", channel, offset)
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
 
@@ -206,7 +206,7 @@ class BK4075(BaseAWG):
         """
         Sets load impedance connected to each channel. Default value is 50 Ohms.
         """
-        self.printdebug(f"set_load_impedance(channel: {channel}, impedance:{z})")
+        self.printdebug("set_load_impedance(channel: %s, impedance:%s)", channel, z)
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
 
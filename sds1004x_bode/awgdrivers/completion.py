@@ -0,0 +1,157 @@
+'''
+Created on Oct 17, 2026
+
+@author: hb020
+
+
+Completion of the commands of the SCPI AWGs, and their completion times.
+
+A write returns when the command is sent, and the error query when the command was parsed.
+Neither says when the output of the AWG has changed. In the completion modes, the driver waits
+for each command to complete, the way IEEE 488.2 defines it:
+  opc:    *OPC? is queried after the command. The AWG answers when all pending commands are complete.
+  status: *OPC is sent after the command, and *ESR? is polled until the Operation Complete bit is set.
+          For the AWGs that do not delay the reply to *OPC?.
+The time from the write to the completion is recorded per command header (:SOURCE1:FREQ ...),
+in a histogram per device, so that the settling time of the AWG is known instead of assumed.
+
+'''
+
+import time
+from bisect import bisect_left
+from .log_writer import log
+
+COMPLETION_NONE = "none"
+COMPLETION_OPC = "opc"
+COMPLETION_STATUS = "status"
+COMPLETION_MODES = (COMPLETION_NONE, COMPLETION_OPC, COMPLETION_STATUS)
+
+# Upper limits of the histogram buckets, in seconds: 100 us, 200 us, 400 us ... 105 s. Longer times are in the last bucket.
+HISTOGRAM_LIMITS = tuple(0.0001 * 2 ** n for n in range(21))
+
+# Time between two *ESR? queries in the status mode, in seconds
+STATUS_POLL_INTERVAL = 0.001
+
+# Bit of the standard event status register set by *OPC
+OPC_EVENT = 0x01
+
+
+def command_header(cmd: str) -> str:
+    """Returns the headers of a command message, without the arguments.
+
+    :param cmd: the command message, for example ":SOURCE1:FREQ 1000.0000000000"
+    :type cmd: str
+    :return: the headers, for example ":SOURCE1:FREQ". The headers of a message with several commands are joined by ';'.
+    :rtype: str
+    """
+    return ";".join(part.strip().partition(" ")[0] for part in cmd.split(";"))
+
+
+class CompletionHistogram(object):
+    """
+    The completion times of one command header.
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(HISTOGRAM_LIMITS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def add(self, duration: float):
+        self.counts[bisect_left(HISTOGRAM_LIMITS, duration)] += 1
+        self.count += 1
+        self.total += duration
+        self.maximum = max(self.maximum, duration)
+
+    def quantile(self, q: float) -> float:
+        """Returns the upper limit of the bucket that holds the quantile q of the completion times.
+
+        :param q: the quantile, between 0 and 1
+        :type q: float
+        :return: the time in seconds, or the largest time when the quantile is in the last bucket
+        :rtype: float
+        """
+        rank = q * self.count
+        seen = 0
+        for limit, count in zip(HISTOGRAM_LIMITS, self.counts):
+            seen += count
+            if seen >= rank and seen > 0:
+                return min(limit, self.maximum)
+        return self.maximum
+
+
+class CompletionTimer(object):
+    """
+    Waits for the completion of the commands of an AWG, according to the mode, and records their completion times.
+    """
+
+    def __init__(self, name: str, mode: str = COMPLETION_NONE, timeout: float = 5.0):
+        """
+        Gets the name of the device for the summary, the completion mode, and the longest wait in status mode, in seconds.
+        """
+        if mode not in COMPLETION_MODES:
+            raise ValueError(f"Unknown completion mode: {mode}")
+        self.name = name
+        self.mode = mode
+        self.timeout = timeout
+        # command header -> CompletionHistogram
+        self.histograms = {}
+
+    def wait(self, instrument, cmd: str, start: float) -> bool:
+        """Waits until a command that was written is complete, and records the time since it was written.
+        Does nothing when the mode is none. Called with the VISA session locked.
+
+        :param instrument: the VISA resource, or the SocketInstrument
+        :param cmd: the command that was written
+        :type cmd: str
+        :param start: the time.perf_counter() before the write
+        :type start: float
+        :return: False if the command did not complete before the timeout (status mode), True otherwise
+        :rtype: bool
+        """
+        if self.mode == COMPLETION_NONE:
+            return True
+        if self.mode == COMPLETION_OPC:
+            instrument.query("*OPC?")
+        else:
+            instrument.write("*OPC")
+            deadline = start + self.timeout
+            while not int(instrument.query("*ESR?")) & OPC_EVENT:
+                if time.perf_counter() > deadline:
+                    log("ERR: command \"%s\" did not complete in %s s", cmd, self.timeout)
+                    return False
+                time.sleep(STATUS_POLL_INTERVAL)
+        duration = time.perf_counter() - start
+        header = command_header(cmd)
+        histogram = self.histograms.get(header)
+        if histogram is None:
+            histogram = self.histograms[header] = CompletionHistogram()
+        histogram.add(duration)
+        return True
+
+    def settle_time(self, cmd: str, q: float = 0.9) -> float:
+        """Returns the time a command takes to complete, from the completion times recorded so far.
+
+        :param cmd: the command, or its header
+        :type cmd: str
+        :param q: the quantile of the completion times, 0.9 for a time that 90% of the commands did not exceed
+        :type q: float
+        :return: the time in seconds, or None if no command with that header was timed
+        :rtype: float
+        """
+        histogram = self.histograms.get(command_header(cmd))
+        if histogram is None or histogram.count == 0:
+            return None
+        return histogram.quantile(q)
+
+    def summary(self) -> str:
+        """
+        Returns a printable summary of the completion times, per command header.
+        """
+        lines = [f"completion times of the {self.name} ({self.mode}):"]
+        for header, histogram in sorted(self.histograms.items()):
+            lines.append(f"  {header}: {histogram.count} commands, avg {histogram.total / histogram.count * 1000:.3f} ms, "
+                         f"p50 {histogram.quantile(0.5) * 1000:.3f} ms, p90 {histogram.quantile(0.9) * 1000:.3f} ms, "
+                         f"max {histogram.maximum * 1000:.3f} ms")
+        return "\n".join(lines)
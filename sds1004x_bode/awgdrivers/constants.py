@@ -9,5 +9,7 @@ SQUARE = 1
 PULSE = 2
 TRIANGLE = 3
 WAVE_TYPES = (SINE, SQUARE, PULSE, TRIANGLE)
+# Selected by upload_arbitrary(), not by set_wave_type()
+ARBITRARY = 4
 
 HI_Z = float("inf")
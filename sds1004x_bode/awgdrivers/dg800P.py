@@ -4,9 +4,12 @@ Created on June 3, 2025
 @author: JohnKr
 '''
 
+import time
 from .base_awg import BaseAWG
+from .error_check import ErrorChecker, ERROR_CHECK_COMMAND
+from .completion import CompletionTimer, COMPLETION_NONE
+from .visa_sessions import open_instrument, release_instrument
 from . import constants
-import pyvisa as visa
 from .exceptions import UnknownChannelError
 
 TIMEOUT = 5
@@ -21,67 +24,124 @@ WAVEFORM_COMMANDS = {
     constants.TRIANGLE: ":SOURCE{channel}:FUNC TRIANG"
 }
 
+# Points of an arbitrary wave sent per :TRACe:DATA:DAC16 command
+ARB_CHUNK_POINTS = 16384
+
 # Default AWG settings
 DEFAULT_LOAD = 50
 DEFAULT_OUTPUT_ON = False
 
 
+def dac16_points(data) -> bytes:
+    """Converts the points of an arbitrary wave to the unsigned 14 bit points of the Rigol, (point + 32768) >> 2.
+
+    The whole wave is converted at once, as one integer: adding 32768 flips the sign bit of every point,
+    and the mask clears the 2 bits that the shift brings in from the next point.
+
+    :param data: signed 16 bit points, little endian. A trailing odd byte is ignored.
+    :return: unsigned 16 bit points, little endian
+    :rtype: bytes
+    """
+    count = len(data) // 2
+    if count == 0:
+        return b""
+    value = int.from_bytes(data[:count * 2], "little") ^ int.from_bytes(b"\x00\x80" * count, "little")
+    value = (value >> 2) & int.from_bytes(b"\xff\x3f" * count, "little")
+    return value.to_bytes(count * 2, "little")
+
+
 class RigolDG800P(BaseAWG):
     '''
     DG800/DG900 Pro waveform generator driver.
     '''
 
     SHORT_NAME = "dg800p"
-
-    def __init__(self, port: str = "", baud_rate: int = None, timeout: int = TIMEOUT, log_debug: bool = False):
-        """baud_rate parameter is ignored."""
+    # Policy of the error checks by default, see error_check.py
+    ERROR_CHECK = ERROR_CHECK_COMMAND
+    # Completion mode by default, see completion.py
+    COMPLETION = COMPLETION_NONE
+
+    def __init__(self, port: str = "", baud_rate: int = None, timeout: int = TIMEOUT, log_debug: bool = False,
+                 error_check: str = ERROR_CHECK_COMMAND, completion: str = COMPLETION_NONE):
+        """
+        baud_rate parameter is ignored. error_check is the policy of the error checks, see error_check.py.
+        completion is the mode of waiting for the completion of the commands, see completion.py.
+        """
         super().__init__(log_debug=log_debug)
         self.printdebug("init")
         self.port = port
-        self.rm = None
         self.m = None
         self.timeout = timeout
         self.channel_on = [False, False]
+        self.error_checker = ErrorChecker(self._query_error, error_check)
+        self.completion = CompletionTimer(self.SHORT_NAME, completion, timeout)
 
     def _send_command(self, cmd):
         # local function to send a command and check for errors
-        self.printdebug(f"send command \"{cmd}\"")
-        self.m.write(cmd)
-        r = self.m.query(":SYSTem:ERRor?")
-        if r.startswith("0,"):
-            return True
-        else:
-            print(f"ERR: command \"{cmd}\" returned {r}")
-            # raise some error maybe
-            return False
+        self.printdebug("send command \"%s\"", cmd)
+        # the lock shares the VISA session with the error poller
+        with self.error_checker.lock:
+            start = time.perf_counter()
+            self.m.write(cmd)
+            self.completion.wait(self.m, cmd, start)
+            return self._check_error(cmd)
+
+    def _send_block(self, cmd, data):
+        # local function to send a command ending with a binary block (IEEE 488.2 definite length) and check for errors
+        size = str(memoryview(data).nbytes)
+        self.printdebug("send command \"%s\" with a block of %s bytes", cmd, size)
+        with self.error_checker.lock:
+            start = time.perf_counter()
+            # header, block and newline are written separately, without copying the block,
+            # and only the last write ends the message (END on VXI-11, EOM on USB)
+            self.m.send_end = False
+            try:
+                self.m.write_raw(f"{cmd}#{len(size)}{size}".encode())
+                self.m.write_raw(data)
+            finally:
+                self.m.send_end = True
+            self.m.write_raw(b"\n")
+            self.completion.wait(self.m, cmd, start)
+            return self._check_error(cmd)
+
+    def _check_error(self, cmd):
+        # the error queue is read according to the policy, see error_check.py
+        return self.error_checker.sent(cmd)
+
+    def _query_error(self) -> str:
+        return self.m.query(":SYSTem:ERRor?")
 
     def _connect(self):
-        self.rm = visa.ResourceManager()
-        self.m = self.rm.open_resource(self.port)
-        self.m.timeout = self.timeout * 1000
+        # the VISA session of the process, or a raw SCPI socket, kept open for the next connection
+        self.m = open_instrument(self.port, self.timeout * 1000)
 
     def disconnect(self):
         self.printdebug("disconnect")
+        self.error_checker.stop()
+        if self.log_debug:
+            self.printdebug("%s", self.error_checker.summary())
+            if self.completion.mode != COMPLETION_NONE:
+                self.printdebug("%s", self.completion.summary())
         if self.m is not None:
             self.enable_output(0, False)
-            self.m.close()
+            release_instrument(self.port, self.m)
             self.m = None
-        if self.rm is not None:
-            self.rm.close()
-            self.rm = None
 
     def initialize(self):
         self.printdebug("initialize")
         self._connect()
         self.m.write("*CLS")
         # self.m.write("*RST")
+        self.error_checker.start()
 
     def get_id(self) -> str:
-        ans = self.m.query("*IDN?")
+        with self.error_checker.lock:
+            self.error_checker.barrier()
+            ans = self.m.query("*IDN?")
         return ans.strip()
 
     def enable_output(self, channel: int, on: bool):
-        self.printdebug(f"enable_output(channel: {channel}, on:{on})")
+        self.printdebug("enable_output(channel: %s, on:%s)", channel, on)
 
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
@@ -92,9 +152,12 @@ class RigolDG800P(BaseAWG):
         else:
             self.channel_on[channel - 1] = on
             self._send_command(f":OUTPUT{channel}:STATE {'ON' if on else 'OFF'}")
+            # the output is a barrier: the errors of the settings are known before the measurement
+            with self.error_checker.lock:
+                self.error_checker.barrier()
 
     def set_frequency(self, channel: int, freq: float):
-        self.printdebug(f"set_frequency(channel: {channel}, freq:{freq})")
+        self.printdebug("set_frequency(channel: %s, freq:%s)", channel, freq)
 
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
@@ -103,10 +166,10 @@ class RigolDG800P(BaseAWG):
             self.set_frequency(1, freq)
             self.set_frequency(2, freq)
         else:
-            self._send_command(f":SOURCE{channel}:FREQ {freq:.10f}")        
+            self._send_command(self._frequency_command(channel, freq))        
 
     def set_phase(self, channel: int, phase: float):
-        self.printdebug(f"set_phase(channel: {channel}, phase: {phase})")
+        self.printdebug("set_phase(channel: %s, phase: %s)", channel, phase)
         # phase settings do not really work on this device, but I try anyway
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
@@ -115,22 +178,10 @@ class RigolDG800P(BaseAWG):
             self.set_phase(1, phase)
             self.set_phase(2, phase)
         else:
-            try:
-                phase = int(phase)
-            except:
-                phase = 0
-            # Allow phase to wrap below 0
-            if phase < 0:
-                phase += 360
-            # but if still off, use defaults
-            if phase < 0:
-                phase = 0
-            if phase > 360:
-                phase = 0
-            self._send_command(f":SOURCE{channel}:PHASE {phase}")
+            self._send_command(self._phase_command(channel, phase))
 
     def set_wave_type(self, channel: int, wave_type: int):
-        self.printdebug(f"set_wave_type(channel: {channel}, wavetype:{wave_type})")
+        self.printdebug("set_wave_type(channel: %s, wavetype:%s)", channel, wave_type)
 
         if wave_type not in constants.WAVE_TYPES:
             raise ValueError("Incorrect wave type.")
@@ -142,12 +193,10 @@ class RigolDG800P(BaseAWG):
             self.set_wave_type(1, wave_type)
             self.set_wave_type(2, wave_type)
         else:
-            cmd = WAVEFORM_COMMANDS[wave_type]
-            cmd = cmd.replace("{channel}", str(channel))
-            self._send_command(cmd)
+            self._send_command(self._wave_type_command(channel, wave_type))
 
     def set_amplitude(self, channel: int, amplitude: float):
-        self.printdebug(f"set_amplitude(channel: {channel}, amplitude:{amplitude})")
+        self.printdebug("set_amplitude(channel: %s, amplitude:%s)", channel, amplitude)
 
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
@@ -156,15 +205,10 @@ class RigolDG800P(BaseAWG):
             self.set_amplitude(1, amplitude)
             self.set_amplitude(2, amplitude)
         else:
-            # For Rigols it is not necessary to adjust the amplitude to the defined load impedance
-            # amplitude = amplitude / self.v_out_coeff[channel - 1]
-            # SDS1000X HD sends always the voltage as VPP, even if set to VRMS in the Bode plot setup of the scope
-            # Rigols interpret the amplitude to have the unit that was used by the last manual entry or the last UNIT command
-            self._send_command(f":SOURCE{channel}:VOLT:UNIT VPP") 
-            self._send_command(f":SOURCE{channel}:VOLT {amplitude:.3f}")
+            self._send_command(self._amplitude_command(channel, amplitude))
 
     def set_offset(self, channel: int, offset: float):
-        self.printdebug(f"set_offset(channel: {channel}, offset:{offset})")
+        self.printdebug("set_offset(channel: %s, offset:%s)", channel, offset)
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
 
@@ -172,10 +216,10 @@ class RigolDG800P(BaseAWG):
             self.set_offset(1, offset)
             self.set_offset(2, offset)
         else:
-            self._send_command(f":SOURCE{channel}:VOLT:OFFS {offset}")
+            self._send_command(self._offset_command(channel, offset))
 
     def set_load_impedance(self, channel: int, z: float):
-        self.printdebug(f"set_load_impedance(channel: {channel}, impedance:{z})")
+        self.printdebug("set_load_impedance(channel: %s, impedance:%s)", channel, z)
 
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
@@ -193,6 +237,103 @@ class RigolDG800P(BaseAWG):
                 z = "INF"
             self._send_command(f":OUTPUT{channel}:LOAD {z}")
 
+    def set_basic_wave(self, channel: int, **params):
+        self.printdebug("set_basic_wave(channel: %s, %s)", channel, params)
+
+        if channel is not None and channel not in CHANNELS:
+            raise UnknownChannelError(CHANNELS_ERROR)
+
+        if channel is None or channel == 0:
+            self.set_basic_wave(1, **params)
+            self.set_basic_wave(2, **params)
+        elif params:
+            # One message for all parameters, so that the errors are queried only once
+            cmds = [getattr(self, f"_{name}_command")(channel, value) for name, value in params.items()]
+            self._send_command(";".join(cmds))
+
+    def start_sweep(self, channel: int, start: float, stop: float, sweep_time: float, log_spacing: bool):
+        self.printdebug("start_sweep(channel: %s, start: %s, stop: %s, time: %s, log: %s)",
+                        channel, start, stop, sweep_time, log_spacing)
+
+        if channel is not None and channel not in CHANNELS:
+            raise UnknownChannelError(CHANNELS_ERROR)
+
+        if channel is None or channel == 0:
+            self.start_sweep(1, start, stop, sweep_time, log_spacing)
+            self.start_sweep(2, start, stop, sweep_time, log_spacing)
+        else:
+            # A start frequency above the stop frequency sweeps down
+            self._send_command(f":SOURCE{channel}:FREQ:STAR {start:.10f};"
+                               f":SOURCE{channel}:FREQ:STOP {stop:.10f};"
+                               f":SOURCE{channel}:SWE:SPAC {'LOG' if log_spacing else 'LIN'};"
+                               f":SOURCE{channel}:SWE:TIME {sweep_time};"
+                               f":SOURCE{channel}:SWE:TRIG:SOUR INT;"
+                               f":SOURCE{channel}:SWE:STAT ON")
+
+    def stop_sweep(self, channel: int):
+        self.printdebug("stop_sweep(channel: %s)", channel)
+
+        if channel is not None and channel not in CHANNELS:
+            raise UnknownChannelError(CHANNELS_ERROR)
+
+        if channel is None or channel == 0:
+            self.stop_sweep(1)
+            self.stop_sweep(2)
+        else:
+            self._send_command(f":SOURCE{channel}:SWE:STAT OFF")
+
+    def upload_arbitrary(self, channel: int, data):
+        self.printdebug("upload_arbitrary(channel: %s, %s bytes)", channel, len(data))
+
+        if channel is not None and channel not in CHANNELS:
+            raise UnknownChannelError(CHANNELS_ERROR)
+
+        if channel is None or channel == 0:
+            self.upload_arbitrary(1, data)
+            self.upload_arbitrary(2, data)
+        else:
+            points = memoryview(dac16_points(data))
+            self._send_command(f":SOURCE{channel}:APPL:ARB")
+            # The Rigol takes the points in chunks that are marked CON(tinued) except the last one
+            chunk_size = ARB_CHUNK_POINTS * 2
+            for start in range(0, len(points), chunk_size):
+                last = start + chunk_size >= len(points)
+                self._send_block(f":SOURCE{channel}:TRAC:DATA:DAC16 VOLATILE,{'END' if last else 'CON'},",
+                                 points[start:start + chunk_size])
+
+    def _frequency_command(self, channel: int, freq: float) -> str:
+        return f":SOURCE{channel}:FREQ {freq:.10f}"
+
+    def _phase_command(self, channel: int, phase: float) -> str:
+        try:
+            phase = int(phase)
+        except:
+            phase = 0
+        # Allow phase to wrap below 0
+        if phase < 0:
+            phase += 360
+        # but if still off, use defaults
+        if phase < 0:
+            phase = 0
+        if phase > 360:
+            phase = 0
+        return f":SOURCE{channel}:PHASE {phase}"
+
+    def _wave_type_command(self, channel: int, wave_type: int) -> str:
+        if wave_type not in constants.WAVE_TYPES:
+            raise ValueError("Incorrect wave type.")
+        cmd = WAVEFORM_COMMANDS[wave_type]
+        return cmd.replace("{channel}", str(channel))
+
+    def _amplitude_command(self, channel: int, amplitude: float) -> str:
+        # For Rigols it is not necessary to adjust the amplitude to the defined load impedance
+        # SDS1000X HD sends always the voltage as VPP, even if set to VRMS in the Bode plot setup of the scope
+        # Rigols interpret the amplitude to have the unit that was used by the last manual entry or the last UNIT command
+        return f":SOURCE{channel}:VOLT:UNIT VPP;:SOURCE{channel}:VOLT {amplitude:.3f}"
+
+    def _offset_command(self, channel: int, offset: float) -> str:
+        return f":SOURCE{channel}:VOLT:OFFS {offset}"
+
 
 if __name__ == '__main__':
     print("This module shouldn't be run. Run awg_tests.py or bode.py instead.")
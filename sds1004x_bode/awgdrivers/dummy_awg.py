@@ -29,22 +29,25 @@ class DummyAWG(BaseAWG):
         return AWG_ID
 
     def enable_output(self, channel: int, on: bool):
-        self.printdebug(f"enable_output(channel: {channel}, on:{on})")
+        self.printdebug("enable_output(channel: %s, on:%s)", channel, on)
 
     def set_frequency(self, channel: int, freq: float):
-        self.printdebug(f"set_frequency(channel: {channel}, freq:{freq})")
+        self.printdebug("set_frequency(channel: %s, freq:%s)", channel, freq)
         
     def set_phase(self, channel: int, phase: float):
-        self.printdebug(f"set_phase(channel: {channel}, phase: {phase})")
+        self.printdebug("set_phase(channel: %s, phase: %s)", channel, phase)
 
     def set_wave_type(self, channel: int, wave_type: int):
-        self.printdebug(f"set_wave_type(channel: {channel}, wavetype:{wave_type})")
+        self.printdebug("set_wave_type(channel: %s, wavetype:%s)", channel, wave_type)
 
     def set_amplitude(self, channel: int, amplitude: float):
-        self.printdebug(f"set_amplitude(channel: {channel}, amplitude:{amplitude})")
+        self.printdebug("set_amplitude(channel: %s, amplitude:%s)", channel, amplitude)
 
     def set_offset(self, channel: int, offset: float):
-        self.printdebug(f"set_offset(channel: {channel}, offset:{offset})")
+        self.printdebug("set_offset(channel: %s, offset:%s)", channel, offset)
 
     def set_load_impedance(self, channel: int, z: float):
-        self.printdebug(f"set_load_impedance(channel: {channel}, impedance:{z})")
+        self.printdebug("set_load_impedance(channel: %s, impedance:%s)", channel, z)
+
+    def upload_arbitrary(self, channel: int, data):
+        self.printdebug("upload_arbitrary(channel: %s, %s bytes)", channel, len(data))
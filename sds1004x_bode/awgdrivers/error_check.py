@@ -0,0 +1,193 @@
+'''
+Created on Oct 17, 2026
+
+@author: hb020
+
+
+Error checking of the SCPI AWGs, that keep their errors in a queue read with :SYSTem:ERRor?.
+
+Reading the queue after every command doubles the round trips to the AWG. The policy sets when it is read:
+  command: after every command, as before. Each error is attributed to its command.
+  batch:   after every ERROR_CHECK_INTERVAL commands, and at the barriers.
+  barrier: only at the barriers: when an output is switched, before a query, and when disconnecting.
+  sampled: after one command in ERROR_CHECK_INTERVAL, chosen at random, and at the barriers.
+  background: by a poller thread, when no command was sent for ERROR_POLL_IDLE seconds, and at the barriers.
+
+The driver holds the lock of the checker while it uses the VISA session. The poller only reads the queue
+if it gets the lock without waiting, so a command of the scope waits for one error query at most.
+
+When the queue is read, it is read until it is empty. The queue does not tell which command
+caused an error, so an error found after several commands is attributed to all of them,
+and the next ERROR_CHECK_INTERVAL commands are checked one by one, to find the command if it fails again.
+
+'''
+
+import random
+import threading
+import time
+from .log_writer import log
+
+ERROR_CHECK_COMMAND = "command"
+ERROR_CHECK_BATCH = "batch"
+ERROR_CHECK_BARRIER = "barrier"
+ERROR_CHECK_SAMPLED = "sampled"
+ERROR_CHECK_BACKGROUND = "background"
+ERROR_CHECK_POLICIES = (ERROR_CHECK_COMMAND, ERROR_CHECK_BATCH, ERROR_CHECK_BARRIER, ERROR_CHECK_SAMPLED,
+                        ERROR_CHECK_BACKGROUND)
+
+# Commands per check, for the batch and sampled policies
+ERROR_CHECK_INTERVAL = 16
+
+# Most errors read at once. The queue of the AWG is not longer, this only protects against a reply that is never "0,".
+ERROR_QUEUE_SIZE = 32
+
+# Time without commands after which the poller reads the error queue, in seconds
+ERROR_POLL_IDLE = 0.05
+# Time between two looks of the poller, in seconds
+ERROR_POLL_INTERVAL = 0.05
+
+
+class ErrorChecker(object):
+    """
+    Reads the error queue of an AWG according to the policy, and logs the errors with their commands.
+    """
+
+    def __init__(self, query_error, policy: str = ERROR_CHECK_COMMAND, interval: int = ERROR_CHECK_INTERVAL):
+        """
+        Gets the function that reads one error from the AWG (the reply to :SYSTem:ERRor?),
+        the policy, and the number of commands per check.
+        """
+        if policy not in ERROR_CHECK_POLICIES:
+            raise ValueError(f"Unknown error check policy: {policy}")
+        self.query_error = query_error
+        self.policy = policy
+        self.interval = interval
+        # commands sent since the last check
+        self.pending = []
+        # number of commands still to check one by one, after an error that could not be attributed
+        self.narrowing = 0
+        # held while the VISA session is used
+        self.lock = threading.RLock()
+        # time of the last command, for the poller
+        self.last_sent = 0.0
+        self.poller = None
+        self.stopped = threading.Event()
+        # counters for summary()
+        self.checks = 0
+        self.errors = 0
+
+    def sent(self, cmd: str) -> bool:
+        """Records a command sent to the AWG, and reads the error queue if the policy says so.
+        Called with the lock held.
+
+        :param cmd: the command
+        :type cmd: str
+        :return: False if an error was read, True otherwise
+        :rtype: bool
+        """
+        self.pending.append(cmd)
+        self.last_sent = time.monotonic()
+        if self.narrowing > 0:
+            self.narrowing -= 1
+            return self.check()
+        if self.policy == ERROR_CHECK_COMMAND:
+            return self.check()
+        if self.policy == ERROR_CHECK_BATCH:
+            if len(self.pending) >= self.interval:
+                return self.check()
+        elif self.policy == ERROR_CHECK_SAMPLED:
+            if random.random() * self.interval < 1:
+                return self.check()
+        return True
+
+    def barrier(self) -> bool:
+        """Reads the error queue if commands were sent since the last check.
+        Called with the lock held.
+
+        :return: False if an error was read, True otherwise
+        :rtype: bool
+        """
+        if not self.pending:
+            return True
+        return self.check()
+
+    def check(self) -> bool:
+        """Reads the error queue until it is empty, and logs the errors with the commands that may have caused them.
+        Called with the lock held.
+
+        :return: False if an error was read, True otherwise
+        :rtype: bool
+        """
+        errors = []
+        for _ in range(ERROR_QUEUE_SIZE):
+            r = self.query_error()
+            if r.startswith("0,"):
+                break
+            errors.append(r.strip())
+        pending = self.pending
+        self.pending = []
+        self.checks += 1
+        self.errors += len(errors)
+        if not errors:
+            return True
+        if not pending:
+            for error in errors:
+                log("ERR: the AWG returned %s", error)
+        elif len(pending) == 1:
+            for error in errors:
+                log("ERR: command \"%s\" returned %s", pending[0], error)
+        else:
+            for error in errors:
+                log("ERR: one of the %s commands since the previous check returned %s", len(pending), error)
+            for cmd in pending:
+                log("ERR:   command \"%s\"", cmd)
+            self.narrowing = self.interval
+        return False
+
+    def start(self):
+        """
+        Starts the poller thread, with the background policy. Called once the VISA session is open.
+        """
+        if self.policy != ERROR_CHECK_BACKGROUND or self.poller is not None:
+            return
+        self.stopped.clear()
+        self.poller = threading.Thread(target=self.poll, name="error-poller", daemon=True)
+        self.poller.start()
+
+    def stop(self):
+        """
+        Stops the poller thread. Called before the VISA session is closed.
+        """
+        poller = self.poller
+        if poller is None:
+            return
+        self.stopped.set()
+        poller.join()
+        self.poller = None
+
+    def poll(self):
+        """
+        The poller thread.
+        """
+        while not self.stopped.wait(ERROR_POLL_INTERVAL):
+            if not self.pending or time.monotonic() - self.last_sent < ERROR_POLL_IDLE:
+                continue
+            # a command of the scope has priority: do not wait for it
+            if not self.lock.acquire(blocking=False):
+                continue
+            try:
+                if self.pending and not self.stopped.is_set():
+                    self.check()
+            except Exception as ex:
+                log("ERR: reading the error queue failed: %s", ex)
+            finally:
+                self.lock.release()
+
+    def summary(self) -> str:
+        """
+        Returns a printable summary of the error checks since the previous call, and resets the counters.
+        """
+        summary = f"error checks ({self.policy}): {self.checks} reads of the error queue, {self.errors} errors"
+        self.checks = 0
+        self.errors = 0
+        return summary
@@ -19,6 +19,7 @@ import time
 
 from .exceptions import UnknownChannelError
 from .base_awg import BaseAWG
+from .log_writer import log
 
 AWG_ID = "fy"
 AWG_OUTPUT_IMPEDANCE = 50.0
@@ -64,7 +65,7 @@ class FygenAWG(BaseAWG):
             xonxoff=False,
             timeout=self.timeout)
 
-        self.printdebug(f"Connected to {self.port}")
+        self.printdebug("Connected to %s", self.port)
         self.ser.reset_output_buffer()
         self.ser.reset_input_buffer()
 
@@ -85,7 +86,7 @@ class FygenAWG(BaseAWG):
 
     def enable_output(self, channel: int, on: bool):
         """Turns a channel on (True) or off (False)."""
-        self.printdebug(f"enable_output(channel: {channel}, on:{on})")
+        self.printdebug("enable_output(channel: %s, on:%s)", channel, on)
         self._retry(
             channel,
             "N",
@@ -96,31 +97,43 @@ class FygenAWG(BaseAWG):
         """Sets frequency for a channel.
           freq is a floating point value in Hz.
         """
-        self.printdebug(f"set_frequency(channel: {channel}, freq:{freq})")
+        self.printdebug("set_frequency(channel: %s, freq:%s)", channel, freq)
         uhz = int(freq * 1000000.0)
 
+        self._retry(
+            channel,
+            "F",
+            "%014u" % uhz,
+            "%08u" % int(freq),
+            match_fn=self._match_hz_only)
+
+    def _match_hz_only(self, match, got):
         # AWG Bug: With the FY2300 and some values of frequency (for example
         # 454.07 Hz) a bug occurs where the UI of the generator shows the
         # correct value on the UI but the "RMF" command returns an incorrect
         # fractional hertz value (454.004464 Hz for the example above).
         # The work-around is to just match the Hz part of the return
         # value.
-        def match_hz_only(match, got):
-            if '.' in got and match == got[:got.index('.')]:
-                return True
-            self.printdebug('set_frequency mismatch (looking at Hz value only)')
-            return False
+        if '.' in got and match == got[:got.index('.')]:
+            return True
+        self.printdebug('set_frequency mismatch (looking at Hz value only)')
+        return False
+
+    def encode_frequencies(self, channel: int, freqs) -> list:
+        """Encodes the value and the expected reply of set_frequency(), to be sent by send_encoded_frequency().
+          The channel does not change them.
+        """
+        return [("%014u" % int(freq * 1000000.0), "%08u" % int(freq)) for freq in freqs]
 
-        self._retry(
-            channel,
-            "F",
-            "%014u" % uhz,
-            "%08u" % int(freq),
-            match_fn=match_hz_only)
+    def send_encoded_frequency(self, channel: int, command: tuple):
+        self.printdebug("send_encoded_frequency(channel: %s, command: %s)", channel, command)
+        value, match = command
+        # a predicted frequency is the next step of a sweep, which the AWG does not have yet: no need to read it first
+        self._retry(channel, "F", value, match, match_fn=self._match_hz_only, read_first=False)
 
     def set_phase(self, channel: int, phase: float):
         """Sets the phase of a channel in degrees."""
-        self.printdebug(f"set_phase(channel: {channel}, phase: {phase}), but forced on channel 2")
+        self.printdebug("set_phase(channel: %s, phase: %s), but forced on channel 2", channel, phase)
         channel = 2  # This parameter is ignored, always set phase on channel 2 (not sure why)
         self._retry(
             channel,
@@ -130,7 +143,7 @@ class FygenAWG(BaseAWG):
 
     def set_wave_type(self, channel: int, wave_type: int):
         """Sets a channel to a sin wave."""
-        self.printdebug(f"set_wave_type(channel: {channel}, wavetype:{wave_type}), but forcing sine wave")
+        self.printdebug("set_wave_type(channel: %s, wavetype:%s), but forcing sine wave", channel, wave_type)
         self._retry(channel, "W", "0", "0")
 
     def set_amplitude(self, channel: int, amplitude: float):
@@ -140,7 +153,7 @@ class FygenAWG(BaseAWG):
           impedance is 50 ohms and amp=50 ohms, the actual voltage
           set is 1 * (50 + 50) / 50 = 2V.
         """
-        self.printdebug(f"set_amplitude(channel: {channel}, amplitude:{amplitude})")
+        self.printdebug("set_amplitude(channel: %s, amplitude:%s)", channel, amplitude)
         volts = round(self._apply_load_impedance(channel, amplitude), 4)
         self._retry(
             channel,
@@ -152,7 +165,7 @@ class FygenAWG(BaseAWG):
         """Sets the voltage offset for a channel.
           offset is a floating point number.
         """
-        self.printdebug(f"set_offset(channel: {channel}, offset:{offset})")
+        self.printdebug("set_offset(channel: %s, offset:%s)", channel, offset)
         # Factor in load impedance.
         offset = self._apply_load_impedance(channel, offset)
 
@@ -170,7 +183,7 @@ class FygenAWG(BaseAWG):
 
     def set_load_impedance(self, channel: int, z: float):
         """Sets the load impedance for a channel."""
-        self.printdebug(f"set_load_impedance(channel: {channel}, impedance:{z})")
+        self.printdebug("set_load_impedance(channel: %s, impedance:%s)", channel, z)
         maxz = 10000000.0
         if z > maxz:
             z = None  # Hi-z
@@ -187,12 +200,12 @@ class FygenAWG(BaseAWG):
     def _recv(self, command):
         """Waits for device."""
         response = self.ser.read_until(size=MAX_READ_SIZE).decode("utf8")
-        self.printdebug(f"{command.strip()} -> {response.strip()}")
+        self.printdebug("%s -> %s", command.strip(), response.strip())
         return response
 
     def _send(self, command, retry_count=MAX_RETRIES):
         """Sends a low-level command. Returns the response."""
-        self.printdebug(f"send (attempt {MAX_RETRIES + 1 - retry_count}/{MAX_RETRIES}) -> {command}")
+        self.printdebug("send (attempt %s/%s) -> %s", MAX_RETRIES + 1 - retry_count, MAX_RETRIES, command)
 
         data = command + "\n"
         data = data.encode()
@@ -211,11 +224,13 @@ class FygenAWG(BaseAWG):
 
         return response.strip()
 
-    def _retry(self, channel: int, command, value, match, match_fn=None):
-        """Retries the command until match is satisfied."""
+    def _retry(self, channel: int, command, value, match, match_fn=None, read_first=True):
+        """Retries the command until match is satisfied.
+          With read_first, the value is read first, and not written if the AWG already has it.
+        """
         if channel is None or channel == 0:
-            self._retry(1, command, value, match)
-            self._retry(2, command, value, match)
+            self._retry(1, command, value, match, read_first=read_first)
+            self._retry(2, command, value, match, read_first=read_first)
             return
         elif channel == 1:
             channel = "M"
@@ -229,21 +244,21 @@ class FygenAWG(BaseAWG):
             def match_fn(match, got):
                 return match == got
 
-        if match_fn(match, self._send("R" + channel + command)):
-            self.printdebug(f"already set {match}")
+        if read_first and match_fn(match, self._send("R" + channel + command)):
+            self.printdebug("already set %s", match)
             return
 
         for _ in range(RETRY_COUNT):
             self._send("W" + channel + command + value)
             if match_fn(match, self._send("R" + channel + command)):
-                self.printdebug(f"matched {match}")
+                self.printdebug("matched %s", match)
                 return
-            self.printdebug(f"mismatched {match}")
+            self.printdebug("mismatched %s", match)
 
         # Print a warning.  This is not an error because the AWG read bugs
         # worked-around in this module could vary by AWG model number or
         # firmware revision number.
-        print(f"Warning: {'W' + channel + command + value} did not produce an expected response after {RETRY_COUNT} retries")
+        log("Warning: %s did not produce an expected response after %s retries", 'W' + channel + command + value, RETRY_COUNT)
         
 
 if __name__ == '__main__':
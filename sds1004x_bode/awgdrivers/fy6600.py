@@ -84,7 +84,7 @@ class FY6600(BaseAWG):
 
         Separate commands are thus needed to set the channels for the FY6600.
         """
-        self.printdebug(f"enable_output(channel: {channel}, on:{on})")
+        self.printdebug("enable_output(channel: %s, on:%s)", channel, on)
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
 
@@ -113,7 +113,7 @@ class FY6600(BaseAWG):
             WFF00000000000001 equals 1 uHz on channel 2
             and so on.
         """
-        self.printdebug(f"set_frequency(channel: {channel}, freq:{freq})")
+        self.printdebug("set_frequency(channel: %s, freq:%s)", channel, freq)
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
 
@@ -140,7 +140,7 @@ class FY6600(BaseAWG):
             WMP100.0 is 100.0 degrees on Channel 1
             WFP4.9 is 4.9 degrees on Channel 2. We are only setting phase on channel 2 here.
         """
-        self.printdebug(f"set_phase(channel: {channel}, phase: {phase}), but forced on channel 2")
+        self.printdebug("set_phase(channel: %s, phase: %s), but forced on channel 2", channel, phase)
         if phase < 0:
             phase += 360
 
@@ -156,7 +156,7 @@ class FY6600(BaseAWG):
             WFW00 for Sine wave channel 2
         Both commands are "hard-coded".
         """
-        self.printdebug(f"set_wave_type(channel: {channel}, wavetype:{wave_type}), but forcing sine wave")
+        self.printdebug("set_wave_type(channel: %s, wavetype:%s), but forcing sine wave", channel, wave_type)
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
         if wave_type not in constants.WAVE_TYPES:
@@ -180,7 +180,7 @@ class FY6600(BaseAWG):
             WMA0.44 for 0.44 volts Channel 1
             WFA9.87 for 9.87 volts Channel 2
         """
-        self.printdebug(f"set_amplitude(channel: {channel}, amplitude:{amplitude})")
+        self.printdebug("set_amplitude(channel: %s, amplitude:%s)", channel, amplitude)
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
 
@@ -209,7 +209,7 @@ class FY6600(BaseAWG):
         WMO0.33 sets channel 1 offset to 0.33 volts
         WFO-3.33sets channel 2 offset to -3.33 volts
         """
-        self.printdebug(f"set_offset(channel: {channel}, offset:{offset})")
+        self.printdebug("set_offset(channel: %s, offset:%s)", channel, offset)
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
         # Adjust the offset to the defined load impedance
@@ -229,7 +229,7 @@ class FY6600(BaseAWG):
         """
         Sets load impedance connected to each channel. Default value is 50 Ohm.
         """
-        self.printdebug(f"set_load_impedance(channel: {channel}, impedance:{z})")
+        self.printdebug("set_load_impedance(channel: %s, impedance:%s)", channel, z)
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
 
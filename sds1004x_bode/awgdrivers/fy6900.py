@@ -28,7 +28,7 @@ class Fy6900AWG(FygenAWG):
         """Sets frequency for a channel.
           freq is a floating point value in Hz.
         """
-        self.printdebug(f"set_frequency(channel: {channel}, freq:{freq})")
+        self.printdebug("set_frequency(channel: %s, freq:%s)", channel, freq)
         
         # for the reason of match_hz_only: see the base class
         def match_hz_only(match, got):
@@ -56,8 +56,10 @@ class JDS6600(BaseAWG):
         self.ser.close()
 
     def _send_command(self, cmd):
-        cmd = (cmd + EOL).encode()
-        self.ser.write(cmd)
+        self._write((cmd + EOL).encode())
+
+    def _write(self, data: bytes):
+        self.ser.write(data)
         time.sleep(SLEEP_TIME)
 
     def initialize(self):
@@ -84,7 +86,7 @@ class JDS6600(BaseAWG):
         enable outputs of channels 1, 2 and of both accordingly.
 
         """
-        self.printdebug(f"enable_output(channel: {channel}, on:{on})")
+        self.printdebug("enable_output(channel: %s, on:%s)", channel, on)
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
 
@@ -110,7 +112,7 @@ class JDS6600(BaseAWG):
             :w24=25786,3.
                 sets the output frequency of channel 2 to 25.786mHz.
         """
-        self.printdebug(f"set_frequency(channel: {channel}, freq:{freq})")
+        self.printdebug("set_frequency(channel: %s, freq:%s)", channel, freq)
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
 
@@ -127,6 +129,19 @@ class JDS6600(BaseAWG):
             cmd = ":w24=%s,0." % freq_str
             self._send_command(cmd)
 
+    def encode_frequencies(self, channel: int, freqs) -> list:
+        """
+        Encodes the commands of set_frequency() for one channel, to be sent by send_encoded_frequency().
+        """
+        if channel not in (1, 2):
+            raise UnknownChannelError(CHANNELS_ERROR)
+        register = "23" if channel == 1 else "24"
+        return [(":w%s=%s,0.%s" % (register, ("%.2f" % freq).replace(".", ""), EOL)).encode() for freq in freqs]
+
+    def send_encoded_frequency(self, channel: int, command: bytes):
+        self.printdebug("send_encoded_frequency(channel: %s, command: %s)", channel, command)
+        self._write(command)
+
     def set_phase(self, channel: int, phase: float):
         """
         Sends the phase setting command to the generator.
@@ -153,7 +168,7 @@ class JDS6600(BaseAWG):
             :w22=0.
         set wave forms of channels 1 and 2 accordingly to sine wave.
         """
-        self.printdebug(f"set_wave_type(channel: {channel}, wavetype:{wave_type})")
+        self.printdebug("set_wave_type(channel: %s, wavetype:%s)", channel, wave_type)
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
         if wave_type not in constants.WAVE_TYPES:
@@ -178,7 +193,7 @@ class JDS6600(BaseAWG):
             :w26=30.
         set amplitudes of channel 1 and channel 2 accordingly to 0.03V.
         """
-        self.printdebug(f"set_amplitude(channel: {channel}, amplitude:{amplitude})")
+        self.printdebug("set_amplitude(channel: %s, amplitude:%s)", channel, amplitude)
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
 
@@ -213,7 +228,7 @@ class JDS6600(BaseAWG):
             :w28=1.
                 sets the offset of channel 2 to -9.99V.
         """
-        self.printdebug(f"set_offset(channel: {channel}, offset:{offset})")
+        self.printdebug("set_offset(channel: %s, offset:%s)", channel, offset)
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
 
@@ -236,7 +251,7 @@ class JDS6600(BaseAWG):
         """
         Sets load impedance connected to each channel. Default value is 50 Ohm.
         """
-        self.printdebug(f"set_load_impedance(channel: {channel}, impedance:{z})")
+        self.printdebug("set_load_impedance(channel: %s, impedance:%s)", channel, z)
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
 
@@ -256,6 +271,50 @@ class JDS6600(BaseAWG):
             v_out_coeff = z / (z + R_IN)
         self.v_out_coeff[channel - 1] = v_out_coeff
 
+    def start_sweep(self, channel: int, start: float, stop: float, sweep_time: float, log_spacing: bool):
+        """
+        Starts the sweep of the selected channel. The JDS6600 sweeps one channel at a time.
+
+        Commands
+            :w40=1000000,0.
+            :w41=10000000,0.
+                set the start and stop frequency to 10kHz and 100kHz (same format as :w23).
+            :w42=50.
+                sets the sweep time to 5.0 seconds.
+            :w43=0.
+                sets the direction: 0 up, 1 down.
+            :w44=1.
+                sets the spacing: 0 linear, 1 logarithmic.
+            :w32=1,0,0,0.
+            :w32=0,1,0,0.
+                start the sweep of channels 1 and 2 accordingly.
+        """
+        self.printdebug("start_sweep(channel: %s, start: %s, stop: %s, time: %s, log: %s)",
+                        channel, start, stop, sweep_time, log_spacing)
+        if channel not in (1, 2):
+            raise UnknownChannelError(CHANNELS_ERROR)
+
+        direction = 0
+        if start > stop:
+            start, stop = stop, start
+            direction = 1
+        self._send_command(":w40=%s,0." % ("%.2f" % start).replace(".", ""))
+        self._send_command(":w41=%s,0." % ("%.2f" % stop).replace(".", ""))
+        self._send_command(":w42=%s." % max(1, int(round(sweep_time * 10))))
+        self._send_command(":w43=%s." % direction)
+        self._send_command(":w44=%s." % (1 if log_spacing else 0))
+        self._send_command(":w32=%s,%s,0,0." % ("1" if channel == 1 else "0", "1" if channel == 2 else "0"))
+
+    def stop_sweep(self, channel: int):
+        """
+        Stops the sweep.
+
+        Command
+            :w32=0,0,0,0.
+        """
+        self.printdebug("stop_sweep(channel: %s)", channel)
+        self._send_command(":w32=0,0,0,0.")
+
 
 if __name__ == '__main__':
     print("This module shouldn't be run. Run awg_tests.py or bode.py instead.")
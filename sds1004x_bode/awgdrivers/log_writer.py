@@ -0,0 +1,110 @@
+'''
+Created on Oct 17, 2026
+
+@author: hb020
+
+
+Console logging that stays off the request path.
+
+log() only queues the message and its arguments. A writer thread formats them (msg % args)
+and writes them to the console, so a slow terminal (SSH, serial console) never delays a request.
+Without a running writer, for instance in the test scripts, log() prints directly.
+
+Messages that depend on a verbosity level should be guarded by that level's flag,
+so that they cost nothing when it is off.
+
+'''
+
+import queue
+import sys
+import threading
+
+_writer = None
+
+
+class LogWriter(object):
+    """
+    Formats and writes the queued messages in a separate thread.
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream if stream is not None else sys.stdout
+        self.messages = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self.run, name="log-writer", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def put(self, msg: str, args: tuple):
+        self.messages.put((msg, args))
+
+    def run(self):
+        """
+        Writes the messages, as many as are queued at once, then flushes.
+        """
+        while True:
+            item = self.messages.get()
+            lines = []
+            while item is not None:
+                lines.append(format_message(*item))
+                try:
+                    item = self.messages.get_nowait()
+                except queue.Empty:
+                    break
+            if lines:
+                self.stream.write("\n".join(lines) + "\n")
+                self.stream.flush()
+            if item is None:
+                return
+
+    def stop(self):
+        """
+        Writes the queued messages and stops the thread.
+        """
+        if self.thread.is_alive():
+            self.messages.put(None)
+            self.thread.join()
+
+
+def format_message(msg: str, args: tuple) -> str:
+    if not args:
+        return msg
+    try:
+        return msg % args
+    except (TypeError, ValueError):
+        return f"{msg} {args}"
+
+
+def log(msg: str, *args):
+    """Logs a message, formatted with msg % args.
+
+    :param msg: the message, or its format
+    :type msg: str
+    :param args: the values for the format
+    """
+    writer = _writer
+    if writer is None:
+        print(format_message(msg, args))
+    else:
+        writer.put(msg, args)
+
+
+def start_log_writer():
+    """
+    Starts writing the messages in a separate thread.
+    """
+    global _writer
+    if _writer is None:
+        _writer = LogWriter()
+        _writer.start()
+
+
+def stop_log_writer():
+    """
+    Writes the queued messages and goes back to printing directly.
+    """
+    global _writer
+    writer = _writer
+    _writer = None
+    if writer is not None:
+        writer.stop()
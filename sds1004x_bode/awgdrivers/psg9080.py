@@ -56,8 +56,10 @@ class PSG9080(BaseAWG):
         self.ser.close()
 
     def _send_command(self, cmd):
-        cmd = (cmd + EOL).encode()
-        self.ser.write(cmd)
+        self._write((cmd + EOL).encode())
+
+    def _write(self, data: bytes):
+        self.ser.write(data)
         time.sleep(SLEEP_TIME)
 
     def initialize(self):
@@ -84,7 +86,7 @@ class PSG9080(BaseAWG):
         enable outputs of channels 1, 2 and of both accordingly.
 
         """
-        self.printdebug(f"enable_output(channel: {channel}, on:{on})")
+        self.printdebug("enable_output(channel: %s, on:%s)", channel, on)
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
 
@@ -110,7 +112,7 @@ class PSG9080(BaseAWG):
             :w14=25786,3.
                 sets the output frequency of channel 2 to 25.786mHz.
         """
-        self.printdebug(f"set_frequency(channel: {channel}, freq:{freq})")
+        self.printdebug("set_frequency(channel: %s, freq:%s)", channel, freq)
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
 
@@ -127,6 +129,19 @@ class PSG9080(BaseAWG):
             cmd = ":w14=%s,1." % freq_str
             self._send_command(cmd)
 
+    def encode_frequencies(self, channel: int, freqs) -> list:
+        """
+        Encodes the commands of set_frequency() for one channel, to be sent by send_encoded_frequency().
+        """
+        if channel not in (1, 2):
+            raise UnknownChannelError(CHANNELS_ERROR)
+        register = "13" if channel == 1 else "14"
+        return [(":w%s=%s,1.%s" % (register, ("%.2f" % (freq * 10)).replace(".", ""), EOL)).encode() for freq in freqs]
+
+    def send_encoded_frequency(self, channel: int, command: bytes):
+        self.printdebug("send_encoded_frequency(channel: %s, command: %s)", channel, command)
+        self._write(command)
+
     def set_phase(self, channel: int, phase: float):
         """
         Sends the phase setting command to the generator.
@@ -153,7 +168,7 @@ class PSG9080(BaseAWG):
             :w12=0.
         set wave forms of channels 1 and 2 accordingly to sine wave.
         """
-        self.printdebug(f"set_wave_type(channel: {channel}, wavetype:{wave_type})")
+        self.printdebug("set_wave_type(channel: %s, wavetype:%s)", channel, wave_type)
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
         if wave_type not in constants.WAVE_TYPES:
@@ -178,7 +193,7 @@ class PSG9080(BaseAWG):
             :w16=30.
         set amplitudes of channel 1 and channel 2 accordingly to 0.03V.
         """
-        self.printdebug(f"set_amplitude(channel: {channel}, amplitude:{amplitude})")
+        self.printdebug("set_amplitude(channel: %s, amplitude:%s)", channel, amplitude)
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
 
@@ -213,7 +228,7 @@ class PSG9080(BaseAWG):
             :w18=1.
                 sets the offset of channel 2 to -9.99V.
         """
-        self.printdebug(f"set_offset(channel: {channel}, offset:{offset})")
+        self.printdebug("set_offset(channel: %s, offset:%s)", channel, offset)
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
 
@@ -236,7 +251,7 @@ class PSG9080(BaseAWG):
         """
         Sets load impedance connected to each channel. Default value is 50 Ohm.
         """
-        self.printdebug(f"set_load_impedance(channel: {channel}, impedance:{z})")
+        self.printdebug("set_load_impedance(channel: %s, impedance:%s)", channel, z)
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
 
@@ -0,0 +1,106 @@
+'''
+Created on Oct 17, 2026
+
+@author: hb020
+
+
+Raw socket transport for the SCPI AWGs on the LAN.
+
+VISA opens TCPIP::<host>::INSTR with the VXI-11 protocol: a portmapper lookup when connecting,
+and an RPC call for every write and read. Most LAN instruments also accept SCPI on a raw TCP port
+(5555 for the Rigol DG800 and the Uni-T UTG1000X), with the commands and replies ended by a newline.
+With a port string like TCPIP::<host>::5555::SOCKET or socket://<host>:5555, the drivers use
+SocketInstrument instead of VISA: one TCP connection for the whole session, with TCP_NODELAY,
+so that a command is sent at once, and a preallocated receive buffer.
+
+SocketInstrument has the methods of a VISA resource that the drivers use.
+'''
+
+import socket
+
+# Port of the raw SCPI socket, when the port string has none
+DEFAULT_SOCKET_PORT = 5555
+
+# Size of the receive buffer. Replies longer than that are assembled from several reads.
+READ_BUFFER_SIZE = 4096
+
+SOCKET_URL_PREFIX = "socket://"
+
+
+def parse_socket_port(port: str) -> tuple:
+    """Recognizes the port strings of a raw SCPI socket.
+
+    :param port: the port string: TCPIP[board]::<host>::<port>::SOCKET or socket://<host>[:<port>]
+    :type port: str
+    :return: (host, port number), or None for the other port strings
+    :rtype: tuple
+    """
+    if port.lower().startswith(SOCKET_URL_PREFIX):
+        host, _, number = port[len(SOCKET_URL_PREFIX):].rstrip("/").rpartition(":")
+        if not host or not number.isdigit():
+            return port[len(SOCKET_URL_PREFIX):].rstrip("/"), DEFAULT_SOCKET_PORT
+        return host, int(number)
+    parts = port.split("::")
+    if len(parts) == 4 and parts[0].upper().startswith("TCPIP") and parts[3].upper() == "SOCKET":
+        return parts[1], int(parts[2])
+    return None
+
+
+class SocketInstrument(object):
+    """
+    A SCPI instrument on a raw TCP socket, with newline framing.
+    """
+
+    def __init__(self, host: str, port: int, timeout: int = 5000):
+        """
+        Connects to the instrument. The timeout is in milliseconds, as for VISA.
+        """
+        self.sock = socket.create_connection((host, port), timeout=timeout / 1000)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._timeout = timeout
+        # as for VISA, a raw socket has no message end to leave out
+        self.send_end = True
+        self.buffer = bytearray(READ_BUFFER_SIZE)
+        self.view = memoryview(self.buffer)
+        # bytes received after the last reply
+        self.received = b""
+
+    @property
+    def timeout(self) -> int:
+        return self._timeout
+
+    @timeout.setter
+    def timeout(self, timeout: int):
+        self._timeout = timeout
+        self.sock.settimeout(timeout / 1000)
+
+    def write(self, cmd: str):
+        self.sock.sendall(cmd.encode() + b"\n")
+
+    def write_raw(self, data: bytes):
+        self.sock.sendall(data)
+
+    def read(self) -> str:
+        """
+        Returns the next reply, without the newline.
+        """
+        parts = []
+        data = self.received
+        while True:
+            end = data.find(b"\n")
+            if end >= 0:
+                parts.append(data[:end])
+                self.received = data[end + 1:]
+                return b"".join(parts).decode().rstrip("\r")
+            parts.append(data)
+            count = self.sock.recv_into(self.buffer)
+            if count == 0:
+                raise ConnectionError("The instrument closed the connection.")
+            data = bytes(self.view[:count])
+
+    def query(self, cmd: str) -> str:
+        self.write(cmd)
+        return self.read()
+
+    def close(self):
+        self.sock.close()
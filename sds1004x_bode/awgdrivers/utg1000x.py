@@ -4,9 +4,12 @@ Created on June 27, 2024
 @author: catcream
 '''
 
+import time
 from .base_awg import BaseAWG
+from .error_check import ErrorChecker, ERROR_CHECK_COMMAND
+from .completion import CompletionTimer, COMPLETION_NONE
+from .visa_sessions import open_instrument, release_instrument
 from . import constants
-import pyvisa as visa
 from .exceptions import UnknownChannelError
 
 TIMEOUT = 5
@@ -32,58 +35,72 @@ class UTG1000x(BaseAWG):
     '''
 
     SHORT_NAME = "utg1000x"
-
-    def __init__(self, port: str = "", baud_rate: int = None, timeout: int = TIMEOUT, log_debug: bool = False):
-        """baud_rate parameter is ignored."""
+    # Policy of the error checks by default, see error_check.py
+    ERROR_CHECK = ERROR_CHECK_COMMAND
+    # Completion mode by default, see completion.py
+    COMPLETION = COMPLETION_NONE
+
+    def __init__(self, port: str = "", baud_rate: int = None, timeout: int = TIMEOUT, log_debug: bool = False,
+                 error_check: str = ERROR_CHECK_COMMAND, completion: str = COMPLETION_NONE):
+        """
+        baud_rate parameter is ignored. error_check is the policy of the error checks, see error_check.py.
+        completion is the mode of waiting for the completion of the commands, see completion.py.
+        """
         super().__init__(log_debug=log_debug)
         self.printdebug("init")
         self.port = port
-        self.rm = None
         self.m = None
         self.timeout = timeout
         self.channel_on = [False, False]
+        self.error_checker = ErrorChecker(self._query_error, error_check)
+        self.completion = CompletionTimer(self.SHORT_NAME, completion, timeout)
         self.r_load = [DEFAULT_LOAD, DEFAULT_LOAD]
         self.v_out_coeff = [1, 1]
 
     def _send_command(self, cmd):
         # local function to send a command and check for errors
-        self.printdebug(f"send command \"{cmd}\"")
-        self.m.write(cmd)
-        r = self.m.query(":SYSTem:ERRor?")
-        if r.startswith("0,"):
-            return True
-        else:
-            print(f"ERR: command \"{cmd}\" returned {r}")
-            # raise some error maybe
-            return False
+        self.printdebug("send command \"%s\"", cmd)
+        # the lock shares the VISA session with the error poller
+        with self.error_checker.lock:
+            start = time.perf_counter()
+            self.m.write(cmd)
+            self.completion.wait(self.m, cmd, start)
+            return self.error_checker.sent(cmd)
+
+    def _query_error(self) -> str:
+        return self.m.query(":SYSTem:ERRor?")
 
     def _connect(self):
-        self.rm = visa.ResourceManager()
-        self.m = self.rm.open_resource(self.port)
-        self.m.timeout = self.timeout * 1000
+        # the VISA session of the process, or a raw SCPI socket, kept open for the next connection
+        self.m = open_instrument(self.port, self.timeout * 1000)
 
     def disconnect(self):
         self.printdebug("disconnect")
+        self.error_checker.stop()
+        if self.log_debug:
+            self.printdebug("%s", self.error_checker.summary())
+            if self.completion.mode != COMPLETION_NONE:
+                self.printdebug("%s", self.completion.summary())
         if self.m is not None:
             self.enable_output(0, False)
-            self.m.close()
+            release_instrument(self.port, self.m)
             self.m = None
-        if self.rm is not None:
-            self.rm.close()
-            self.rm = None
 
     def initialize(self):
         self.printdebug("initialize")
         self._connect()
         self.m.write("*CLS")
         self.m.write("*RST")
+        self.error_checker.start()
 
     def get_id(self) -> str:
-        ans = self.m.query("*IDN?")
+        with self.error_checker.lock:
+            self.error_checker.barrier()
+            ans = self.m.query("*IDN?")
         return ans.strip()
 
     def enable_output(self, channel: int, on: bool):
-        self.printdebug(f"enable_output(channel: {channel}, on:{on})")
+        self.printdebug("enable_output(channel: %s, on:%s)", channel, on)
 
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
@@ -94,9 +111,12 @@ class UTG1000x(BaseAWG):
         else:
             self.channel_on[channel - 1] = on
             self._send_command(f":CHAN{channel}:OUTPUT {'ON' if on else 'OFF'}")
+            # the output is a barrier: the errors of the settings are known before the measurement
+            with self.error_checker.lock:
+                self.error_checker.barrier()
 
     def set_frequency(self, channel: int, freq: float):
-        self.printdebug(f"set_frequency(channel: {channel}, freq:{freq})")
+        self.printdebug("set_frequency(channel: %s, freq:%s)", channel, freq)
 
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
@@ -105,10 +125,10 @@ class UTG1000x(BaseAWG):
             self.set_frequency(1, freq)
             self.set_frequency(2, freq)
         else:
-            self._send_command(f":CHAN{channel}:BASE:FREQ {freq:.10f}")
+            self._send_command(self._frequency_command(channel, freq))
 
     def set_phase(self, channel: int, phase: float):
-        self.printdebug(f"set_phase(channel: {channel}, phase: {phase})")
+        self.printdebug("set_phase(channel: %s, phase: %s)", channel, phase)
         # phase settings do not really work on this device, but I try anyway
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
@@ -117,22 +137,10 @@ class UTG1000x(BaseAWG):
             self.set_phase(1, phase)
             self.set_phase(2, phase)
         else:
-            try:
-                phase = int(phase)
-            except:
-                phase = 0
-            # Allow phase to wrap below 0
-            if phase < 0:
-                phase += 360
-            # but if still off, use defaults
-            if phase < 0:
-                phase = 0
-            if phase > 360:
-                phase = 0
-            self._send_command(f":CHAN{channel}:BASE:PHASE {phase}")
+            self._send_command(self._phase_command(channel, phase))
 
     def set_wave_type(self, channel: int, wave_type: int):
-        self.printdebug(f"set_wave_type(channel: {channel}, wavetype:{wave_type})")
+        self.printdebug("set_wave_type(channel: %s, wavetype:%s)", channel, wave_type)
 
         if wave_type not in constants.WAVE_TYPES:
             raise ValueError("Incorrect wave type.")
@@ -144,12 +152,10 @@ class UTG1000x(BaseAWG):
             self.set_wave_type(1, wave_type)
             self.set_wave_type(2, wave_type)
         else:
-            cmd = WAVEFORM_COMMANDS[wave_type]
-            cmd = cmd.replace("{channel}", str(channel))
-            self._send_command(cmd)
+            self._send_command(self._wave_type_command(channel, wave_type))
 
     def set_amplitude(self, channel: int, amplitude: float):
-        self.printdebug(f"set_amplitude(channel: {channel}, amplitude:{amplitude})")
+        self.printdebug("set_amplitude(channel: %s, amplitude:%s)", channel, amplitude)
 
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
@@ -158,12 +164,10 @@ class UTG1000x(BaseAWG):
             self.set_amplitude(1, amplitude)
             self.set_amplitude(2, amplitude)
         else:
-            # Adjust the amplitude to the defined load impedance
-            amplitude = amplitude / self.v_out_coeff[channel - 1]
-            self._send_command(f":CHAN{channel}:BASE:AMPL {amplitude:.3f}")
+            self._send_command(self._amplitude_command(channel, amplitude))
 
     def set_offset(self, channel: int, offset: float):
-        self.printdebug(f"set_offset(channel: {channel}, offset:{offset})")
+        self.printdebug("set_offset(channel: %s, offset:%s)", channel, offset)
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
 
@@ -171,12 +175,10 @@ class UTG1000x(BaseAWG):
             self.set_offset(1, offset)
             self.set_offset(2, offset)
         else:
-            # Adjust the offset to the defined load impedance
-            offset = offset / self.v_out_coeff[channel - 1]
-            self._send_command(f":CHAN{channel}:BASE:OFFS {offset}")
+            self._send_command(self._offset_command(channel, offset))
 
     def set_load_impedance(self, channel: int, z: float):
-        self.printdebug(f"set_load_impedance(channel: {channel}, impedance:{z})")
+        self.printdebug("set_load_impedance(channel: %s, impedance:%s)", channel, z)
 
         if channel is not None and channel not in CHANNELS:
             raise UnknownChannelError(CHANNELS_ERROR)
@@ -192,6 +194,84 @@ class UTG1000x(BaseAWG):
             self.v_out_coeff[channel - 1] = v_out_coeff
             self._send_command(f":CHAN{channel}:LOAD {z}")
 
+    def set_basic_wave(self, channel: int, **params):
+        self.printdebug("set_basic_wave(channel: %s, %s)", channel, params)
+
+        if channel is not None and channel not in CHANNELS:
+            raise UnknownChannelError(CHANNELS_ERROR)
+
+        if channel is None or channel == 0:
+            self.set_basic_wave(1, **params)
+            self.set_basic_wave(2, **params)
+        elif params:
+            # One message for all parameters, so that the errors are queried only once
+            cmds = [getattr(self, f"_{name}_command")(channel, value) for name, value in params.items()]
+            self._send_command(";".join(cmds))
+
+    def start_sweep(self, channel: int, start: float, stop: float, sweep_time: float, log_spacing: bool):
+        self.printdebug("start_sweep(channel: %s, start: %s, stop: %s, time: %s, log: %s)",
+                        channel, start, stop, sweep_time, log_spacing)
+
+        if channel is not None and channel not in CHANNELS:
+            raise UnknownChannelError(CHANNELS_ERROR)
+
+        if channel is None or channel == 0:
+            self.start_sweep(1, start, stop, sweep_time, log_spacing)
+            self.start_sweep(2, start, stop, sweep_time, log_spacing)
+        else:
+            # The sweep is a mode of the channel: LINE or LOG. A start frequency above the stop frequency sweeps down.
+            self._send_command(f":CHAN{channel}:SWE:FREQ:STAR {start:.10f};"
+                               f":CHAN{channel}:SWE:FREQ:STOP {stop:.10f};"
+                               f":CHAN{channel}:SWE:TIME {sweep_time};"
+                               f":CHAN{channel}:SWE:TRIG:SOUR INT;"
+                               f":CHAN{channel}:MODE {'LOG' if log_spacing else 'LINE'}")
+
+    def stop_sweep(self, channel: int):
+        self.printdebug("stop_sweep(channel: %s)", channel)
+
+        if channel is not None and channel not in CHANNELS:
+            raise UnknownChannelError(CHANNELS_ERROR)
+
+        if channel is None or channel == 0:
+            self.stop_sweep(1)
+            self.stop_sweep(2)
+        else:
+            self._send_command(f":CHAN{channel}:MODE CONT")
+
+    def _frequency_command(self, channel: int, freq: float) -> str:
+        return f":CHAN{channel}:BASE:FREQ {freq:.10f}"
+
+    def _phase_command(self, channel: int, phase: float) -> str:
+        try:
+            phase = int(phase)
+        except:
+            phase = 0
+        # Allow phase to wrap below 0
+        if phase < 0:
+            phase += 360
+        # but if still off, use defaults
+        if phase < 0:
+            phase = 0
+        if phase > 360:
+            phase = 0
+        return f":CHAN{channel}:BASE:PHASE {phase}"
+
+    def _wave_type_command(self, channel: int, wave_type: int) -> str:
+        if wave_type not in constants.WAVE_TYPES:
+            raise ValueError("Incorrect wave type.")
+        cmd = WAVEFORM_COMMANDS[wave_type]
+        return cmd.replace("{channel}", str(channel))
+
+    def _amplitude_command(self, channel: int, amplitude: float) -> str:
+        # Adjust the amplitude to the defined load impedance
+        amplitude = amplitude / self.v_out_coeff[channel - 1]
+        return f":CHAN{channel}:BASE:AMPL {amplitude:.3f}"
+
+    def _offset_command(self, channel: int, offset: float) -> str:
+        # Adjust the offset to the defined load impedance
+        offset = offset / self.v_out_coeff[channel - 1]
+        return f":CHAN{channel}:BASE:OFFS {offset}"
+
 
 if __name__ == '__main__':
     print("This module shouldn't be run. Run awg_tests.py or bode.py instead.")
@@ -7,7 +7,9 @@ This driver is based on the utg1000x driver. The only difference is that the utg
 
 '''
 
+import time
 from .utg1000x import UTG1000x
+from .completion import COMPLETION_NONE
 
 TIMEOUT = 5
 
@@ -20,15 +22,24 @@ class UTG900e(UTG1000x):
     '''
 
     SHORT_NAME = "utg900e"
+    # No error queue to check
+    ERROR_CHECK = None
 
-    def __init__(self, port: str = "", baud_rate: int = None, timeout: int = TIMEOUT, log_debug: bool = False):
-        """baud_rate parameter is ignored."""
-        super().__init__(port, baud_rate, timeout, log_debug)  
+    def __init__(self, port: str = "", baud_rate: int = None, timeout: int = TIMEOUT, log_debug: bool = False,
+                 completion: str = COMPLETION_NONE):
+        """
+        baud_rate parameter is ignored.
+        completion is the mode of waiting for the completion of the commands, see completion.py.
+        """
+        super().__init__(port, baud_rate, timeout, log_debug, completion=completion)
 
     def _send_command(self, cmd):
-        # local function to send a command and check for errors
-        self.printdebug(f"send command \"{cmd}\"")
-        self.m.write(cmd)
+        # local function to send a command, without error check
+        self.printdebug("send command \"%s\"", cmd)
+        with self.error_checker.lock:
+            start = time.perf_counter()
+            self.m.write(cmd)
+            self.completion.wait(self.m, cmd, start)
         return True
 
 
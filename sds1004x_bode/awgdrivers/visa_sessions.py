@@ -0,0 +1,112 @@
+'''
+Created on Oct 17, 2026
+
+@author: hb020
+
+
+The VISA sessions of the process, shared by the SCPI drivers and the tools.
+
+Creating a VISA ResourceManager is slow with pyvisa-py, and so is opening a resource. There is one
+ResourceManager per process, created when it is first needed. The instruments are cached by their port
+string: a driver that disconnects releases its instrument, which stays open, and the next driver that
+connects to the same port string gets it back at once, after a *IDN? query that checks that it still answers.
+An instrument that does not is closed and opened again. Everything is closed when the process exits.
+
+The port strings of a raw SCPI socket (see scpi_socket.py) give a SocketInstrument, which is cached the same way.
+
+An instrument is used by one driver at a time.
+'''
+
+import atexit
+import threading
+import pyvisa as visa
+from .scpi_socket import SocketInstrument, parse_socket_port
+
+_lock = threading.Lock()
+_resource_manager = None
+# port string -> open instrument
+_instruments = {}
+
+
+def get_resource_manager() -> visa.ResourceManager:
+    """
+    Returns the ResourceManager of the process, and creates it the first time.
+    """
+    global _resource_manager
+    with _lock:
+        if _resource_manager is None:
+            _resource_manager = visa.ResourceManager()
+        return _resource_manager
+
+
+def open_instrument(port: str, timeout: int):
+    """Returns the instrument of a port string, opened, or from the cache.
+
+    :param port: a VISA resource string, or the port string of a raw SCPI socket
+    :type port: str
+    :param timeout: the timeout, in milliseconds
+    :type timeout: int
+    :return: the VISA resource, or the SocketInstrument
+    """
+    with _lock:
+        instrument = _instruments.pop(port, None)
+    if instrument is not None:
+        instrument.timeout = timeout
+        if not _is_alive(instrument):
+            # the AWG was switched off or unplugged since it was released: open it again
+            try:
+                instrument.close()
+            except Exception:
+                pass
+            instrument = None
+    if instrument is None:
+        socket_port = parse_socket_port(port)
+        if socket_port is not None:
+            instrument = SocketInstrument(*socket_port, timeout=timeout)
+        else:
+            instrument = get_resource_manager().open_resource(port)
+    instrument.timeout = timeout
+    return instrument
+
+
+def _is_alive(instrument) -> bool:
+    """
+    Checks a cached instrument with a query that every SCPI AWG answers.
+    """
+    try:
+        return bool(instrument.query("*IDN?"))
+    except Exception:
+        return False
+
+
+def release_instrument(port: str, instrument):
+    """
+    Gives back an instrument that is no longer used, which stays open for the next open_instrument() of its port string.
+    """
+    with _lock:
+        previous = _instruments.get(port)
+        _instruments[port] = instrument
+    if previous is not None and previous is not instrument:
+        previous.close()
+
+
+def close_instruments():
+    """
+    Closes the released instruments and the ResourceManager.
+    """
+    global _resource_manager
+    with _lock:
+        instruments = list(_instruments.values())
+        _instruments.clear()
+        resource_manager = _resource_manager
+        _resource_manager = None
+    for instrument in instruments:
+        try:
+            instrument.close()
+        except Exception:
+            pass
+    if resource_manager is not None:
+        resource_manager.close()
+
+
+atexit.register(close_instruments)
@@ -5,8 +5,16 @@ Created on May 5, 2018
 '''
 
 import argparse
-from awg_server import AwgServer
+from awg_server import AwgServer, linkMode
+from awg_server_async import AsyncAwgServer
 from awg_factory import awg_factory
+from awg_shadow import ShadowAWG
+from sweep_predictor import PredictingAWG, supports_prediction
+from write_behind import DEFAULT_BARRIERS
+from command_parser import PARSE_CACHE_SIZE
+from awgdrivers.log_writer import log, start_log_writer, stop_log_writer
+from awgdrivers.error_check import ERROR_CHECK_POLICIES, ERROR_CHECK_INTERVAL
+from awgdrivers.completion import COMPLETION_MODES
 
 DEFAULT_AWG = "dummy"
 DEFAULT_PORT = "/dev/ttyUSB0"
@@ -19,19 +27,18 @@ def main():
     parser.add_argument("baudrate", type=int, nargs='?', default=DEFAULT_BAUD_RATE, help=f"When using serial, baud rate to use. (default: {DEFAULT_BAUD_RATE})")
     parser.add_argument('-v', default=0, help="Verbosity level. Specify one or more 'v' for more detail in the logs.", action="count", dest="verbosity")
     parser.add_argument('-1', default=0, help="Run only once: exit after one bode plot is done. If not specified: use Ctrl-C to stop the program.", dest="runonce", action="store_true", required=False)
+    parser.add_argument('--asyncio', default=False, help="Use the asyncio based VXI-11 server engine instead of the blocking one.", dest="use_asyncio", action="store_true", required=False)
+    parser.add_argument('--link-mode', default=linkMode.LINK_AUTO.value, choices=[m.value for m in linkMode], help="VXI-11 link handling: 'hop' moves to a new port after every link (as SDS800X-HD requires), 'persistent' keeps links, connections and the port, 'auto' uses persistent links for clients that send several commands per link. (default: auto)", dest="link_mode", required=False)
+    parser.add_argument('--write-behind', default=False, help="Reply to the scope before the AWG has executed a command. The commands are executed in order by a separate thread.", dest="write_behind", action="store_true", required=False)
+    parser.add_argument('--barrier', default=None, help=f"With --write-behind: a command header the scope waits for until the AWG has executed it. Can be repeated. Queries always wait. (default: {', '.join(DEFAULT_BARRIERS)})", dest="barriers", action="append", required=False)
+    parser.add_argument('--parse-cache', default=PARSE_CACHE_SIZE, type=int, help=f"Number of parsed SCPI command lines to keep for reuse. 0 disables the cache. (default: {PARSE_CACHE_SIZE})", dest="parse_cache_size", required=False)
+    parser.add_argument('--no-shadow', default=False, help="Send every setting to the AWG, even if the AWG already has that value.", dest="no_shadow", action="store_true", required=False)
+    parser.add_argument('--predict', default=False, help="Predict the next frequencies of a sweep and encode them in advance (jds6600, psg9080, fy). The fy driver then does not read a predicted frequency before writing it.", dest="predict", action="store_true", required=False)
+    parser.add_argument('--error-check', default=None, choices=ERROR_CHECK_POLICIES, help=f"For the SCPI AWGs with an error queue (dg800, dg800p, utg1000x): when to read it. 'command' after every command, 'batch' after every {ERROR_CHECK_INTERVAL} commands, 'barrier' only when an output is switched, 'sampled' after one command in {ERROR_CHECK_INTERVAL} at random, 'background' by a separate thread when no command is being sent. All but 'command' also read it when an output is switched. (default: command)", dest="error_check", required=False)
+    parser.add_argument('--completion', default=None, choices=COMPLETION_MODES, help="For the SCPI AWGs (dg800, dg800p, utg1000x, utg900e): wait until each command is complete, with '*OPC?' or by polling the event status register ('status'). The completion times per command are printed at the end with -v. (default: none)", dest="completion", required=False)
     args = parser.parse_args()
 
-    # Extract AWG name from parameters
-    awg_name = args.awg
-    # Extract port name from parameters
-    awg_port = args.port
-    # Extract AWG port baud rate from parameters
-    awg_baud_rate = args.baudrate
-    # and whether to run only once
-    runonce = args.runonce
-    
-    # Using the logging module in multiprocessing makes the code more complicated to read.
-    # So I keep it simple
+    # The messages are written to the console by a separate thread, see log_writer.py
     log_commands = False
     log_mapping = False
     log_VXI = False
@@ -43,36 +50,76 @@ def main():
     if args.verbosity > 2:
         log_mapping = True
 
+    start_log_writer()
+    try:
+        run(args, log_commands, log_VXI, log_mapping)
+    finally:
+        stop_log_writer()
+
+
+def run(args, log_commands: bool, log_VXI: bool, log_mapping: bool):
+    """
+    Initializes the AWG and runs the server.
+    """
+    # Extract AWG name from parameters
+    awg_name = args.awg
+    # Extract port name from parameters
+    awg_port = args.port
+    # Extract AWG port baud rate from parameters
+    awg_baud_rate = args.baudrate
+    # and whether to run only once
+    runonce = args.runonce
+
     # Initialize AWG
-    print("Initializing AWG...")
-    print(f"AWG: {awg_name}")
-    print(f"Port: {awg_port}")
+    log("Initializing AWG...")
+    log("AWG: %s", awg_name)
+    log("Port: %s", awg_port)
     awg_class = awg_factory.get_class_by_name(awg_name)
-    awg = awg_class(port=awg_port, baud_rate=awg_baud_rate, log_debug=log_commands)
+    awg_options = {}
+    if args.error_check is not None:
+        if getattr(awg_class, "ERROR_CHECK", None) is not None:
+            awg_options["error_check"] = args.error_check
+        else:
+            log("The %s AWG has no error queue, --error-check is ignored.", awg_name)
+    if args.completion is not None:
+        if hasattr(awg_class, "COMPLETION"):
+            awg_options["completion"] = args.completion
+        else:
+            log("The %s AWG does not report the completion of commands, --completion is ignored.", awg_name)
+    awg = awg_class(port=awg_port, baud_rate=awg_baud_rate, log_debug=log_commands, **awg_options)
+    if args.predict and supports_prediction(awg):
+        # Encode the next frequencies of a sweep in advance
+        awg = PredictingAWG(awg)
+    if not args.no_shadow:
+        # Skip the settings that the AWG already has
+        awg = ShadowAWG(awg)
     awg.initialize()
-    print(f"IDN: {awg.get_id()}")
-    print("AWG initialized.")
+    log("IDN: %s", awg.get_id())
+    log("AWG initialized.")
     if runonce:
-        print("The program will stop after one bode plot is done. You can also use Ctrl-C to stop the program at any time.")
+        log("The program will stop after one bode plot is done. You can also use Ctrl-C to stop the program at any time.")
     else:
-        print("Use Ctrl-C to stop the program.")
+        log("Use Ctrl-C to stop the program.")
 
     # Run AWG server
     server = None
     try:
-        server = AwgServer(awg, log_VXI=log_VXI, log_mapping=log_mapping, runonce=runonce)
+        server_class = AsyncAwgServer if args.use_asyncio else AwgServer
+        server = server_class(awg, log_VXI=log_VXI, log_mapping=log_mapping, log_commands=log_commands, runonce=runonce, link_mode=linkMode(args.link_mode),
+                              write_behind=args.write_behind, barriers=args.barriers or DEFAULT_BARRIERS,
+                              parse_cache_size=args.parse_cache_size)
         server.start()
 
     except KeyboardInterrupt:
-        print('Ctrl+C pressed. Exiting...')
+        log('Ctrl+C pressed. Exiting...')
 
     finally:
-        print("Stopping server...")
+        log("Stopping server...")
         if server is not None:
             server.close_sockets()
             del server
 
-    print("Bye.")
+    log("Bye.")
 
 
 if __name__ == '__main__':
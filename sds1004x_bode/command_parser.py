@@ -4,22 +4,276 @@ Created on May 4, 2018
 @author: 4x1md
 '''
 
+import threading
+from collections import OrderedDict
 from awgdrivers import constants
+from awgdrivers.log_writer import log
+from software_sweep import SoftwareSweep
+
+# SCPI headers, in short and long form, and the short form they stand for
+HEADERS = {
+    "BSWV": "BSWV",
+    "BASIC_WAVE": "BSWV",
+    "OUTP": "OUTP",
+    "OUTPUT": "OUTP",
+    "SWWV": "SWWV",
+    "SWEEPWAVE": "SWWV",
+    "WVDT": "WVDT",
+}
+
+# Names of the wave types in the replies
+WAVE_NAMES = {
+    constants.SINE: "SINE",
+    constants.SQUARE: "SQUARE",
+    constants.PULSE: "PULSE",
+    constants.TRIANGLE: "RAMP",
+    constants.ARBITRARY: "ARB",
+}
+
+# Bits of the standard event status register (*ESR?): set by *OPC, and by a command that cannot be parsed
+OPC_EVENT = 0x01
+COMMAND_ERROR_EVENT = 0x20
+
+# Units that may follow a number (FRQ,10HZ, AMP,2V, TIME,5S). The first that matches is removed.
+UNIT_SUFFIXES = ("HZ", "V", "S")
+
+# Channel of the commands that do not specify one
+DEFAULT_CHANNEL = 1
+
+# Part of a command line searched for the start of a binary block. The block follows a short header.
+BLOCK_SEARCH_SIZE = 512
+
+# Number of compiled lines kept. A bode plot repeats the same lines, with the same frequencies on every run.
+PARSE_CACHE_SIZE = 1024
+
+# AWG ID to send to the oscilloscope
+#  Examples: SDG SDG2042X SDG0000X SDG2000X
+#  The ID should begin with SDG letters.
+AWG_ID_STRING = "IDN-SGLT-PRI SDG0000X"
+# Reply to *IDN?: manufacturer, model, serial number, firmware version
+AWG_IDN_STRING = "Siglent Technologies,SDG0000X,SDG00000000000,1.01.01.33"
+
+
+class ChannelState(object):
+    """
+    The settings of one channel of the emulated Siglent AWG, with its power-on values.
+    """
+
+    def __init__(self):
+        self.wave_type = constants.SINE
+        self.frequency = 1000.0
+        self.amplitude = 4.0
+        self.offset = 0.0
+        self.phase = 0.0
+        self.load = constants.HI_Z
+        self.output = False
+        self.sweep_state = False
+        self.sweep_time = 1.0
+        self.sweep_start = 500.0
+        self.sweep_stop = 1500.0
+        self.sweep_mode = "LINE"
+        self.sweep_direction = "UP"
+
+
+def format_number(value: float) -> str:
+    """
+    Formats a setting the way the Siglent AWG does, without trailing zeros.
+    """
+    return "%.10g" % value
+
+
+class CommandParseError(ValueError):
+    """
+    A command with an argument that cannot be converted.
+    """
+    pass
+
+
+def parse_wave_type(arg: str) -> int:
+    """
+    Converts the argument of BSWV WVTP. It is not checked because
+    the oscilloscope will set sine waveform only.
+    """
+    return constants.SINE
+
+
+def parse_load(arg: str) -> float:
+    """
+    Converts the argument of OUTP LOAD: 50, 75 or HZ.
+    """
+    if arg == "HZ":
+        return constants.HI_Z
+    return int(arg)
+
+
+def split_binary_block(data) -> tuple:
+    """Splits a command line that may end with an IEEE 488.2 definite length block (#<n><length><bytes>).
+
+    The text is decoded, the block is not: it is returned as a slice of data, without copying it.
+
+    :param data: the command line, as received
+    :type data: memoryview
+    :return: the text of the command line (before the block, if any), and the block or None
+    :rtype: tuple
+    """
+    head = bytes(data[:BLOCK_SEARCH_SIZE])
+    start = head.find(b"#")
+    while start >= 0:
+        digits = head[start + 1:start + 2]
+        if digits.isdigit() and digits != b"0":
+            begin = start + 2 + int(digits)
+            length = head[start + 2:begin]
+            if len(length) == int(digits) and length.isdigit() and begin + int(length) <= len(data):
+                return str(head[:start], 'utf-8').strip(), data[begin:begin + int(length)]
+        start = head.find(b"#", start + 1)
+    return str(data, 'utf-8').strip(), None
+
+
+def parse_on_off(arg: str) -> bool:
+    """
+    Converts the argument of SWWV STATE: ON or OFF.
+    """
+    return arg == "ON"
+
+
+def parse_sweep_mode(arg: str) -> str:
+    """
+    Converts the argument of SWWV SWMD: LINE or LOG.
+    """
+    return "LOG" if arg == "LOG" else "LINE"
+
+
+def parse_direction(arg: str) -> str:
+    """
+    Converts the argument of SWWV DIR: UP or DOWN.
+    """
+    return "DOWN" if arg == "DOWN" else "UP"
 
 
 class CommandParser(object):
     """
     Parses the commands sent by the oscilloscope and sends them to the AWG.
+    It keeps the settings of the emulated Siglent AWG, to answer the queries.
+
+    A command line is compiled to a list of actions, which are then executed.
+    The compilation is driven by tables: one per header, with one entry per keyword.
+    An action is a tuple: the method to call, the channel and the value.
+    All settings of a BSWV command are one action, sent to the AWG with one set_basic_wave() call.
+    A single setting, as sent during the sweep, uses its own setter, which is the same but faster.
+    The settings of a SWWV command are one action too. A sweep that is switched on uses the sweep
+    of the AWG, or a software sweep if the driver has none.
+    A WVDT command carries a binary block, which is given to parse_scpi_command() separately.
+    The compiled lines are kept in an LRU cache, so a repeated line is only executed.
     """
 
-    def __init__(self, awg):
+    def __init__(self, awg, cache_size: int = PARSE_CACHE_SIZE, log_commands: bool = False):
         """
         Initializes the command parses.
-        Gets an instance of the initialized AWG as argument.
+        Gets an instance of the initialized AWG as argument,
+        the number of compiled lines to keep (0 disables the cache),
+        and whether to log the received command lines.
         """
         self.awg = awg
+        self.log_commands = log_commands
+        # line -> actions, the least recently used first
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # channel number -> ChannelState
+        self.channels = {1: ChannelState(), 2: ChannelState()}
+        # channel number -> running SoftwareSweep
+        self.sweeps = {}
+        # Held while commands are compiled (the cache is shared) and executed, and during the steps of the software sweeps
+        self.lock = threading.Lock()
+        # The binary block of the command line being executed, if any
+        self.block = None
+        # Standard event status register, read and cleared by *ESR?
+        self.event_status = 0
+        # Keyword tables: keyword -> (method, conversion of the argument, value)
+        #  Keywords without argument have no conversion, and use the value.
+        #  For the headers that are sent as a batch, the method is the name of the parameter.
+        self.keywords = {
+            "BSWV": {
+                "WVTP": ("wave_type", parse_wave_type, None),
+                "FRQ": ("frequency", float, None),
+                "AMP": ("amplitude", float, None),
+                "OFST": ("offset", float, None),
+                "PHSE": ("phase", float, None),
+            },
+            "OUTP": {
+                "ON": (self.enable_output, None, True),
+                "OFF": (self.enable_output, None, False),
+                "LOAD": (self.set_load_impedance, parse_load, None),
+            },
+            "SWWV": {
+                "STATE": ("sweep_state", parse_on_off, None),
+                "TIME": ("sweep_time", float, None),
+                "START": ("sweep_start", float, None),
+                "STOP": ("sweep_stop", float, None),
+                "SWMD": ("sweep_mode", parse_sweep_mode, None),
+                "DIR": ("sweep_direction", parse_direction, None),
+            },
+            "WVDT": {
+                "WVNM": ("wave_name", str, None),
+                "FREQ": ("frequency", float, None),
+                "AMPL": ("amplitude", float, None),
+                "OFST": ("offset", float, None),
+                "PHASE": ("phase", float, None),
+                # the wave data is the binary block
+                "WAVEDATA": ("wave_data", None, True),
+            },
+        }
+        # Queries of a channel: short header -> method
+        self.queries = {
+            "BSWV": self.query_bswv,
+            "OUTP": self.query_outp,
+            "SWWV": self.query_swwv,
+        }
+        # Methods that take all settings of a header at once: short header -> method
+        self.batches = {
+            "BSWV": self.set_basic_wave,
+            "SWWV": self.set_sweep,
+            "WVDT": self.set_wave_data,
+        }
+        # Methods for the single settings of a batch, where faster: parameter name -> method
+        self.setters = {
+            "wave_type": self.set_wave_type,
+            "frequency": self.set_frequency,
+            "amplitude": self.set_amplitude,
+            "offset": self.set_offset,
+            "phase": self.set_phase,
+        }
+        # All forms of the headers, with and without '?': header -> (keyword table, query method, batch method)
+        #  The queries and the commands without channel and arguments are headers too.
+        #  The commands are executed in order, so *OPC, *OPC? and *WAI find all previous commands complete.
+        #  With write-behind, they wait for the queued commands (see write_behind.py).
+        self.headers = {
+            "*IDN?": (None, self.query_idn, None),
+            "IDN-SGLT-PRI?": (None, self.query_id, None),
+            "*OPC?": (None, self.query_opc, None),
+            "*OPC": (None, self.set_opc, None),
+            "*WAI": (None, self.wait, None),
+            "*ESR?": (None, self.query_esr, None),
+            "*CLS": (None, self.clear_status, None),
+        }
+        for header, short in HEADERS.items():
+            self.headers[header] = (self.keywords[short], None, self.batches.get(short))
+            if short in self.queries:
+                self.headers[header + "?"] = (None, self.queries[short], None)
+        # Channel prefixes seen so far: prefix (C1, C2 ...) -> channel number
+        self.prefixes = {}
+
+    def get_channel(self, channel: int) -> ChannelState:
+        """
+        Returns the settings of a channel, as set by the previous commands.
+        """
+        state = self.channels.get(channel)
+        if state is None:
+            state = self.channels[channel] = ChannelState()
+        return state
 
-    def parse_scpi_command(self, line):
+    def parse_scpi_command(self, line, block=None):
         """
         Parses the commands send by the oscilloscope and sends them to the AWG.
 
@@ -30,101 +284,390 @@ class CommandParser(object):
             3. C1:BSWV? - queries the AWG settings defined by the previous command.
             Actual implementation of the bode plot doesn't require any reply from the AWG.
             4. C1:BSWV FRQ,10 - sets AWG frequency during the frequency sweep.
+            5. C1:SWWV STATE,ON,START,10,STOP,10000,TIME,5,SWMD,LOG - starts a sweep of the AWG.
+            6. C1:WVDT WVNM,wave1,FREQ,1000,AMPL,2,OFST,0,PHASE,0,WAVEDATA,#532768<32768 bytes> - uploads
+            an arbitrary wave. The line is given without the block, which is the block argument (see split_binary_block()).
 
-        If the command is a query to the AWG, it is ignored.
+        If the command is a query to the AWG, the reply is returned.
+        The queries are answered from the settings of the previous commands, the AWG is not used.
+        Returns None for the other commands and for the unknown queries.
+        Raises CommandParseError for an argument that cannot be converted, and sets the command error bit of *ESR?.
         """
-        print(f"> {line}")
-        if line.endswith("?"):
-            return
+        if self.log_commands:
+            log("> %s", line)
+        with self.lock:
+            try:
+                actions = self.compile_cached(line)
+            except CommandParseError:
+                self.event_status |= COMMAND_ERROR_EVENT
+                raise
+            if block is None:
+                return self.execute(actions)
+            self.block = block
+            try:
+                return self.execute(actions)
+            finally:
+                self.block = None
 
-        channel = int(line[1])
+    def compile_cached(self, line: str) -> list:
+        """Compiles a command line, or gets it from the cache. Called with self.lock held.
 
-        commands = line[3:].split(';')
+        :param line: the command line
+        :type line: str
+        :return: the actions
+        :rtype: list
+        """
+        actions = self.cache.get(line)
+        if actions is not None:
+            self.cache_hits += 1
+            self.cache.move_to_end(line)
+            return actions
+        self.cache_misses += 1
+        actions = self.compile(line)
+        if self.cache_size > 0:
+            self.cache[line] = actions
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return actions
 
-        for command in commands:
-            token = command[0:4]
-            args = command[5:].split(',')
+    def cache_summary(self) -> str:
+        """
+        Returns a printable summary of the cache use since the previous call, and resets the counters.
+        """
+        with self.lock:
+            lookups = self.cache_hits + self.cache_misses
+            ratio = self.cache_hits / lookups * 100 if lookups else 0
+            summary = (f"  parse cache: {self.cache_hits} hits, {self.cache_misses} misses ({ratio:.1f}% hits), "
+                       f"{len(self.cache)} of {self.cache_size} lines used")
+            self.cache_hits = 0
+            self.cache_misses = 0
+            return summary
 
-            if token == "BSWV":
-                self.parse_bswv(args, channel)
+    def compile(self, line: str) -> list:
+        """Compiles a command line to the list of actions to execute.
 
-            elif token == "OUTP":
-                self.parse_outp(args, channel)
+        The commands of a line are separated by ';'. Each may start with a channel (C1:, C2: ...),
+        the commands without channel use the channel of the previous one.
+        Headers can be given in short or long form (BSWV or BASIC_WAVE).
+        Unknown headers and keywords are ignored. The numbers may have a unit (HZ, V or S).
 
-    def parse_bswv(self, args, channel):
+        :param line: the command line
+        :type line: str
+        :return: the actions
+        :rtype: list
         """
-        Parses and executes the basic wave (BSWV) command which is used
-        to set the wave form, frequency, amplitude, offset and phase.
+        actions = []
+        channel = DEFAULT_CHANNEL
+        headers = self.headers
+        for command in line.upper().split(';'):
+            prefix, colon, rest = command.partition(':')
+            if colon:
+                channel = self.prefixes.get(prefix)
+                if channel is None:
+                    channel = self.parse_prefix(prefix)
+                command = rest
+            header, _, args = command.partition(' ')
+            header = headers.get(header)
+            if header is None:
+                continue
+            keywords, query, batch = header
+            if query is not None:
+                actions.append((query, channel, None))
+                continue
+            args = args.split(',')
+            count = len(args)
+            if count == 2 and batch is not None:
+                # a single setting, as sent during the sweep (FRQ,<frequency>): it uses its own setter, if any
+                keyword = keywords.get(args[0])
+                if keyword is not None and keyword[1] is not None:
+                    method, convert, _ = keyword
+                    try:
+                        value = convert(args[1])
+                    except ValueError:
+                        value = self.convert_with_unit(convert, args[0], args[1])
+                    setter = self.setters.get(method)
+                    if setter is not None:
+                        actions.append((setter, channel, value))
+                    else:
+                        actions.append((batch, channel, {method: value}))
+                    continue
+            # parameter name -> value, for a batch
+            settings = {}
+            n = 0
+            while n < count:
+                keyword = keywords.get(args[n])
+                n += 1
+                if keyword is None:
+                    continue
+                method, convert, value = keyword
+                if convert is not None:
+                    if n == count:
+                        break
+                    try:
+                        value = convert(args[n])
+                    except ValueError:
+                        value = self.convert_with_unit(convert, args[n - 1], args[n])
+                    n += 1
+                if batch is None:
+                    actions.append((method, channel, value))
+                else:
+                    settings[method] = value
+            if len(settings) == 1:
+                (name, value), = settings.items()
+                setter = self.setters.get(name)
+                if setter is not None:
+                    actions.append((setter, channel, value))
+                else:
+                    actions.append((batch, channel, settings))
+            elif settings:
+                actions.append((batch, channel, settings))
+        return actions
+
+    @staticmethod
+    def convert_with_unit(convert, keyword: str, arg: str):
+        """Converts the argument of a keyword that the conversion refused, without its unit (10HZ, 2V, 5S).
+        The units are rare, so they are only looked for when the plain conversion fails.
 
-        Examples:
-            BSWV WVTP,SINE,PHSE,0,FRQ,50000,AMP,2,OFST,0
-            BSWV FRQ,10.8890427
+        :param convert: the conversion of the keyword
+        :param keyword: the keyword, for the error message
+        :type keyword: str
+        :param arg: the argument
+        :type arg: str
+        :return: the value
+        :raises CommandParseError: if the argument cannot be converted, even without a unit
         """
-        n = 0
-        while n < len(args):
-            if args[n] == "WVTP":
-                """
-                The argument of the WVTP command is not checked because
-                the oscilloscope will set sine waveform only.
-                """
-                self.awg.set_wave_type(channel, constants.SINE)
-                n += 2
+        for unit in UNIT_SUFFIXES:
+            if arg.endswith(unit):
+                try:
+                    return convert(arg[:-len(unit)])
+                except ValueError:
+                    break
+        raise CommandParseError(f"Bad argument of {keyword}: {arg}")
 
-            elif args[n] == "FRQ":
-                freq = float(args[n + 1])
-                self.awg.set_frequency(channel, freq)
-                n += 2
+    def parse_prefix(self, prefix: str) -> int:
+        """Returns the channel of a channel prefix (C1, C2 ...), and adds it to the known prefixes.
 
-            elif args[n] == "AMP":
-                ampl = float(args[n + 1])
-                self.awg.set_amplitude(channel, ampl)
-                n += 2
+        :param prefix: the prefix, without ':'
+        :type prefix: str
+        :return: the channel, or DEFAULT_CHANNEL if the prefix is not a channel
+        :rtype: int
+        """
+        if prefix[0:1] != "C" or not prefix[1:].isdigit():
+            return DEFAULT_CHANNEL
+        channel = int(prefix[1:])
+        self.get_channel(channel)
+        self.prefixes[prefix] = channel
+        return channel
 
-            elif args[n] == "OFST":
-                offset = float(args[n + 1])
-                self.awg.set_offset(channel, offset)
-                n += 2
+    def execute(self, actions: list):
+        """Executes compiled actions.
 
-            elif args[n] == "PHSE":
-                phase = float(args[n + 1])
-                self.awg.set_phase(channel, phase)
-                n += 2
+        :param actions: the actions, as compiled by compile()
+        :type actions: list
+        :return: the reply of the last query, or None
+        :rtype: str
+        """
+        reply = None
+        for method, channel, value in actions:
+            result = method(channel, value)
+            if result is not None:
+                reply = result
+        return reply
 
-            else:
-                n += 1
+    def query_idn(self, channel: int, value=None) -> str:
+        """
+        Answers *IDN?
+        """
+        return AWG_IDN_STRING
+
+    def query_id(self, channel: int, value=None) -> str:
+        """
+        Answers IDN-SGLT-PRI?, the ID query of the oscilloscope.
+        """
+        return AWG_ID_STRING
+
+    def query_opc(self, channel: int, value=None) -> str:
+        """
+        Answers *OPC? once the previous commands are complete.
+        """
+        return "1"
+
+    def set_opc(self, channel: int, value=None):
+        """
+        *OPC: sets the operation complete bit of *ESR? once the previous commands are complete.
+        """
+        self.event_status |= OPC_EVENT
+
+    def wait(self, channel: int, value=None):
+        """
+        *WAI: nothing left to wait for, the previous commands are complete.
+        """
+        pass
+
+    def query_esr(self, channel: int, value=None) -> str:
+        """
+        Answers *ESR?, and clears the standard event status register.
+        """
+        event_status = self.event_status
+        self.event_status = 0
+        return str(event_status)
+
+    def clear_status(self, channel: int, value=None):
+        """
+        *CLS: clears the standard event status register.
+        """
+        self.event_status = 0
+
+    def query_bswv(self, channel: int, value=None) -> str:
+        """
+        Answers C<n>:BSWV?
 
-    def parse_outp(self, args, channel: int):
+        Example of reply:
+            C1:BSWV WVTP,SINE,FRQ,50000HZ,PERI,2e-05S,AMP,2V,OFST,0V,HLEV,1V,LLEV,-1V,PHSE,0
         """
-        Parses and executes the OUTP command which is used to turn the AWG output on and
-        to set the load impedance of the AWG to 50 Ohm, 75 Ohm or Hi-Z.
+        state = self.get_channel(channel)
+        period = 1 / state.frequency if state.frequency else 0
+        high = state.offset + state.amplitude / 2
+        low = state.offset - state.amplitude / 2
+        return (f"C{channel}:BSWV WVTP,{WAVE_NAMES[state.wave_type]},FRQ,{format_number(state.frequency)}HZ,"
+                f"PERI,{format_number(period)}S,AMP,{format_number(state.amplitude)}V,"
+                f"OFST,{format_number(state.offset)}V,HLEV,{format_number(high)}V,LLEV,{format_number(low)}V,"
+                f"PHSE,{format_number(state.phase)}")
 
-        Examples:
-            OUTP LOAD,50
-            OUTP LOAD,75
-            OUTP LOAD,HZ
-            OUTP ON
+    def query_outp(self, channel: int, value=None) -> str:
+        """
+        Answers C<n>:OUTP?
 
+        Example of reply:
+            C1:OUTP ON,LOAD,50,PLRT,NOR
+        """
+        state = self.get_channel(channel)
+        load = "HZ" if state.load == constants.HI_Z else format_number(state.load)
+        return f"C{channel}:OUTP {'ON' if state.output else 'OFF'},LOAD,{load},PLRT,NOR"
+
+    def query_swwv(self, channel: int, value=None) -> str:
+        """
+        Answers C<n>:SWWV?
+
+        Example of reply:
+            C1:SWWV STATE,ON,TIME,1S,STOP,1500HZ,START,500HZ,TRSR,INT,TRMD,OFF,SWMD,LINE,DIR,UP
+        """
+        state = self.get_channel(channel)
+        return (f"C{channel}:SWWV STATE,{'ON' if state.sweep_state else 'OFF'},TIME,{format_number(state.sweep_time)}S,"
+                f"STOP,{format_number(state.sweep_stop)}HZ,START,{format_number(state.sweep_start)}HZ,"
+                f"TRSR,INT,TRMD,OFF,SWMD,{state.sweep_mode},DIR,{state.sweep_direction}")
+
+    def set_basic_wave(self, channel: int, params: dict):
+        """
+        Sends the settings of a BSWV command to the AWG at once.
+        The names of the parameters are those of the ChannelState attributes.
+        """
+        self.awg.set_basic_wave(channel, **params)
+        state = self.channels[channel]
+        for name, value in params.items():
+            setattr(state, name, value)
+
+    def set_sweep(self, channel: int, params: dict):
+        """
+        Applies the settings of a SWWV command. The sweep is (re)started when it is on,
+        and stopped when it is switched off.
+        The names of the parameters are those of the ChannelState attributes.
+        """
+        state = self.channels[channel]
+        was_on = state.sweep_state
+        for name, value in params.items():
+            setattr(state, name, value)
+        if state.sweep_state:
+            self.start_sweep(channel, state)
+        elif was_on:
+            self.stop_sweep(channel)
+
+    def start_sweep(self, channel: int, state: ChannelState):
+        """
+        Starts the sweep of a channel on the AWG, or in software if the driver has no sweep.
+        """
+        start, stop = state.sweep_start, state.sweep_stop
+        if state.sweep_direction == "DOWN":
+            start, stop = stop, start
+        log_spacing = state.sweep_mode == "LOG"
+        sweep = self.sweeps.pop(channel, None)
+        if sweep is not None:
+            sweep.stop()
+        try:
+            self.awg.start_sweep(channel, start, stop, state.sweep_time, log_spacing)
+        except NotImplementedError:
+            sweep = SoftwareSweep(self.awg.set_frequency, self.lock, channel, start, stop, state.sweep_time,
+                                  log_spacing)
+            self.sweeps[channel] = sweep
+            sweep.start()
+
+    def stop_sweep(self, channel: int):
+        """
+        Stops the sweep of a channel, and goes back to the frequency of BSWV, as a Siglent AWG does.
+        """
+        sweep = self.sweeps.pop(channel, None)
+        if sweep is None:
+            self.awg.stop_sweep(channel)
+        else:
+            sweep.stop()
+            self.awg.set_frequency(channel, self.channels[channel].frequency)
+
+    def stop_software_sweeps(self):
+        """
+        Stops the software sweeps and waits for their threads, before the AWG is disconnected.
+        """
+        with self.lock:
+            sweeps = list(self.sweeps.values())
+            self.sweeps = {}
+        for sweep in sweeps:
+            sweep.stop(wait=True)
+
+    def set_wave_data(self, channel: int, params: dict):
+        """
+        Uploads the arbitrary wave of a WVDT command, which is the binary block of the line,
+        and applies the other settings of the command to it.
+        """
+        state = self.channels[channel]
+        if "wave_data" in params and self.block is not None:
+            try:
+                self.awg.upload_arbitrary(channel, self.block)
+            except NotImplementedError:
+                log("The AWG has no arbitrary waves, WVDT ignored.")
+                return
+            state.wave_type = constants.ARBITRARY
+        settings = {name: value for name, value in params.items() if name in self.setters}
+        if settings:
+            self.set_basic_wave(channel, settings)
+
+    def set_wave_type(self, channel: int, wave_type: int):
+        self.awg.set_wave_type(channel, wave_type)
+        self.channels[channel].wave_type = wave_type
+
+    def set_frequency(self, channel: int, freq: float):
+        self.awg.set_frequency(channel, freq)
+        self.channels[channel].frequency = freq
+
+    def set_amplitude(self, channel: int, ampl: float):
+        self.awg.set_amplitude(channel, ampl)
+        self.channels[channel].amplitude = ampl
+
+    def set_offset(self, channel: int, offset: float):
+        self.awg.set_offset(channel, offset)
+        self.channels[channel].offset = offset
+
+    def set_phase(self, channel: int, phase: float):
+        self.awg.set_phase(channel, phase)
+        self.channels[channel].phase = phase
+
+    def enable_output(self, channel: int, on: bool):
+        """
         It seems that the oscilloscope doesn't turn the AWG output off after
         completing the plot. Even thought, the OUTP OFF command was added for
         the case it will be used in future.
         """
-        n = 0
-        while n < len(args):
-            if args[n] == "ON":
-                self.awg.enable_output(channel, True)
-                n += 1
-
-            elif args[n] == "LOAD":
-                if args[n + 1] == "HZ":
-                    z = constants.HI_Z
-                else:
-                    z = int(args[n + 1])
-                self.awg.set_load_impedance(channel, z)
-                n += 2
+        self.awg.enable_output(channel, on)
+        self.channels[channel].output = on
 
-            elif args[n] == "OFF":
-                self.awg.enable_output(channel, False)
-                n += 1
-
-            else:
-                n += 1
+    def set_load_impedance(self, channel: int, z: float):
+        self.awg.set_load_impedance(channel, z)
+        self.channels[channel].load = z
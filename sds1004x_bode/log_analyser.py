@@ -0,0 +1,228 @@
+'''
+Created on Oct 17, 2026
+
+@author: hb020
+
+
+Offline analyser of the command logs, in the format of tests/awg_commands_log.txt.
+
+Usage: python log_analyser.py [--csv] log [log ...]
+
+All logs are loaded at once. The distinct lines are compiled with CommandParser.compile(),
+the grammar of the server, so the analyser always understands the lines as the server does.
+A bode plot repeats the same lines, so there are few distinct lines even in many sessions.
+The channel, command and frequency of each line are then NumPy arrays, and the statistics
+of all sessions are computed on them at once.
+
+A session starts at the beginning of each log, and at each IDN-SGLT-PRI? or *IDN?, which
+the scope sends when it connects. The sweep points are the commands that only set the frequency.
+For each session and channel, the report gives the start and stop frequencies of the sweep, the
+number of points, the mean step ratio, and the rate of points that repeat the previous frequency.
+
+A line may start with a timestamp in seconds ("12.345 C1:BSWV FRQ,10"), and may have
+the "> " of the console log of the server. When the lines have timestamps, the report
+gives the median and the largest interval between the commands of the session.
+
+NumPy is required. It is an optional package of the bridge, see the README.
+'''
+
+import argparse
+import sys
+from command_parser import CommandParser
+
+try:
+    import numpy as np
+except ImportError:
+    sys.exit("The log analyser needs NumPy: pip install numpy")
+
+# Commands that start a session
+SESSION_METHODS = ("query_id", "query_idn")
+# Command of the sweep points
+SWEEP_METHOD = "set_frequency"
+# Name of the lines that are not understood
+UNKNOWN_COMMAND = "unknown"
+
+REPORT_COLUMNS = ("session", "log", "channel", "start", "stop", "points", "step_ratio", "duplicates",
+                  "median_interval", "max_interval")
+
+
+def load_logs(paths: list) -> tuple:
+    """Reads the logs, and numbers the distinct command lines.
+
+    :param paths: the log files
+    :type paths: list
+    :return: the distinct command lines, and as NumPy arrays, for each line: the index of its distinct line,
+             its timestamp (NaN where missing) and the index of its log
+    :rtype: tuple
+    """
+    # command line -> index, in the order of the first use
+    distinct = {}
+    inverse = []
+    timestamps = []
+    log_index = []
+    for index, path in enumerate(paths):
+        count = len(inverse)
+        with open(path) as f:
+            for line in f:
+                # the console log of the server has "> " before the commands
+                line = line.strip().lstrip("> ")
+                if not line:
+                    continue
+                timestamp = np.nan
+                head, _, rest = line.partition(" ")
+                if head.replace(".", "", 1).isdigit():
+                    timestamp = float(head)
+                    line = rest.lstrip("> ")
+                inverse.append(distinct.setdefault(line, len(distinct)))
+                timestamps.append(timestamp)
+        log_index.append(np.full(len(inverse) - count, index))
+    log_index = np.concatenate(log_index) if log_index else np.zeros(0, dtype=int)
+    return list(distinct), np.array(inverse, dtype=int), np.array(timestamps, dtype=float), log_index
+
+
+def compile_lines(lines: list) -> tuple:
+    """Compiles the distinct command lines with the grammar of the command parser.
+
+    :param lines: the distinct command lines
+    :type lines: list
+    :return: the command names, and as NumPy arrays, for each line: the index of its command name, its channel,
+             and its frequency (NaN if the line is not a sweep point)
+    :rtype: tuple
+    """
+    parser = CommandParser(None, cache_size=0)
+    names = {}
+    commands = np.zeros(len(lines), dtype=int)
+    channels = np.zeros(len(lines), dtype=int)
+    frequencies = np.full(len(lines), np.nan)
+    for index, line in enumerate(lines):
+        try:
+            actions = parser.compile(line)
+        except ValueError:
+            actions = []
+        if actions:
+            method, channel, value = actions[0]
+            name = "+".join(action[0].__name__ for action in actions)
+            channels[index] = channel
+            if len(actions) == 1 and method.__name__ == SWEEP_METHOD:
+                frequencies[index] = value
+        else:
+            name = UNKNOWN_COMMAND
+        commands[index] = names.setdefault(name, len(names))
+    return list(names), commands, channels, frequencies
+
+
+def analyse(lines: list, inverse: np.ndarray, timestamps: np.ndarray, log_index: np.ndarray) -> dict:
+    """Computes the statistics of the sweeps.
+
+    :param lines: the distinct command lines
+    :type lines: list
+    :param inverse: the index of the distinct line of each line
+    :type inverse: np.ndarray
+    :param timestamps: the timestamps of the lines in seconds, NaN where missing
+    :type timestamps: np.ndarray
+    :param log_index: the index of the log of each line
+    :type log_index: np.ndarray
+    :return: one array per column of REPORT_COLUMNS, one row per session and channel with sweep points
+    :rtype: dict
+    """
+    names, commands, channels, frequencies = compile_lines(lines)
+    commands = commands[inverse]
+    channels = channels[inverse]
+    frequencies = frequencies[inverse]
+    session_codes = [names.index(name) for name in SESSION_METHODS if name in names]
+    starts = np.isin(commands, session_codes)
+    starts[0:1] = True
+    starts[1:] |= log_index[1:] != log_index[:-1]
+    sessions = np.cumsum(starts) - 1
+
+    # intervals between the commands of a session
+    intervals = np.diff(timestamps, prepend=np.nan)
+    intervals[starts] = np.nan
+
+    # the sweep points, grouped by session and channel, in order
+    points = np.flatnonzero(~np.isnan(frequencies))
+    groups = sessions[points] * (channels.max(initial=0) + 1) + channels[points]
+    order = np.argsort(groups, kind="stable")
+    points = points[order]
+    groups = groups[order]
+    freqs = frequencies[points]
+    group_keys, first, counts = np.unique(groups, return_index=True, return_counts=True)
+    last = first + counts - 1
+
+    same_group = np.zeros(len(points), dtype=bool)
+    same_group[1:] = groups[1:] == groups[:-1]
+    duplicates = same_group & (np.diff(freqs, prepend=np.nan) == 0)
+    duplicate_counts = np.bincount(np.searchsorted(group_keys, groups[duplicates]), minlength=len(group_keys))
+    distinct = counts - duplicate_counts
+
+    start = freqs[first]
+    stop = freqs[last]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        step_ratio = np.where(distinct > 1, (stop / start) ** (1 / (distinct - 1)), np.nan)
+
+    # intervals of the sessions of the groups
+    group_sessions = sessions[points[first]]
+    median_interval = np.full(len(group_keys), np.nan)
+    max_interval = np.full(len(group_keys), np.nan)
+    timed = ~np.isnan(intervals)
+    if timed.any():
+        by_session = np.split(intervals[timed], np.flatnonzero(np.diff(sessions[timed])) + 1)
+        timed_sessions = np.unique(sessions[timed])
+        position = np.searchsorted(timed_sessions, group_sessions)
+        found = (position < len(timed_sessions)) & (timed_sessions[np.minimum(position, len(timed_sessions) - 1)] ==
+                                                    group_sessions)
+        medians = np.array([np.median(values) for values in by_session])
+        maxima = np.array([np.max(values) for values in by_session])
+        median_interval[found] = medians[position[found]]
+        max_interval[found] = maxima[position[found]]
+
+    return {
+        "session": group_sessions,
+        "log": log_index[points[first]],
+        "channel": channels[points[first]],
+        "start": start,
+        "stop": stop,
+        "points": counts,
+        "step_ratio": step_ratio,
+        "duplicates": duplicate_counts / counts,
+        "median_interval": median_interval,
+        "max_interval": max_interval,
+    }
+
+
+def print_report(report: dict, paths: list, csv: bool):
+    if len(report["session"]) == 0:
+        print("No sweep found in the logs.")
+        return
+    if csv:
+        print(",".join(REPORT_COLUMNS))
+    for row in range(len(report["session"])):
+        values = {column: report[column][row] for column in REPORT_COLUMNS}
+        values["log"] = paths[values["log"]]
+        if csv:
+            print(",".join(str(values[column]) for column in REPORT_COLUMNS))
+            continue
+        line = ("session %(session)s (%(log)s) C%(channel)s: %(start).9g Hz to %(stop).9g Hz, %(points)s points, "
+                "step ratio %(step_ratio).6f, %(duplicates).1f%% duplicates") % dict(
+                    values, duplicates=values["duplicates"] * 100)
+        if not np.isnan(values["median_interval"]):
+            line += ", intervals: median %.1f ms, max %.1f ms" % (
+                values["median_interval"] * 1000, values["max_interval"] * 1000)
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep statistics of the command logs of the AWG bode plot bridge.")
+    parser.add_argument("logs", nargs='+', help="The command logs, one command line per line, optionally with a timestamp in seconds.")
+    parser.add_argument('--csv', default=False, help="Print the statistics as CSV.", dest="csv", action="store_true", required=False)
+    args = parser.parse_args()
+
+    lines, inverse, timestamps, log_index = load_logs(args.logs)
+    if len(inverse) == 0:
+        print("The logs are empty.")
+        sys.exit(1)
+    print_report(analyse(lines, inverse, timestamps, log_index), args.logs, args.csv)
+
+
+if __name__ == '__main__':
+    main()
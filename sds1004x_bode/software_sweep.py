@@ -0,0 +1,104 @@
+'''
+Created on Oct 17, 2026
+
+@author: hb020
+
+
+This file contains the software sweep, for the AWGs that have no sweep of their own.
+
+A SWWV command with STATE,ON starts the sweep of the AWG when the driver has one.
+Otherwise, a sweep thread sets the frequencies one after the other, timed by the host,
+and starts again at the start frequency until the sweep is stopped, as a Siglent AWG does.
+
+The steps are made with the lock of the command parser held, so they never
+interleave with the commands sent to the AWG by the parser.
+
+'''
+
+import threading
+import time
+from awgdrivers.log_writer import log
+
+# Time between two frequency steps, in seconds. Slower AWGs make longer steps.
+SWEEP_STEP_TIME = 0.05
+
+
+def sweep_frequencies(start: float, stop: float, sweep_time: float, log_spacing: bool,
+                      step_time: float = SWEEP_STEP_TIME) -> list:
+    """Returns the frequencies of one sweep.
+
+    :param start: the first frequency, in Hz
+    :type start: float
+    :param stop: the last frequency, in Hz. Lower than start for a sweep down.
+    :type stop: float
+    :param sweep_time: the duration of the sweep, in seconds
+    :type sweep_time: float
+    :param log_spacing: True for logarithmic steps, False for linear steps
+    :type log_spacing: bool
+    :param step_time: the time between two steps, in seconds
+    :type step_time: float
+    :return: the frequencies, one per step
+    :rtype: list
+    """
+    steps = max(2, int(sweep_time / step_time) + 1)
+    if log_spacing and start > 0 and stop > 0:
+        ratio = stop / start
+        return [start * ratio ** (n / (steps - 1)) for n in range(steps)]
+    return [start + (stop - start) * n / (steps - 1) for n in range(steps)]
+
+
+class SoftwareSweep(object):
+    """
+    Sweeps the frequency of a channel in a separate thread.
+    """
+
+    def __init__(self, set_frequency, lock, channel: int, start: float, stop: float, sweep_time: float,
+                 log_spacing: bool):
+        """
+        Gets the frequency setter of the AWG, the lock to hold while it is called, and the sweep settings.
+        """
+        self.set_frequency = set_frequency
+        self.lock = lock
+        self.channel = channel
+        self.frequencies = sweep_frequencies(start, stop, sweep_time, log_spacing)
+        self.interval = sweep_time / len(self.frequencies)
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name=f"sweep-C{channel}", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def run(self):
+        """
+        The sweep thread.
+        """
+        next_step = time.monotonic()
+        while True:
+            for freq in self.frequencies:
+                with self.lock:
+                    # a step that waited for the lock while the sweep was stopped is not made
+                    if self.stopped.is_set():
+                        return
+                    try:
+                        self.set_frequency(self.channel, freq)
+                    except Exception as ex:
+                        log("Software sweep of channel %s stopped: %s", self.channel, ex)
+                        return
+                next_step += self.interval
+                delay = next_step - time.monotonic()
+                if delay < 0:
+                    # the AWG is slower than the steps, continue from now
+                    next_step -= delay
+                    delay = 0
+                if self.stopped.wait(delay):
+                    return
+
+    def stop(self, wait: bool = False):
+        """Stops the sweep. No new step is started after this call.
+
+        :param wait: True to wait for the end of the thread. Not allowed with the lock held.
+        :type wait: bool
+        """
+        self.stopped.set()
+        if wait and self.thread.is_alive():
+            self.thread.join()
@@ -0,0 +1,215 @@
+'''
+Created on Oct 17, 2026
+
+@author: hb020
+
+
+This file contains the sweep predictor.
+
+The frequencies of a bode plot are a geometric series: 10, 10.8890427, 11.857125 ... (see tests/awg_commands_log.txt).
+PredictingAWG sits between the shadow state and the driver. From the first frequencies of a sweep,
+it fits the start frequency and the step ratio, predicts the next frequencies, and has the driver
+encode their commands in advance. A predicted step is then a dictionary lookup and a write, without
+the checks that a new frequency does not need (the fy driver does not read the frequency first).
+The series is fitted again on the last frequencies before the predictions run out, so that the predictions
+stay ahead of the sweep.
+
+A frequency that was not predicted but continues the series (the scope rounds it differently) is encoded
+on its own and sent the same way, and the series is fitted again. Any other frequency is sent by set_frequency()
+of the driver, as without the predictor, and starts a new series.
+The fit is in plain Python: for so few frequencies, NumPy is slower.
+The predictor is used with --predict.
+
+Only the drivers that implement encode_frequencies() and send_encoded_frequency() are predicted.
+
+'''
+
+import math
+from awgdrivers.base_awg import BaseAWG
+
+# The scope sends the frequencies with 9 significant digits. The predictions are rounded the same way.
+FREQUENCY_FORMAT = "%.9g"
+# Frequencies needed to recognize a series
+MIN_POINTS = 3
+# Largest relative difference between two step ratios of a series
+RATIO_TOLERANCE = 1e-6
+# Number of frequencies predicted at once
+PREDICTED_STEPS = 16
+# The series is fitted again when no more predicted frequencies than this are left
+REFIT_STEPS = 4
+# Number of the last frequencies of a series that are fitted
+FIT_POINTS = 16
+
+
+def supports_prediction(awg: BaseAWG) -> bool:
+    """
+    Returns True if the driver can encode its frequency commands in advance.
+    """
+    return type(awg).encode_frequencies is not BaseAWG.encode_frequencies
+
+
+def predict(points: list, steps: int) -> list:
+    """Fits a geometric series to the frequencies, and predicts the next ones.
+
+    :param points: the frequencies of the series so far, at least 2
+    :type points: list
+    :param steps: the number of frequencies to predict
+    :type steps: int
+    :return: the next frequencies, rounded as the scope does
+    :rtype: list
+    """
+    # least squares fit of log(f) = intercept + slope * n
+    count = len(points)
+    mean_n = (count - 1) / 2
+    logs = list(map(math.log, points))
+    mean_log = sum(logs) / count
+    # sum((n - mean_n) ** 2) is count * (count ** 2 - 1) / 12
+    slope = sum((n - mean_n) * y for n, y in enumerate(logs)) * 12 / (count * (count * count - 1))
+    intercept = mean_log - slope * mean_n
+    predicted = [math.exp(intercept + slope * n) for n in range(count, count + steps)]
+    return [float(FREQUENCY_FORMAT % freq) for freq in predicted]
+
+
+class SweepModel(object):
+    """
+    The frequency series of one channel, and the predicted commands.
+    """
+
+    def __init__(self):
+        # frequencies of the current series
+        self.points = []
+        # predicted frequency -> encoded command
+        self.commands = {}
+        # predicted frequencies not reached yet
+        self.ahead = 0
+
+    def continues(self, freq: float) -> bool:
+        """
+        Returns True if the frequency continues the series with the same step ratio.
+        """
+        if freq <= 0:
+            return False
+        if len(self.points) < 2:
+            return True
+        ratio = self.points[-1] / self.points[-2]
+        if ratio == 1:
+            return False
+        return abs(freq / self.points[-1] / ratio - 1) < RATIO_TOLERANCE
+
+
+class PredictingAWG(BaseAWG):
+    '''
+    Proxy of an AWG driver that sends the frequencies of a sweep with commands encoded in advance.
+    '''
+    SHORT_NAME = "predictor"
+
+    def __init__(self, awg: BaseAWG):
+        """
+        Gets the driver to send the commands to.
+        """
+        super().__init__(log_debug=awg.log_debug)
+        self.awg = awg
+        # channel -> SweepModel
+        self.models = {}
+        self.hits = 0
+        self.misses = 0
+
+    def summary(self) -> str:
+        """
+        Returns a printable summary of the predictions since the previous call, and resets the counters.
+        """
+        steps = self.hits + self.misses
+        ratio = self.hits / steps * 100 if steps else 0
+        summary = f"sweep prediction: {self.hits} hits, {self.misses} misses ({ratio:.1f}% hits)"
+        self.hits = 0
+        self.misses = 0
+        return summary
+
+    def set_frequency(self, channel: int, freq: float):
+        if channel is None or channel == 0:
+            self.models = {}
+            self.awg.set_frequency(channel, freq)
+            return
+        model = self.models.get(channel)
+        if model is None:
+            model = self.models[channel] = SweepModel()
+        command = model.commands.get(freq)
+        if command is not None:
+            self.hits += 1
+            self.awg.send_encoded_frequency(channel, command)
+            model.points.append(freq)
+            model.ahead -= 1
+            if model.ahead <= REFIT_STEPS:
+                self.fit(channel, model)
+            return
+        self.misses += 1
+        if model.commands and model.continues(freq):
+            # rounded differently from the prediction: the series goes on, with a new fit
+            self.awg.send_encoded_frequency(channel, self.awg.encode_frequencies(channel, [freq])[0])
+            model.points.append(freq)
+            self.fit(channel, model)
+            return
+        self.awg.set_frequency(channel, freq)
+        if model.points and freq == model.points[-1]:
+            # sent again, the series does not move
+            return
+        if not model.continues(freq):
+            if len(model.points) >= MIN_POINTS:
+                self.printdebug("series of %s frequencies ended", len(model.points))
+            model.points = []
+            model.commands = {}
+            model.ahead = 0
+        model.points.append(freq)
+        if len(model.points) >= MIN_POINTS:
+            self.fit(channel, model)
+
+    def fit(self, channel: int, model: SweepModel):
+        """
+        Predicts the next frequencies of the series from its last ones, and has the driver encode them.
+        """
+        freqs = predict(model.points[-FIT_POINTS:], PREDICTED_STEPS)
+        model.commands = dict(zip(freqs, self.awg.encode_frequencies(channel, freqs)))
+        model.ahead = PREDICTED_STEPS
+
+    def disconnect(self):
+        if self.log_debug:
+            self.printdebug("%s", self.summary())
+        self.models = {}
+        self.awg.disconnect()
+
+    def initialize(self):
+        self.models = {}
+        self.awg.initialize()
+
+    def get_id(self) -> str:
+        return self.awg.get_id()
+
+    def enable_output(self, channel: int, on: bool):
+        self.awg.enable_output(channel, on)
+
+    def set_phase(self, channel: int, phase: float):
+        self.awg.set_phase(channel, phase)
+
+    def set_wave_type(self, channel: int, wave_type: int):
+        self.awg.set_wave_type(channel, wave_type)
+
+    def set_amplitude(self, channel: int, amplitude: float):
+        self.awg.set_amplitude(channel, amplitude)
+
+    def set_offset(self, channel: int, offset: float):
+        self.awg.set_offset(channel, offset)
+
+    def set_load_impedance(self, channel: int, z: float):
+        self.awg.set_load_impedance(channel, z)
+
+    def set_basic_wave(self, channel: int, **params):
+        self.awg.set_basic_wave(channel, **params)
+
+    def start_sweep(self, channel: int, start: float, stop: float, sweep_time: float, log_spacing: bool):
+        self.awg.start_sweep(channel, start, stop, sweep_time, log_spacing)
+
+    def stop_sweep(self, channel: int):
+        self.awg.stop_sweep(channel)
+
+    def upload_arbitrary(self, channel: int, data):
+        self.awg.upload_arbitrary(channel, data)
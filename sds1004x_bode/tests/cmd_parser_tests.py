@@ -10,10 +10,60 @@ Created on May 4, 2018
 import sys
 sys.path.insert(0, '..')
 
+import time
 from command_parser import CommandParser
+from write_behind import WriteBehindQueue
 from awgdrivers.dummy_awg import DummyAWG
 
 
+class SweepingAWG(DummyAWG):
+    """
+    Records the calls to the sweep of the AWG.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.sweeps = []
+
+    def start_sweep(self, channel: int, start: float, stop: float, sweep_time: float, log_spacing: bool):
+        self.sweeps.append(("start", channel, start, stop, sweep_time, log_spacing))
+
+    def stop_sweep(self, channel: int):
+        self.sweeps.append(("stop", channel))
+
+
+class SlowAWG(DummyAWG):
+    """
+    Records the frequencies, each set in 1 ms.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.frequencies = []
+
+    def set_frequency(self, channel: int, freq: float):
+        time.sleep(0.001)
+        self.frequencies.append(freq)
+
+
+class FailingAWG(DummyAWG):
+    """
+    Fails to switch the output, and to set the frequency 666 Hz.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.frequencies = []
+
+    def enable_output(self, channel: int, on: bool):
+        raise IOError("output not switched")
+
+    def set_frequency(self, channel: int, freq: float):
+        if freq == 666:
+            raise IOError("frequency not set")
+        self.frequencies.append(freq)
+
+
 if __name__ == '__main__':
     with open("awg_commands_log.txt") as f:
         lines = f.readlines()
@@ -31,3 +81,70 @@ if __name__ == '__main__':
         if line == "":
             continue
         parser.parse_scpi_command(line)
+
+    # The queries are answered from the settings of the previous commands
+    parser.parse_scpi_command("C1:OUTP LOAD,50;BSWV WVTP,SINE,PHSE,0,FRQ,50000,AMP,2,OFST,0;OUTP ON")
+    parser.parse_scpi_command("C2:OUTP LOAD,HZ;SWWV TIME,5,START,10,STOP,10000,SWMD,LOG")
+    replies = {
+        "C1:BSWV?": "C1:BSWV WVTP,SINE,FRQ,50000HZ,PERI,2e-05S,AMP,2V,OFST,0V,HLEV,1V,LLEV,-1V,PHSE,0",
+        "C1:OUTP?": "C1:OUTP ON,LOAD,50,PLRT,NOR",
+        "C2:OUTP?": "C2:OUTP OFF,LOAD,HZ,PLRT,NOR",
+        "C2:SWWV?": "C2:SWWV STATE,OFF,TIME,5S,STOP,10000HZ,START,10HZ,TRSR,INT,TRMD,OFF,SWMD,LOG,DIR,UP",
+    }
+    for query, expected in replies.items():
+        reply = parser.parse_scpi_command(query)
+        print(reply)
+        assert reply == expected, f"{query} replied {reply}, expected {expected}"
+
+    # SWWV STATE,ON starts the sweep of the AWG, with the settings of the line and of the previous lines
+    sweeping_awg = SweepingAWG()
+    parser = CommandParser(sweeping_awg)
+    parser.parse_scpi_command("C1:SWWV SWMD,LOG,DIR,DOWN")
+    parser.parse_scpi_command("C1:SWWV STATE,ON,START,10,STOP,10000,TIME,5")
+    assert sweeping_awg.sweeps == [("start", 1, 10000.0, 10.0, 5.0, True)], sweeping_awg.sweeps
+    parser.parse_scpi_command("C1:SWWV STATE,OFF")
+    assert sweeping_awg.sweeps[1:] == [("stop", 1)], sweeping_awg.sweeps
+    # switching off a sweep that is off does nothing
+    parser.parse_scpi_command("C1:SWWV STATE,OFF")
+    assert len(sweeping_awg.sweeps) == 2, sweeping_awg.sweeps
+    print(parser.parse_scpi_command("C1:SWWV?"))
+
+    # *OPC? replies 1 once the writes queued before it are executed (write-behind mode of the server)
+    slow_awg = SlowAWG()
+    commands = WriteBehindQueue(CommandParser(slow_awg))
+    frequencies = [float(freq) for freq in range(100, 200)]
+    for freq in frequencies:
+        assert commands.put(f"C1:BSWV FRQ,{freq:g}") is None
+    reply = commands.put("*OPC?")
+    assert reply == "1", reply
+    assert slow_awg.frequencies == frequencies, slow_awg.frequencies
+    commands.close()
+
+    # The errors of the driver are reported on the link of the command that failed (write-behind mode of the server)
+    failing_awg = FailingAWG()
+    commands = WriteBehindQueue(CommandParser(failing_awg))
+    # on the DEVICE_WRITE of a barrier
+    try:
+        commands.put("C1:OUTP ON", link_id=1)
+        assert False, "barrier error not reported"
+    except IOError as ex:
+        assert str(ex) == "output not switched", ex
+    assert commands.sync(1) is None, "barrier error reported twice"
+    # on the next DEVICE_READ of the link
+    assert commands.put("C1:BSWV FRQ,666", link_id=1) is None
+    assert commands.sync(2) is None, "error reported on another link"
+    error = commands.sync(1)
+    assert isinstance(error, IOError) and str(error) == "frequency not set", error
+    # on the next DEVICE_WRITE of the link, which is then not executed
+    assert commands.put("C1:BSWV FRQ,666", link_id=1) is None
+    commands.sync(2)
+    try:
+        commands.put("C1:BSWV FRQ,100", link_id=1)
+        assert False, "error not reported on the next write"
+    except IOError as ex:
+        assert str(ex) == "frequency not set", ex
+    assert commands.put("C1:BSWV FRQ,200", link_id=1) is None
+    assert commands.sync(1) is None
+    assert failing_awg.frequencies == [200.0], failing_awg.frequencies
+    commands.close()
+    print("driver errors reported")
@@ -0,0 +1,116 @@
+'''
+Created on Oct 17, 2026
+
+@author: hb020
+
+@note: Checks the vxi11_codec.py module against the byte concatenation used before,
+       and compares the time needed to decode a request and to encode its reply.
+'''
+
+# stuff needed to get the modules from the parent directory
+import sys
+sys.path.insert(0, '..')
+
+import struct
+import timeit
+
+import vxi11_codec as codec
+
+REPEAT = 200000
+# best of
+RUNS = 5
+
+AWG_ID_STRING = b"IDN-SGLT-PRI SDG0000X"
+
+
+# The previous implementation, as it was in awg_server.py
+def uint_to_bytes(num):
+    return struct.pack(">I", num)
+
+
+def bytes_to_uint(bytes_seq):
+    return struct.unpack(">I", bytes_seq)[0]
+
+
+def generate_rpc_header(xid):
+    hdr = b""
+    hdr += xid
+    hdr += b"\x00\x00\x00\x01"
+    hdr += b"\x00\x00\x00\x00"
+    hdr += b"\x00\x00\x00\x00"
+    hdr += b"\x00\x00\x00\x00"
+    hdr += b"\x00\x00\x00\x00"
+    return hdr
+
+
+def generate_resp_data(xid, resp):
+    rpc_hdr = generate_rpc_header(xid)
+    size_hdr = uint_to_bytes((len(rpc_hdr) + len(resp)) | 0x80000000)
+    return size_hdr + rpc_hdr + resp
+
+
+def legacy_device_write(rx_data):
+    xid = bytes(rx_data[0x00:0x04])
+    program_id = bytes_to_uint(rx_data[0x0C:0x10])
+    procedure = bytes_to_uint(rx_data[0x14:0x18])
+    assert program_id == 395183 and procedure == 11
+    cmd_length = bytes_to_uint(rx_data[0x38:0x3C])
+    scpi_command = str(rx_data[0x3C:0x3C + cmd_length], 'utf-8').strip()
+    resp = b"\x00\x00\x00\x00"
+    resp += uint_to_bytes(cmd_length)
+    return scpi_command, generate_resp_data(xid, resp)
+
+
+def legacy_device_read(rx_data):
+    xid = bytes(rx_data[0x00:0x04])
+    resp = b"\x00\x00\x00\x00"
+    resp += b"\x00\x00\x00\x04"
+    resp += uint_to_bytes(len(AWG_ID_STRING) + 1)
+    resp += AWG_ID_STRING
+    resp += b"\x0A\x00\x00"
+    return generate_resp_data(xid, resp)
+
+
+# The codec
+replies = codec.Vxi11Replies()
+AWG_ID_REPLY = AWG_ID_STRING + b"\n"
+
+
+def codec_device_write(rx_data):
+    xid, program_id, _, procedure, offset = codec.parse_rpc_call(rx_data)
+    assert program_id == 395183 and procedure == 11
+    cmd_length = codec.DEVICE_WRITE_PARMS.unpack_from(rx_data, offset)[4]
+    offset += codec.DEVICE_WRITE_PARMS.size
+    scpi_command = str(rx_data[offset:offset + cmd_length], 'utf-8').strip()
+    return scpi_command, replies.device_write_reply(xid, 0, cmd_length)
+
+
+def codec_device_read(rx_data):
+    return replies.device_read_reply(codec.get_xid(rx_data), 0, 4, AWG_ID_REPLY)
+
+
+def make_call(xid, procedure, args):
+    return (codec.RPC_CALL_HEADER.pack(xid, 0, 2, 395183, 1, procedure, 0, 0)
+            + codec.RPC_AUTH.pack(0, 0) + args)
+
+
+if __name__ == '__main__':
+    command = b"C1:BSWV FRQ,10000.000000\n"
+    write_args = codec.DEVICE_WRITE_PARMS.pack(0, 10000, 10000, 8, len(command)) + command + b"\x00" * (-len(command) & 3)
+    write_request = memoryview(make_call(0x12345678, 11, write_args))
+    read_request = memoryview(make_call(0x12345679, 12, codec.DEVICE_READ_PARMS.pack(0, 255, 10000, 10000, 0, 0)))
+
+    # Both must send the same bytes
+    cmd_old, resp_old = legacy_device_write(write_request)
+    cmd_new, resp_new = codec_device_write(write_request)
+    assert cmd_old == cmd_new
+    assert resp_old == b"".join(resp_new)
+    assert legacy_device_read(read_request) == b"".join(codec_device_read(read_request))
+    print("Replies are identical.")
+
+    for name, old, new, request in (("DEVICE_WRITE", legacy_device_write, codec_device_write, write_request),
+                                    ("DEVICE_READ", legacy_device_read, codec_device_read, read_request)):
+        t_old = min(timeit.repeat(lambda: old(request), number=REPEAT, repeat=RUNS))
+        t_new = min(timeit.repeat(lambda: new(request), number=REPEAT, repeat=RUNS))
+        print("%-12s concatenation: %.2f us, codec: %.2f us (%.1fx)" % (
+            name, t_old / REPEAT * 1e6, t_new / REPEAT * 1e6, t_old / t_new))
@@ -0,0 +1,65 @@
+'''
+Created on Oct 17, 2026
+
+@author: hb020
+
+@note: Reads replies with a small request size, with both server engines. The reply must come in chunks of at most
+       the request size, and only the last one may have the END reason. The server runs unprivileged,
+       on ports other than the standard ones.
+'''
+
+# stuff needed to get the modules from the parent directory
+import sys
+sys.path.insert(0, '..')
+
+import threading
+
+from awg_server import AwgServer, linkMode
+from awg_server_async import AsyncAwgServer
+from awgdrivers.dummy_awg import DummyAWG
+from vxi11_client import Vxi11Client, REASON_END, REASON_REQCNT
+
+HOST = "127.0.0.1"
+
+
+def read_in_chunks(client: Vxi11Client, request_size: int) -> bytes:
+    """
+    Reads a reply until the END reason, and checks each chunk.
+    """
+    reply = b""
+    while True:
+        error, reason, data = client.read(request_size)
+        assert error == 0, f"DEVICE_READ error {error}"
+        assert len(data) <= request_size, f"{len(data)} bytes read with a request size of {request_size}"
+        reply += data
+        if reason & REASON_END:
+            return reply
+        assert reason == REASON_REQCNT, f"reason {reason} before the end of the reply"
+        assert len(data) == request_size, f"only {len(data)} bytes read before the end of the reply"
+
+
+if __name__ == '__main__':
+    for number, server_class in enumerate((AwgServer, AsyncAwgServer)):
+        base = 20200 + number * 100
+        server = server_class(DummyAWG(), host=HOST, rpcbind_port=base, vxi11_portrange_start=base + 10,
+                              vxi11_portrange_end=base + 19, abort_port=base + 20, link_mode=linkMode.LINK_PERSISTENT)
+        threading.Thread(target=server.start, daemon=True).start()
+        # the portmapper must be listening before the first lookup
+        threading.Event().wait(0.5)
+
+        client = Vxi11Client(HOST, base)
+        assert client.create_link() == 0
+        assert client.write("C1:BSWV WVTP,SINE,FRQ,1234.5,AMP,2,OFST,0") == 0
+        expected = client.query("C1:BSWV?").encode()
+        assert len(expected) > 8, expected
+
+        for request_size in (1, 8, len(expected) - 1, len(expected), len(expected) + 1):
+            assert client.write("C1:BSWV?") == 0
+            reply = read_in_chunks(client, request_size)
+            assert reply == expected, reply
+        # the AWG ID, sent when there was no query
+        reply = read_in_chunks(client, 5)
+        assert reply.startswith(b"IDN-SGLT-PRI"), reply
+        assert client.destroy_link() == 0
+        client.close()
+        print(f"{server_class.__name__}: {expected!r} read in chunks")
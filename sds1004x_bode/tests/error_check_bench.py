@@ -0,0 +1,62 @@
+'''
+Created on Oct 17, 2026
+
+@author: hb020
+
+@note: Replays awg_commands_log.txt on the dg800 driver with each error check policy (see awgdrivers/error_check.py),
+       and counts the round trips to the AWG. One frequency command fails, to show how the error is attributed.
+'''
+
+# stuff needed to get the modules from the parent directory
+import sys
+sys.path.insert(0, '..')
+
+from awgdrivers.dg800 import RigolDG800
+from awgdrivers.error_check import ERROR_CHECK_POLICIES
+from command_parser import CommandParser
+
+# The command that the fake AWG refuses
+FAILING_COMMAND = ":SOURCE1:FREQ 1000.0000000000"
+
+
+class FakeInstrument(object):
+    """
+    Counts the writes and queries, and queues an error for the failing command.
+    """
+
+    def __init__(self):
+        self.writes = 0
+        self.queries = 0
+        self.errors = []
+
+    def write(self, cmd: str):
+        self.writes += 1
+        if FAILING_COMMAND in cmd:
+            self.errors.append('-222,"Data out of range"')
+
+    def query(self, cmd: str) -> str:
+        self.queries += 1
+        if cmd == ":SYSTem:ERRor?" and self.errors:
+            return self.errors.pop(0)
+        return '0,"No error"'
+
+    def close(self):
+        pass
+
+
+if __name__ == '__main__':
+    with open("awg_commands_log.txt") as f:
+        lines = [line.strip() for line in f if line.strip()]
+    lines.insert(len(lines) // 4, "C1:BSWV FRQ,1000")
+
+    for policy in ERROR_CHECK_POLICIES:
+        print(f"--- {policy}")
+        awg = RigolDG800(error_check=policy)
+        instrument = awg.m = FakeInstrument()
+        # the poller of the background policy, which has no pauses to use here
+        awg.error_checker.start()
+        parser = CommandParser(awg, cache_size=0)
+        for line in lines:
+            parser.execute(parser.compile(line))
+        awg.disconnect()
+        print(f"{policy}: {len(lines)} lines, {instrument.writes} writes, {instrument.queries} queries of the error queue")
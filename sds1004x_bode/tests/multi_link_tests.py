@@ -0,0 +1,63 @@
+'''
+Created on Oct 17, 2026
+
+@author: hb020
+
+@note: Opens links from several clients at once in hop mode, with both server engines, and checks that none is reset.
+       A client that gets its port from the portmapper just before the port moves connects to the previous port,
+       which must still be served. The server runs unprivileged, on ports other than the standard ones.
+'''
+
+# stuff needed to get the modules from the parent directory
+import sys
+sys.path.insert(0, '..')
+
+import random
+import threading
+
+from awg_server import AwgServer, linkMode
+from awg_server_async import AsyncAwgServer
+from awgdrivers.dummy_awg import DummyAWG
+from vxi11_client import Vxi11Client
+
+HOST = "127.0.0.1"
+CLIENTS = 3
+LINKS_PER_CLIENT = 30
+
+
+def run_client(rpcbind_port: int, failures: list):
+    for link in range(LINKS_PER_CLIENT):
+        client = None
+        try:
+            # as the SDS800X-HD does: a portmapper lookup, a connection and a link per command.
+            #  The delay lets the links of the other clients move the port in between.
+            client = Vxi11Client(HOST, rpcbind_port, connect_delay=random.uniform(0, 0.005))
+            assert client.create_link() == 0
+            assert client.write(f"C1:BSWV FRQ,{1000 + link}") == 0
+            assert client.destroy_link() == 0
+        except (ConnectionError, AssertionError) as ex:
+            failures.append(f"link {link} on port {client.port if client else '?'}: {ex!r}")
+        finally:
+            if client is not None:
+                client.close()
+
+
+if __name__ == '__main__':
+    for number, server_class in enumerate((AwgServer, AsyncAwgServer)):
+        base = 20000 + number * 100
+        server = server_class(DummyAWG(), host=HOST, rpcbind_port=base, vxi11_portrange_start=base + 10,
+                              vxi11_portrange_end=base + 19, abort_port=base + 20, link_mode=linkMode.LINK_HOP)
+        threading.Thread(target=server.start, daemon=True).start()
+        # the portmapper must be listening before the first lookup
+        threading.Event().wait(0.5)
+
+        failures = []
+        clients = [threading.Thread(target=run_client, args=(base, failures)) for _ in range(CLIENTS)]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        print(f"{server_class.__name__}: {CLIENTS * LINKS_PER_CLIENT} links, {len(failures)} reset")
+        for failure in failures:
+            print("  " + failure)
+        assert not failures, f"{server_class.__name__}: links were reset"
@@ -0,0 +1,205 @@
+'''
+Created on Oct 17, 2026
+
+@author: hb020
+
+@note: Compares the command_parser.py module, with and without its cache, with the parser used before, on awg_commands_log.txt.
+       With the cache, the lines go through parse_scpi_command(), as in the server.
+       Both send the same calls to the AWG. The speed is given in lines per second.
+'''
+
+# stuff needed to get the modules from the parent directory
+import sys
+sys.path.insert(0, '..')
+
+import timeit
+
+from awgdrivers import constants
+from awgdrivers.dummy_awg import DummyAWG
+from command_parser import CommandParser
+
+# passes over the log
+REPEAT = 20
+# best of
+RUNS = 25
+
+
+class LegacyParser(object):
+    """
+    The previous implementation, as it was in command_parser.py, without the logging.
+    """
+
+    def __init__(self, awg):
+        self.awg = awg
+
+    def parse_scpi_command(self, line):
+        if line.endswith("?"):
+            return
+
+        channel = int(line[1])
+
+        commands = line[3:].split(';')
+
+        for command in commands:
+            token = command[0:4]
+            args = command[5:].split(',')
+
+            if token == "BSWV":
+                self.parse_bswv(args, channel)
+
+            elif token == "OUTP":
+                self.parse_outp(args, channel)
+
+    def parse_bswv(self, args, channel):
+        n = 0
+        while n < len(args):
+            if args[n] == "WVTP":
+                self.awg.set_wave_type(channel, constants.SINE)
+                n += 2
+
+            elif args[n] == "FRQ":
+                freq = float(args[n + 1])
+                self.awg.set_frequency(channel, freq)
+                n += 2
+
+            elif args[n] == "AMP":
+                ampl = float(args[n + 1])
+                self.awg.set_amplitude(channel, ampl)
+                n += 2
+
+            elif args[n] == "OFST":
+                offset = float(args[n + 1])
+                self.awg.set_offset(channel, offset)
+                n += 2
+
+            elif args[n] == "PHSE":
+                phase = float(args[n + 1])
+                self.awg.set_phase(channel, phase)
+                n += 2
+
+            else:
+                n += 1
+
+    def parse_outp(self, args, channel: int):
+        n = 0
+        while n < len(args):
+            if args[n] == "ON":
+                self.awg.enable_output(channel, True)
+                n += 1
+
+            elif args[n] == "LOAD":
+                if args[n + 1] == "HZ":
+                    z = constants.HI_Z
+                else:
+                    z = int(args[n + 1])
+                self.awg.set_load_impedance(channel, z)
+                n += 2
+
+            elif args[n] == "OFF":
+                self.awg.enable_output(channel, False)
+                n += 1
+
+            else:
+                n += 1
+
+
+class RecordingAWG(DummyAWG):
+    """
+    Records the calls, to check that both parsers do the same.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def enable_output(self, channel: int, on: bool):
+        self.calls.append(("enable_output", channel, on))
+
+    def set_frequency(self, channel: int, freq: float):
+        self.calls.append(("set_frequency", channel, freq))
+
+    def set_phase(self, channel: int, phase: float):
+        self.calls.append(("set_phase", channel, phase))
+
+    def set_wave_type(self, channel: int, wave_type: int):
+        self.calls.append(("set_wave_type", channel, wave_type))
+
+    def set_amplitude(self, channel: int, amplitude: float):
+        self.calls.append(("set_amplitude", channel, amplitude))
+
+    def set_offset(self, channel: int, offset: float):
+        self.calls.append(("set_offset", channel, offset))
+
+    def set_load_impedance(self, channel: int, z: float):
+        self.calls.append(("set_load_impedance", channel, z))
+
+
+class NullAWG(RecordingAWG):
+    """
+    Does nothing, so that only the parsers are timed.
+    """
+
+    def enable_output(self, channel: int, on: bool):
+        pass
+
+    def set_frequency(self, channel: int, freq: float):
+        pass
+
+    def set_phase(self, channel: int, phase: float):
+        pass
+
+    def set_wave_type(self, channel: int, wave_type: int):
+        pass
+
+    def set_amplitude(self, channel: int, amplitude: float):
+        pass
+
+    def set_offset(self, channel: int, offset: float):
+        pass
+
+    def set_load_impedance(self, channel: int, z: float):
+        pass
+
+
+if __name__ == '__main__':
+    with open("awg_commands_log.txt") as f:
+        lines = [line.strip() for line in f if line.strip()]
+
+    # Both must make the same calls
+    awg_old = RecordingAWG()
+    awg_new = RecordingAWG()
+    legacy = LegacyParser(awg_old)
+    parser = CommandParser(awg_new)
+    for line in lines:
+        legacy.parse_scpi_command(line)
+        parser.execute(parser.compile(line))
+    assert awg_old.calls == awg_new.calls
+    print(f"{len(lines)} lines, {len(awg_new.calls)} AWG calls, identical.")
+
+    awg = NullAWG()
+    legacy = LegacyParser(awg)
+    parser = CommandParser(awg)
+
+    def run_legacy():
+        for line in lines:
+            legacy.parse_scpi_command(line)
+
+    def run_new():
+        for line in lines:
+            parser.execute(parser.compile(line))
+
+    def run_cached():
+        # as the server does, with the lock and without logging
+        for line in lines:
+            parser.parse_scpi_command(line)
+
+    count = REPEAT * len(lines)
+    # the runs alternate, so that a change of the CPU speed affects all parsers alike
+    t_old = t_new = t_cached = float("inf")
+    for run in range(RUNS):
+        t_old = min(t_old, timeit.timeit(run_legacy, number=REPEAT))
+        t_new = min(t_new, timeit.timeit(run_new, number=REPEAT))
+        t_cached = min(t_cached, timeit.timeit(run_cached, number=REPEAT))
+    print("previous parser: %.0f lines/s, command table: %.0f lines/s (%.2fx), with cache: %.0f lines/s (%.2fx)" % (
+        count / t_old, count / t_new, t_old / t_new, count / t_cached, t_old / t_cached))
+    print(parser.cache_summary())
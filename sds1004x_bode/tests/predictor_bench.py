@@ -0,0 +1,122 @@
+'''
+Created on Oct 17, 2026
+
+@author: hb020
+
+@note: Replays awg_commands_log.txt on the jds6600 and fy drivers, with and without the sweep predictor (sweep_predictor.py).
+       Both must write the same settings to the AWG. The fy driver does not read a predicted frequency before writing it,
+       so only its reads may differ. Prints the hit rate, the serial transactions and the time per line,
+       without the delays of the serial port.
+'''
+
+# stuff needed to get the modules from the parent directory
+import sys
+sys.path.insert(0, '..')
+
+import time
+import timeit
+
+from awgdrivers import jds6600
+from awgdrivers.jds6600 import JDS6600
+from awgdrivers.fy import FygenAWG
+from command_parser import CommandParser
+from sweep_predictor import PredictingAWG
+
+# passes over the log
+REPEAT = 20
+# best of
+RUNS = 25
+
+
+# Replies of the fy to a read (R<channel><setting>), from the value written (W<channel><setting><value>)
+FY_REPLIES = {
+    # the frequency in Hz, with decimals
+    "F": lambda value: "%08u.%06u" % (int(value) // 1000000, int(value) % 1000000),
+    "A": lambda value: "%u" % (float(value) * 10000),
+    "O": lambda value: "%u" % (float(value) * 1000),
+    "P": lambda value: "%u" % (float(value) * 1000),
+    "N": lambda value: "255" if value == "1" else "0",
+    "W": lambda value: value,
+}
+
+
+class FakeSerial(object):
+    """
+    Records what is written, and answers the reads of the fy driver with the last value written.
+    """
+
+    def __init__(self):
+        self.written = []
+        self.values = {}
+        self.reply = b"\n"
+
+    def write(self, data: bytes):
+        self.written.append(data)
+        command = data.decode().strip()
+        if command.startswith("W"):
+            self.values[command[1:3]] = command[3:]
+            self.reply = b"\n"
+        elif command.startswith("R"):
+            value = self.values.get(command[1:3], "")
+            if value:
+                value = FY_REPLIES[command[2]](value)
+            self.reply = (value + "\n").encode()
+
+    def read_until(self, *args, **kwargs) -> bytes:
+        return self.reply
+
+    def flush(self):
+        pass
+
+    def reset_output_buffer(self):
+        pass
+
+    def reset_input_buffer(self):
+        pass
+
+
+def make_driver(driver_class):
+    driver = driver_class()
+    driver.ser = FakeSerial()
+    if driver_class is JDS6600:
+        driver.channel_on = [False, False]
+    return driver
+
+
+def replay(lines: list, driver_class, predict: bool):
+    driver = make_driver(driver_class)
+    awg = PredictingAWG(driver) if predict else driver
+    parser = CommandParser(awg, cache_size=0)
+    for line in lines:
+        parser.execute(parser.compile(line))
+    return driver.ser.written, awg
+
+
+if __name__ == '__main__':
+    with open("awg_commands_log.txt") as f:
+        lines = [line.strip() for line in f if line.strip()]
+
+    # The serial delays are not measured
+    jds6600.SLEEP_TIME = 0
+    time.sleep = lambda seconds: None
+
+    for driver_class in (JDS6600, FygenAWG):
+        name = driver_class.SHORT_NAME
+        expected, _ = replay(lines, driver_class, False)
+        written, predictor = replay(lines, driver_class, True)
+        settings = [data for data in written if not data.startswith(b"R")]
+        assert settings == [data for data in expected if not data.startswith(b"R")], \
+            f"{name}: the predictor changes the commands"
+        assert driver_class is not JDS6600 or written == expected, f"{name}: the predictor changes the bytes"
+        print(f"{name}: {len(lines)} lines, {len(settings)} settings written, identical. {predictor.summary()}")
+        print("%s: serial transactions without predictor %s, with predictor %s" % (name, len(expected), len(written)))
+
+        t_plain = []
+        t_predict = []
+        # alternated, so that both see the same load
+        for _ in range(RUNS):
+            t_plain.append(timeit.timeit(lambda: replay(lines, driver_class, False), number=REPEAT))
+            t_predict.append(timeit.timeit(lambda: replay(lines, driver_class, True), number=REPEAT))
+        count = REPEAT * len(lines)
+        print("%s: without predictor %.1f us/line, with predictor %.1f us/line" % (
+            name, min(t_plain) / count * 1e6, min(t_predict) / count * 1e6))
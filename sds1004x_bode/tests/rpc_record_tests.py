@@ -0,0 +1,84 @@
+'''
+Created on Oct 17, 2026
+
+@author: hb020
+
+@note: Tests the reassembly of fragmented RPC records by RpcRecordReader (awg_server.py),
+       with records that arrive back to back and records of several fragments, sent in small pieces.
+       Then checks that many small records are read without growing the buffer, the data being moved
+       to its start when the space after it runs out.
+'''
+
+# stuff needed to get the modules from the parent directory
+import sys
+sys.path.insert(0, '..')
+
+import socket
+import threading
+from awg_server import RpcRecordReader
+
+LAST_FRAGMENT = 0x80000000
+
+
+def record(*fragments: bytes) -> bytes:
+    """
+    Returns a record with its record marks, one per fragment.
+    """
+    data = b""
+    for index, fragment in enumerate(fragments):
+        mark = len(fragment) | (LAST_FRAGMENT if index == len(fragments) - 1 else 0)
+        data += mark.to_bytes(4, "big") + fragment
+    return data
+
+
+def send_in_pieces(sock: socket.socket, data: bytes, size: int):
+    with sock:
+        for start in range(0, len(data), size):
+            sock.sendall(data[start:start + size])
+
+
+if __name__ == '__main__':
+    records = [
+        (b"abcd",),
+        # follows the short record: moved down over it, the two ranges overlap
+        (b"0123456789" * 3,),
+        # several fragments, moved down over their record marks
+        (b"first-", b"second-", b"third"),
+        (b"x" * 100, b"y" * 200),
+        (b"",),
+    ]
+    data = b"".join(record(*fragments) for fragments in records)
+
+    # all at once, in pieces smaller than a record mark, and in pieces that end within the fragments
+    for piece_size in (len(data), 3, 7):
+        server, client = socket.socketpair()
+        sender = threading.Thread(target=send_in_pieces, args=(client, data, piece_size))
+        sender.start()
+        # a small buffer, so that it also grows
+        reader = RpcRecordReader(server, 16)
+        for fragments in records:
+            received = reader.read_record()
+            assert received is not None, "record missing"
+            assert bytes(received) == b"".join(fragments), bytes(received)
+        assert reader.read_record() is None, "closed connection not detected"
+        sender.join()
+        server.close()
+        print(f"{len(records)} records received in pieces of {piece_size} bytes")
+
+    # 13 bytes per record, with its mark: the data left after a record is moved down over the previous ones
+    records = [(b"%09u" % number,) for number in range(200)]
+    data = b"".join(record(*fragments) for fragments in records)
+    for piece_size in (len(data), 5, 40):
+        server, client = socket.socketpair()
+        sender = threading.Thread(target=send_in_pieces, args=(client, data, piece_size))
+        sender.start()
+        reader = RpcRecordReader(server, 40)
+        for fragments in records:
+            received = reader.read_record()
+            assert received is not None, "record missing"
+            assert bytes(received) == fragments[0], bytes(received)
+        assert reader.read_record() is None, "closed connection not detected"
+        assert len(reader.buf) == 40, f"buffer grown to {len(reader.buf)} bytes"
+        sender.join()
+        server.close()
+        print(f"{len(records)} small records received in pieces of {piece_size} bytes, in a buffer of 40 bytes")
@@ -0,0 +1,82 @@
+'''
+Created on Oct 17, 2026
+
+@author: hb020
+
+@note: Compares the latency of a frequency step (a write and a :SYSTem:ERRor? query, as the dg800 driver makes them)
+       through the raw socket transport (awgdrivers/scpi_socket.py) and through VISA, against a local fake SCPI server.
+       To compare with VXI-11 as well, give a VISA resource of a VXI-11 server, for instance bode.py with the
+       dummy AWG running on this machine: python socket_bench.py TCPIP::127.0.0.1::INSTR
+'''
+
+# stuff needed to get the modules from the parent directory
+import sys
+sys.path.insert(0, '..')
+
+import socket
+import statistics
+import threading
+import time
+
+import pyvisa as visa
+from awgdrivers.scpi_socket import SocketInstrument
+
+# frequency steps per transport
+STEPS = 2000
+
+
+def fake_scpi_server(server_socket: socket.socket):
+    """
+    Accepts connections, and answers every line that ends with '?'.
+    """
+    while True:
+        conn, _ = server_socket.accept()
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        threading.Thread(target=serve, args=(conn,), daemon=True).start()
+
+
+def serve(conn: socket.socket):
+    received = b""
+    with conn:
+        while True:
+            data = conn.recv(4096)
+            if not data:
+                return
+            received += data
+            *lines, received = received.split(b"\n")
+            for line in lines:
+                if line.endswith(b"?"):
+                    conn.sendall(b'0,"No error"\n')
+
+
+def measure(name: str, instrument, query: str = ":SYSTem:ERRor?"):
+    latencies = []
+    for step in range(STEPS):
+        start = time.perf_counter()
+        instrument.write(f":SOURCE1:FREQ {10 + step:.10f}")
+        reply = instrument.query(query)
+        latencies.append(time.perf_counter() - start)
+        assert reply, "no reply"
+    instrument.close()
+    latencies.sort()
+    print("%s: median %.1f us, 99th percentile %.1f us per step" % (
+        name, statistics.median(latencies) * 1e6, latencies[int(len(latencies) * 0.99)] * 1e6))
+
+
+if __name__ == '__main__':
+    server_socket = socket.socket()
+    server_socket.bind(("127.0.0.1", 0))
+    server_socket.listen()
+    port = server_socket.getsockname()[1]
+    threading.Thread(target=fake_scpi_server, args=(server_socket,), daemon=True).start()
+
+    measure("raw socket", SocketInstrument("127.0.0.1", port))
+
+    rm = visa.ResourceManager("@py")
+    resource = rm.open_resource(f"TCPIP::127.0.0.1::{port}::SOCKET", read_termination="\n", write_termination="\n")
+    measure("VISA socket", resource)
+
+    if len(sys.argv) > 1:
+        # the Siglent emulated by bode.py has no error queue, *OPC? is a query of the same cost
+        measure("VISA VXI-11", rm.open_resource(sys.argv[1]), "*OPC?")
+    rm.close()
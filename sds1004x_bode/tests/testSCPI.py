@@ -1,5 +1,10 @@
 import argparse
-import pyvisa
+
+# stuff needed to get the modules from the parent directory
+import sys
+sys.path.insert(0, '..')
+
+from awgdrivers.visa_sessions import get_resource_manager, open_instrument, release_instrument
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description="Test simple SCPI communication via VISA.",
@@ -8,7 +13,8 @@ if __name__ == '__main__':
     parser.add_argument("-n", action="store_true", default=False, help="No scan for test SCPI devices. Will be ignored when port is not defined.")
     args = parser.parse_args()
         
-    rm = pyvisa.ResourceManager()
+    # the ResourceManager of the process, shared with the drivers
+    rm = get_resource_manager()
     skip_scan = args.n
     if not args.port:
         skip_scan = False
@@ -33,7 +39,7 @@ if __name__ == '__main__':
         print("No scan for VISA resources.")
     if args.port:
         print(f"Connecting to '{args.port}'")
-        inst = rm.open_resource(args.port, timeout=10000)  # You need a large timeout when using serial AWGs
+        inst = open_instrument(args.port, timeout=10000)  # You need a large timeout when using serial AWGs
         print("Connected.")
         msgs = ["*IDN?", 
                 "IDN-SGLT-PRI?", 
@@ -50,3 +56,4 @@ if __name__ == '__main__':
             else:
                 print(f"Write \"{m}\"")
                 inst.write(m)
+        release_instrument(args.port, inst)
@@ -0,0 +1,139 @@
+'''
+Created on Oct 17, 2026
+
+@author: hb020
+
+@note: A minimal VXI-11 client for the tests: the portmapper lookup, and the link calls as a scope makes them.
+       Unlike pyvisa, it can use a portmapper on another port than 111, so the server can run unprivileged.
+'''
+
+# stuff needed to get the modules from the parent directory
+import sys
+sys.path.insert(0, '..')
+
+import itertools
+import socket
+import time
+
+import vxi11_codec as codec
+
+PORTMAPPER_PROGRAM = 100000
+PORTMAPPER_VERSION = 2
+VXI11_CORE_PROGRAM = 395183
+VXI11_CORE_VERSION = 1
+IPPROTO_TCP = 6
+CALL = 0
+
+GET_PORT = 3
+CREATE_LINK = 10
+DEVICE_WRITE = 11
+DEVICE_READ = 12
+DESTROY_LINK = 23
+
+# DEVICE_WRITE flag of the last write of a message
+FLAG_END = 0x08
+# DEVICE_READ reasons: the request size was reached, the reply is complete
+REASON_REQCNT = 0x01
+REASON_END = 0x04
+
+_xids = itertools.count(1)
+
+
+def call_header(program: int, version: int, procedure: int) -> bytes:
+    return codec.RPC_CALL_NULL_AUTH.pack(next(_xids), CALL, 2, program, version, procedure, 0, 0, 0, 0)
+
+
+def get_port(host: str, rpcbind_port: int) -> int:
+    """
+    Asks the portmapper for the port of the VXI-11 core channel, over UDP.
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.settimeout(2)
+        request = call_header(PORTMAPPER_PROGRAM, PORTMAPPER_VERSION, GET_PORT) + \
+            codec.PMAP_PARMS.pack(VXI11_CORE_PROGRAM, VXI11_CORE_VERSION, IPPROTO_TCP, 0)
+        sock.sendto(request, (host, rpcbind_port))
+        return codec.GETPORT_RESP.unpack(sock.recv(1024)[-4:])[0]
+
+
+class Vxi11Client(object):
+    """
+    One connection to the VXI-11 core channel.
+    """
+
+    def __init__(self, host: str, rpcbind_port: int, timeout: float = 5, connect_delay: float = 0):
+        """
+        Gets the port from the portmapper, and connects after connect_delay seconds.
+        """
+        self.port = get_port(host, rpcbind_port)
+        if connect_delay:
+            time.sleep(connect_delay)
+        self.sock = socket.create_connection((host, self.port), timeout=timeout)
+        self.link_id = None
+
+    def call(self, procedure: int, arguments: bytes) -> bytes:
+        """
+        Sends a call in one record, and returns the results of the reply. Raises ConnectionError if the server closes.
+        """
+        record = call_header(VXI11_CORE_PROGRAM, VXI11_CORE_VERSION, procedure) + arguments
+        self.sock.sendall(codec.UINT.pack(len(record) | codec.LAST_FRAGMENT) + record)
+        reply = b""
+        while True:
+            mark = codec.UINT.unpack(self._receive(4))[0]
+            reply += self._receive(mark & 0x7FFFFFFF)
+            if mark & codec.LAST_FRAGMENT:
+                # xid, message type, reply state, verifier, accept state
+                return reply[24:]
+
+    def _receive(self, size: int) -> bytes:
+        data = b""
+        while len(data) < size:
+            chunk = self.sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionResetError("The server closed the connection.")
+            data += chunk
+        return data
+
+    def create_link(self, device: str = "inst0") -> int:
+        results = self.call(CREATE_LINK, codec.CREATE_LINK_PARMS.pack(0, 0, 0, len(device))
+                            + device.encode() + codec.PADDING[-len(device) & 3])
+        error, self.link_id, _, _ = codec.CREATE_LINK_RESP.unpack_from(results)
+        return error
+
+    def write(self, command: str) -> int:
+        """
+        Writes a command, and returns the VXI-11 error.
+        """
+        data = command.encode() + b"\n"
+        results = self.call(DEVICE_WRITE, codec.DEVICE_WRITE_PARMS.pack(self.link_id, 1000, 1000, FLAG_END, len(data))
+                            + data + codec.PADDING[-len(data) & 3])
+        return codec.DEVICE_WRITE_RESP.unpack_from(results)[0]
+
+    def read(self, request_size: int = 0x100000) -> tuple:
+        """
+        Reads once, and returns the VXI-11 error, the reason and the data.
+        """
+        results = self.call(DEVICE_READ, codec.DEVICE_READ_PARMS.pack(self.link_id, request_size, 1000, 1000, 0, 0))
+        error, reason, size = codec.DEVICE_READ_RESP.unpack_from(results)
+        return error, reason, results[codec.DEVICE_READ_RESP.size:codec.DEVICE_READ_RESP.size + size]
+
+    def query(self, command: str, request_size: int = 0x100000) -> str:
+        """
+        Writes a query, and reads until the END reason. Raises IOError on a VXI-11 error.
+        """
+        error = self.write(command)
+        if error:
+            raise IOError(f"DEVICE_WRITE error {error}")
+        reply = b""
+        while True:
+            error, reason, data = self.read(request_size)
+            if error:
+                raise IOError(f"DEVICE_READ error {error}")
+            reply += data
+            if reason & REASON_END:
+                return reply.decode()
+
+    def destroy_link(self) -> int:
+        return codec.DEVICE_ERROR.unpack_from(self.call(DESTROY_LINK, codec.DEVICE_LINK.pack(self.link_id)))[0]
+
+    def close(self):
+        self.sock.close()
@@ -0,0 +1,230 @@
+'''
+Created on Oct 17, 2026
+
+@author: hb020
+
+
+Encoding and decoding of the ONC-RPC (RFC 1057) and VXI-11 messages handled by the server.
+
+All message layouts are precompiled struct.Struct objects.
+The replies are preallocated templates, each packed in place with one struct call.
+They are returned as a list of buffers, to be sent with one socket.sendmsg() call,
+so that reply payloads are never concatenated with their headers.
+
+A template is patched for every reply, so each connection must use its own templates.
+
+'''
+
+import struct
+
+UINT = struct.Struct(">I")
+LAST_FRAGMENT = 0x80000000
+
+# RPC message type, reply state, accept states and verifier flavor
+REPLY = 1
+MSG_ACCEPTED = 0
+SUCCESS = 0
+PROC_UNAVAIL = 3
+AUTH_NULL = 0
+
+# Call header, up to the credentials body:
+#  xid, message type, RPC version, program, program version, procedure, credentials flavor, credentials length
+RPC_CALL_HEADER = struct.Struct(">IIIIIIII")
+# Verifier of a call: flavor, length
+RPC_AUTH = struct.Struct(">II")
+# Call header with empty credentials, followed by the verifier
+RPC_CALL_NULL_AUTH = struct.Struct(">IIIIIIIIII")
+# Accepted reply header, starting with the record mark:
+#  record mark, xid, message type, reply state, verifier flavor, verifier length, accept state
+RPC_REPLY_HEADER = struct.Struct(">IIIIIII")
+
+# VXI-11 arguments (VXI-11 specification, appendix B)
+#  CREATE_LINK: client id, lock device, lock timeout, device name length
+CREATE_LINK_PARMS = struct.Struct(">iiII")
+#  DEVICE_WRITE: link id, io timeout, lock timeout, flags, data length
+DEVICE_WRITE_PARMS = struct.Struct(">iIIiI")
+#  DEVICE_READ: link id, request size, io timeout, lock timeout, flags, termination character
+DEVICE_READ_PARMS = struct.Struct(">iIIIii")
+#  DEVICE_READSTB, DEVICE_TRIGGER, DEVICE_CLEAR, DEVICE_REMOTE, DEVICE_LOCAL: link id, flags, lock timeout, io timeout
+DEVICE_GENERIC_PARMS = struct.Struct(">iiII")
+#  DEVICE_LOCK: link id, flags, lock timeout
+DEVICE_LOCK_PARMS = struct.Struct(">iiI")
+#  DEVICE_UNLOCK, DESTROY_LINK and device_abort: link id
+DEVICE_LINK = struct.Struct(">i")
+#  DEVICE_ENABLE_SRQ: link id, enable (followed by the handle)
+DEVICE_ENABLE_SRQ_PARMS = struct.Struct(">iI")
+#  DEVICE_DOCMD: link id, flags, io timeout, lock timeout, command, network order, data size (followed by the data)
+DEVICE_DOCMD_PARMS = struct.Struct(">iiIIiIi")
+#  CREATE_INTR_CHAN: host address, host port, program, program version, program family
+DEVICE_REMOTE_FUNC = struct.Struct(">IIIIi")
+# Portmapper GETPORT arguments: program, version, protocol, port
+PMAP_PARMS = struct.Struct(">IIII")
+
+# VXI-11 results
+#  CREATE_LINK: error, link id, abort port, maximum receive size
+CREATE_LINK_RESP = struct.Struct(">iiII")
+#  DEVICE_WRITE: error, size
+DEVICE_WRITE_RESP = struct.Struct(">iI")
+#  DEVICE_READ: error, reason, data length (followed by the data)
+DEVICE_READ_RESP = struct.Struct(">iiI")
+#  DEVICE_READSTB: error, status byte
+DEVICE_READSTB_RESP = struct.Struct(">iI")
+#  DEVICE_DOCMD: error, data length (followed by the data)
+DEVICE_DOCMD_RESP = struct.Struct(">iI")
+#  DESTROY_LINK and others: error
+DEVICE_ERROR = struct.Struct(">i")
+# Portmapper GETPORT result: port
+GETPORT_RESP = struct.Struct(">I")
+# No result, for errors
+NO_RESULT = struct.Struct(">")
+
+# Fill bytes after opaque data, by the number of bytes needed
+PADDING = (b"", b"\x00", b"\x00\x00", b"\x00\x00\x00")
+
+
+def padded(size: int) -> int:
+    """Returns the size of opaque data of size bytes, including the fill bytes."""
+    return (size + 3) & ~3
+
+
+def get_xid(record) -> int:
+    """Returns the XID of an RPC record (without record mark)."""
+    return UINT.unpack_from(record, 0)[0]
+
+
+def parse_rpc_call(record):
+    """Parses the header of an RPC call.
+
+    :param record: the record, without record mark
+    :type record: bytes or memoryview
+    :return: xid, program, program version, procedure and the offset of the arguments, or None if the record is too short
+    :rtype: tuple
+    """
+    if len(record) < RPC_CALL_NULL_AUTH.size:
+        return None
+    xid, _, _, program, version, procedure, _, cred_length, _, verf_length = RPC_CALL_NULL_AUTH.unpack_from(record, 0)
+    if cred_length == 0 and verf_length == 0:
+        # AUTH_NULL, as sent by all known clients
+        return xid, program, version, procedure, RPC_CALL_NULL_AUTH.size
+    offset = RPC_CALL_HEADER.size + padded(cred_length)
+    if len(record) < offset + RPC_AUTH.size:
+        return None
+    _, verf_length = RPC_AUTH.unpack_from(record, offset)
+    offset += RPC_AUTH.size + padded(verf_length)
+    return xid, program, version, procedure, offset
+
+
+def pop_record(buf: bytearray):
+    """Removes the first complete RPC record from a receive buffer.
+
+    :param buf: the received data, starting with a record mark
+    :type buf: bytearray
+    :return: the record without record marks, or None if it was not received completely yet
+    :rtype: bytes
+    """
+    record = b""
+    pos = 0
+    while len(buf) >= pos + 4:
+        mark = UINT.unpack_from(buf, pos)[0]
+        end = pos + 4 + (mark & ~LAST_FRAGMENT)
+        if len(buf) < end:
+            return None
+        record += buf[pos + 4:end]
+        pos = end
+        if mark & LAST_FRAGMENT:
+            del buf[:pos]
+            return record
+    return None
+
+
+class ReplyTemplate(object):
+    """
+    An accepted RPC reply with a fixed layout, followed by optional opaque data.
+    """
+
+    def __init__(self, result: struct.Struct, on_udp: bool = False, accept_state: int = SUCCESS):
+        # The header and the result are packed at once
+        self.layout = struct.Struct(RPC_REPLY_HEADER.format + result.format.lstrip(">"))
+        # The constant part of the header
+        self.header = (REPLY, MSG_ACCEPTED, AUTH_NULL, 0, accept_state)
+        # UDP has no record marks
+        self.start = 4 if on_udp else 0
+        self.size = RPC_REPLY_HEADER.size + result.size - 4
+        self.buf = bytearray(self.layout.size)
+        self.view = memoryview(self.buf)[self.start:]
+
+    def pack(self, xid: int, *fields, data=None) -> list:
+        """Patches the template.
+
+        :param xid: XID of the RPC request
+        :type xid: int
+        :param fields: the fields of the result
+        :param data: opaque data that follows the result. Its length must be the last field.
+        :type data: bytes
+        :return: the buffers to be sent
+        :rtype: list
+        """
+        if data is None:
+            self.layout.pack_into(self.buf, 0, LAST_FRAGMENT | self.size, xid, *self.header, *fields)
+            return [self.view]
+        pad = PADDING[-len(data) & 3]
+        size = self.size + len(data) + len(pad)
+        self.layout.pack_into(self.buf, 0, LAST_FRAGMENT | size, xid, *self.header, *fields)
+        return [self.view, data, pad]
+
+
+class Vxi11Replies(object):
+    """
+    The VXI-11 reply templates of one connection.
+    """
+
+    def __init__(self):
+        self.create_link = ReplyTemplate(CREATE_LINK_RESP)
+        self.device_write = ReplyTemplate(DEVICE_WRITE_RESP)
+        self.device_read = ReplyTemplate(DEVICE_READ_RESP)
+        self.device_error = ReplyTemplate(DEVICE_ERROR)
+        self.device_readstb = ReplyTemplate(DEVICE_READSTB_RESP)
+        self.device_docmd = ReplyTemplate(DEVICE_DOCMD_RESP)
+        self.proc_unavail = ReplyTemplate(NO_RESULT, accept_state=PROC_UNAVAIL)
+
+    def create_link_reply(self, xid: int, error: int, link_id: int, abort_port: int, max_recv_size: int) -> list:
+        return self.create_link.pack(xid, error, link_id, abort_port, max_recv_size)
+
+    def device_write_reply(self, xid: int, error: int, size: int) -> list:
+        return self.device_write.pack(xid, error, size)
+
+    def device_read_reply(self, xid: int, error: int, reason: int, data: bytes) -> list:
+        return self.device_read.pack(xid, error, reason, len(data), data=data)
+
+    def device_error_reply(self, xid: int, error: int) -> list:
+        return self.device_error.pack(xid, error)
+
+    def device_readstb_reply(self, xid: int, error: int, stb: int) -> list:
+        return self.device_readstb.pack(xid, error, stb)
+
+    def device_docmd_reply(self, xid: int, error: int, data: bytes) -> list:
+        return self.device_docmd.pack(xid, error, len(data), data=data)
+
+    def proc_unavail_reply(self, xid: int) -> list:
+        return self.proc_unavail.pack(xid)
+
+
+def send_buffers(sock, buffers: list):
+    """Sends a list of buffers with one sendmsg() call (scatter-gather).
+    Where sockets have no sendmsg() (Windows), the buffers are joined and sent with sendall().
+
+    :param sock: a connected TCP socket
+    :type sock: socket.socket
+    :param buffers: the buffers
+    :type buffers: list
+    """
+    if not hasattr(sock, "sendmsg"):
+        sock.sendall(b"".join(buffers))
+        return
+    sent = sock.sendmsg(buffers)
+    total = 0
+    for buf in buffers:
+        total += len(buf)
+    if sent < total:
+        # Partial send, only happens when the socket buffer is full
+        sock.sendall(b"".join(buffers)[sent:])
@@ -0,0 +1,143 @@
+'''
+Created on Oct 17, 2026
+
+@author: hb020
+
+
+This file contains the write-behind queue of the VXI-11 server.
+
+In write-behind mode, the SCPI commands of DEVICE_WRITE are queued and the reply is sent right away.
+A driver thread executes the queued commands with the parser, in the order they were received,
+so the scope never waits for a slow AWG.
+
+Some commands are barriers: DEVICE_WRITE waits until they are executed by the AWG.
+Queries and the synchronisation commands *OPC and *WAI are always barriers. The other barriers are configurable, OUTP by default,
+so that the output is only switched on (and the session only ends) after all settings were made.
+DEVICE_READ waits for the queue to be empty. The first error of the driver on a command of a link is reported
+to the client as an I/O error: by DEVICE_WRITE if the command is a barrier, otherwise by the next DEVICE_WRITE
+or DEVICE_READ on that link.
+
+'''
+
+import queue
+import threading
+from awgdrivers.log_writer import log
+
+# Commands that DEVICE_WRITE waits for, in addition to the queries
+DEFAULT_BARRIERS = ("OUTP",)
+
+# Commands that complete only after all previous commands, and are therefore always barriers
+SYNC_BARRIERS = ("*OPC", "*WAI")
+
+
+class WriteBehindQueue(object):
+    """
+    Executes the SCPI commands in a driver thread, in the order they were received.
+    """
+
+    def __init__(self, parser, barriers=DEFAULT_BARRIERS):
+        """
+        Gets the command parser and the headers of the commands that are barriers.
+        """
+        self.parser = parser
+        self.barriers = SYNC_BARRIERS + tuple(barrier.upper() for barrier in barriers)
+        self.commands = queue.Queue()
+        # link id -> the first exception of the driver on a command of that link, not reported yet
+        self.errors = {}
+        self.error_lock = threading.Lock()
+        self.thread = threading.Thread(target=self.run, name="awg-driver", daemon=True)
+        self.thread.start()
+
+    def is_barrier(self, command: str) -> bool:
+        """Returns True if DEVICE_WRITE must wait until the command is executed.
+
+        :param command: the SCPI command line
+        :type command: str
+        :return: True for queries, *OPC, *WAI and the commands containing one of the barrier headers
+        :rtype: bool
+        """
+        if "?" in command:
+            return True
+        command = command.upper()
+        for barrier in self.barriers:
+            if barrier in command:
+                return True
+        return False
+
+    def put(self, command: str, block=None, link_id: int = None):
+        """Queues a command. Returns when it is executed, if it is a barrier.
+        Raises the error of the driver on this barrier or on a previous command of the link, if there is one.
+        A command is not queued after an error that was not reported yet.
+
+        :param command: the SCPI command line
+        :type command: str
+        :param block: the binary block of the command, if any
+        :type block: memoryview
+        :param link_id: the link the command was sent on
+        :type link_id: int
+        :return: the reply of the parser to a barrier, None for the other commands
+        :rtype: str
+        """
+        if not self.is_barrier(command):
+            error = self.take_error(link_id)
+            if error is not None:
+                raise error
+            # The block is a view of the receive buffer, which is reused before the command is executed
+            self.commands.put((command, None if block is None else bytes(block), None, link_id))
+            return None
+        reply = []
+        self.commands.put((command, block, reply, link_id))
+        self.commands.join()
+        error = self.take_error(link_id)
+        if error is not None:
+            raise error
+        return reply[0] if reply else None
+
+    def sync(self, link_id: int = None):
+        """Waits until all queued commands are executed.
+
+        :param link_id: the link to report the error of
+        :type link_id: int
+        :return: the first exception raised by the driver on a command of the link that was not reported yet, or None
+        :rtype: Exception
+        """
+        self.commands.join()
+        return self.take_error(link_id)
+
+    def take_error(self, link_id: int = None):
+        """Returns the first exception raised by the driver on a command of the link, and forgets it.
+
+        :param link_id: the link
+        :type link_id: int
+        :return: the exception, or None
+        :rtype: Exception
+        """
+        with self.error_lock:
+            return self.errors.pop(link_id, None)
+
+    def run(self):
+        """
+        The driver thread.
+        """
+        while True:
+            command, block, reply, link_id = self.commands.get()
+            try:
+                if command is None:
+                    return
+                result = self.parser.parse_scpi_command(command, block)
+                if reply is not None:
+                    reply.append(result)
+            except Exception as ex:
+                log("AWG driver error on \"%s\": %s", command, ex)
+                with self.error_lock:
+                    self.errors.setdefault(link_id, ex)
+            finally:
+                self.commands.task_done()
+
+    def close(self):
+        """
+        Executes the queued commands and stops the driver thread.
+        """
+        if self.thread.is_alive():
+            self.commands.put((None, None, None, None))
+            self.thread.join()